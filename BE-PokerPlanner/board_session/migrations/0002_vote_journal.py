@@ -0,0 +1,31 @@
+# Generated by Django 2.2 on 2026-10-18 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('board_session', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteJournal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('estimation', models.IntegerField(null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_journal', to='board_session.BoardSession')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='votejournal',
+            index=models.Index(fields=['session', 'id'], name='board_sessi_session_aa8cdc_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board_session', '0002_vote_journal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votejournal',
+            name='ticket_id',
+            field=models.IntegerField(null=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 import constants
@@ -22,3 +23,36 @@ class BoardSession(VersioningControl):
     board = models.ForeignKey('poker_board.PokerBoard', on_delete=models.CASCADE)
     timer = models.PositiveIntegerField(default=constants.DEFAULT_GAME_TIMER_IN_SECONDS)
     is_active = models.BooleanField(default=True)
+
+
+class VoteJournal(VersioningControl):
+    """
+    A class for the append-only journal of the votes of live board sessions.
+
+    ...
+
+    Fields
+    ----------
+    session : foreign key
+        foreign key to the board session the vote was given in
+    ticket_id : integer field
+        id of the ticket voted on, or of the ticket starting the new round
+    user : foreign key
+        the member who voted, null for the entry starting a new round
+    estimation : integer field
+        the estimation of the member
+    """
+    session = models.ForeignKey(BoardSession, on_delete=models.CASCADE, related_name='vote_journal')
+    ticket_id = models.IntegerField(null=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.CASCADE)
+    estimation = models.IntegerField(null=True)
+
+    class Meta:
+        """
+        A class to describe extra properties of this VoteJournal model
+
+        ...
+
+        Entries of a session are read in insertion order.
+        """
+        indexes = [models.Index(fields=['session', 'id'])]
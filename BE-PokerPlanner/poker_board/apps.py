@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PokerBoardConfig(AppConfig):
     name = 'poker_board'
+
+    def ready(self):
+        from poker_board import signals  # noqa: F401
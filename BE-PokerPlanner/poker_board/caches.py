@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from poker_board import constants as board_constants
+
+
+class TTLCache:
+    '''
+    A process local cache with a time to live and a least recently used size limit.
+
+    Entries older than `ttl` seconds are never returned, once `max_size` entries are
+    kept the least recently used one is dropped. A `ttl` of 0 disables the cache.
+    '''
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Return the value cached for the key, or default when it is missing or expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """Cache the value for the key for `ttl` seconds."""
+        if not self.ttl:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        """Drop the value cached for the key."""
+        self.entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Drop the values cached for which the predicate is true."""
+        for key in [key for key, (_, value) in self.entries.items() if predicate(value)]:
+            del self.entries[key]
+
+    def clear(self):
+        self.entries.clear()
+
+
+admission_cache = TTLCache(
+    getattr(settings, 'POKER_BOARD_ADMISSION_CACHE_TTL', board_constants.ADMISSION_CACHE_TTL_IN_SECONDS),
+    getattr(settings, 'POKER_BOARD_ADMISSION_CACHE_SIZE', board_constants.ADMISSION_CACHE_SIZE)
+)
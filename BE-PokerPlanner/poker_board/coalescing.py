@@ -0,0 +1,90 @@
+import functools
+
+from poker_board import constants as board_constants
+from poker_board.timers import timer_scheduler
+
+
+class VoteCoalescer:
+    '''
+    Merges the votes of a game arriving within a short window into one flush.
+
+    The window is opened by the first vote after a flush and is not extended by the
+    votes arriving in it, so a vote is never delayed by more than the window. A member
+    voting again in the same window replaces their previous vote, which moves to the
+    end so that the flushed votes keep the order of the last vote of each member.
+    Windows are driven by the process wide `timer_scheduler`.
+    '''
+
+    def __init__(self, scheduler=timer_scheduler):
+        self.scheduler = scheduler
+        self.pending = {}
+        self.on_flush = {}
+
+    def key(self, game):
+        """Return the scheduler key of the window of the given game."""
+        return f'{board_constants.VOTES_DELTA}:{game}'
+
+    def add(self, game, email, vote, window, on_flush):
+        """
+        Buffer the vote of a member and open the window of the game if it is closed.
+
+        `on_flush` is a coroutine function called with the list of buffered votes when the
+        window closes, the one given with the first vote of a window is used.
+        """
+        votes = self.pending.get(game)
+        if votes is None:
+            votes = self.pending[game] = {}
+            self.on_flush[game] = on_flush
+            self.scheduler.start(self.key(game), window, on_expire=functools.partial(self.flush, game))
+        votes.pop(email, None)
+        votes[email] = vote
+
+    async def flush(self, game):
+        """
+        Send the buffered votes of a game now, used when the window closes and before any
+        other message of the game so that the votes are never received after it.
+        """
+        votes = self.pending.pop(game, None)
+        if votes is None:
+            return
+        self.scheduler.cancel(self.key(game))
+        await self.on_flush.pop(game)(list(votes.values()))
+
+    def discard(self, game):
+        """Drop the buffered votes of a game without sending them."""
+        self.scheduler.cancel(self.key(game))
+        self.pending.pop(game, None)
+        self.on_flush.pop(game, None)
+
+    def __len__(self):
+        return len(self.pending)
+
+
+class Throttle:
+    '''
+    Runs a coroutine function of a game at most once per interval.
+
+    The first call after a run opens the interval and the function runs when it closes,
+    the calls made meanwhile are merged into that run. Intervals are driven by the
+    process wide `timer_scheduler`.
+    '''
+
+    def __init__(self, name, scheduler=timer_scheduler):
+        self.name = name
+        self.scheduler = scheduler
+
+    def key(self, game):
+        """Return the scheduler key of the interval of the given game."""
+        return f'{self.name}:{game}'
+
+    def schedule(self, game, interval, on_expire):
+        """Run `on_expire` at the end of the current interval of the game, opening one if needed."""
+        if self.scheduler.get(self.key(game)) is None:
+            self.scheduler.start(self.key(game), interval, on_expire=on_expire)
+
+    def discard(self, game):
+        self.scheduler.cancel(self.key(game))
+
+
+vote_coalescer = VoteCoalescer()
+votes_aggregate_throttle = Throttle(board_constants.VOTES_AGGREGATE)
@@ -33,3 +33,146 @@ POKERBOARD_EXIST = 'Already Exist.'
 POKERBOARD_MEMBER = 'Account does not exist.'
 USER_NEED_SIGNUP = 'SignUp'
 DATA_NOT_DECRPTED = 'Your email is not encrypted with project key.'
+TIMER = "timer"
+VOTES_KEY = "votes"
+MEMBERS_KEY = "members"
+TICKETS_KEY = "tickets"
+META_KEY = "meta"
+STATE_BACKEND = "poker_board.store_backends.InMemoryStateBackend"
+STATE_REDIS_URL = "redis://localhost:6379/1"
+STATE_KEY_PREFIX = "poker_planner"
+STATE_TTL_IN_SECONDS = 24 * 60 * 60
+TIMER_STARTED = "timer_started"
+TIMER_EXPIRED = "timer_expired"
+TIMER_MODE = "timer_mode"
+TICK_TIMER_MODE = "tick"
+DEADLINE_TIMER_MODE = "deadline"
+DEADLINE = "deadline"
+DURATION = "duration"
+SERVER_TIME = "server_time"
+TIMER_TICK_IN_SECONDS = 1
+NOT_VOTED = -1
+MAX_ESTIMATION = 2147483647
+BROADCAST_FRAME = "broadcast_frame"
+TEXT = "text"
+SENDER_TEXT = "sender_text"
+VOTES_DELTA = "votes_delta"
+VOTE_COALESCING_WINDOW_IN_SECONDS = 0
+ADMISSION_CACHE_TTL_IN_SECONDS = 0
+ADMISSION_CACHE_SIZE = 10000
+TICKETS_LOADED = "tickets_loaded"
+REORDER_TICKETS = "reorder_tickets"
+JUMP_TO_TICKET = "jump_to_ticket"
+TICKETS = "tickets"
+EVICT = "evict"
+SESSION_IDLE_TTL_IN_SECONDS = 10 * 60
+MAX_RESIDENT_SESSIONS = 1000
+RESIDENT_SESSIONS = "resident_sessions"
+CONNECTIONS = "connections"
+APPROXIMATE_BYTES = "approximate_bytes"
+APPROXIMATE_BYTES_PER_SESSION = "approximate_bytes_per_session"
+ENDED_SESSIONS = "ended_sessions"
+EVICTED_IDLE_SESSIONS = "evicted_idle_sessions"
+EVICTED_LRU_SESSIONS = "evicted_lru_sessions"
+SESSION_ENDED = "session_ended"
+STATS_KEY = "stats"
+MEDIAN_TICKET_ESTIMATION = "median_ticket_estimation"
+STANDARD_DEVIATION = "standard_deviation"
+CONSENSUS_PERCENTAGE = "consensus_percentage"
+VOTES_COUNT = "votes_count"
+HISTOGRAM = "histogram"
+COUNT = "count"
+SUM = "sum"
+SQUARES = "squares"
+MANAGER_GUARD = "manager"
+PLAYER_GUARD = "player"
+ANY_GUARD = "any"
+LATENCY_BUCKETS_IN_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+INFINITY = "inf"
+ERRORS = "errors"
+TOTAL_SECONDS = "total_seconds"
+AVG_SECONDS = "avg_seconds"
+LATENCY_BUCKETS = "latency_buckets"
+EVENTS = "events"
+SESSIONS = "sessions"
+METRICS_TOKEN_HEADER = "HTTP_X_METRICS_TOKEN"
+WRITE_BEHIND = "write_behind"
+WRITE_BEHIND_DELAY_IN_SECONDS = 0.05
+WRITE_BEHIND_BATCH_SIZE = 500
+VOTE_JOURNAL = "vote_journal"
+SEQUENCE = "seq"
+EVENTS_KEY = "events"
+EVENT_BUFFER_SIZE = 256
+RESYNC = "resync"
+SNAPSHOT = "snapshot"
+TICKET = "ticket"
+VOTES = "votes"
+VOTED = "voted"
+REMAINING_TIME = "remaining_time"
+LOCAL_FANOUT = True
+GROUP = "group"
+ORIGIN = "origin"
+LOCAL_GROUPS = "local_groups"
+LOCAL_CONNECTIONS = "local_connections"
+LOCAL_DELIVERIES = "local_deliveries"
+PUBLISHED_MESSAGES = "published_messages"
+FANOUT = "fanout"
+VOTES_AGGREGATE = "votes_aggregate"
+VOTES_AGGREGATE_INTERVAL_IN_SECONDS = 1
+LARGE_ROOM_SIZE = 100
+MEMBERS = "members"
+EVENT_RATE_LIMITS = {
+    CARD_SELECTED: (5, 10),
+    GET_CURRENT_TICKET: (5, 10),
+    FETCH_TICKET: (1, 3),
+    USERS_ESTIMATION: (2, 5),
+    TICKET_ANALYSIS: (2, 5),
+    START_TIMER: (1, 3),
+    RESYNC: (1, 3),
+}
+COALESCED_EVENTS = (CARD_SELECTED, GET_CURRENT_TICKET, USERS_ESTIMATION, TICKET_ANALYSIS)
+OUTBOUND_QUEUE_SIZE = 512
+SLOW_CONSUMER_CLOSE_CODE = 4008
+DROPPED_MESSAGES = "dropped_messages"
+COALESCED_MESSAGES = "coalesced_messages"
+SLOW_CONSUMERS = "slow_consumers"
+PEAK_OUTBOUND_DEPTH = "peak_outbound_depth"
+SEND_ERROR_CLOSE_CODE = 1011
+FAILED_SENDS = "failed_sends"
+FLOW_CONTROL = "flow_control"
+ROUND = "round"
+ROUND_STATE = "state"
+IDLE_ROUND = "idle"
+VOTING_ROUND = "voting"
+REVEALED_ROUND = "revealed"
+FINALIZED_ROUND = "finalized"
+ROUND_STATES = (IDLE_ROUND, VOTING_ROUND, REVEALED_ROUND, FINALIZED_ROUND)
+ANALYSIS = "analysis"
+AUTO_ROUNDS = False
+DEFAULT_CONSENSUS_PERCENTAGE = 100
+PLAYER_COUNT = "player_count"
+TICKET_FEED = True
+TICKET_FEED_GROUP = "ticket_feed"
+TICKET_CHANGE = "ticket_change"
+TICKET_CHANGED = "ticket_changed"
+OPERATION = "operation"
+BOARD = "board"
+INSERTED_TICKET = "insert"
+UPDATED_TICKET = "update"
+REMOVED_TICKET = "remove"
+PRESENCE = "presence"
+PRESENCE_KEY = "presence"
+CONNECTIONS_KEY = "connections"
+JOINED = "joined"
+LEFT = "left"
+PRESENT = "present"
+PRESENCE_HEARTBEAT_IN_SECONDS = 10
+PRESENCE_TTL_IN_SECONDS = 30
+PRESENCE_DEBOUNCE_IN_SECONDS = 1
+PING = "ping"
+PONG = "pong"
+HEARTBEAT = "heartbeat"
+HEARTBEAT_INTERVAL_IN_SECONDS = 20
+MISSED_HEARTBEATS = 3
+IDLE_CONNECTION_CLOSE_CODE = 4009
+REAPED_CONNECTIONS = "reaped_connections"
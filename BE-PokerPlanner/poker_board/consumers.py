@@ -1,11 +1,30 @@
-import asyncio
+import functools
 import json
-import statistics
+import time
+from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
-
-from poker_board import constants as board_constants
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from poker_board import constants as board_constants, store_backends
+from poker_board.caches import admission_cache
+from poker_board.coalescing import vote_coalescer, votes_aggregate_throttle
+from poker_board.fanout import LocalFanout
+from poker_board.flow_control import OutboundQueue, RateLimiter, flow_control_stats
+from poker_board.journal import vote_journal
+from poker_board.lifecycle import SessionLifecycle
+from poker_board.metrics import event_metrics
+from poker_board.models import PokerRole
+from poker_board.presence import PresenceTracker
+from poker_board.single_flight import SingleFlight
+from poker_board.ticket_feed import TicketFeed
+from poker_board.timers import timer_scheduler
+from poker_board.write_behind import estimation_writer
 from board_session.models import BoardSession
 from poker_ticket import (
     models as poker_ticket_models, serializers as poker_ticket_serializers
@@ -16,131 +35,223 @@ class WebScoketStore:
     '''
     Websocket Store basically handle variable for playing pokerboard game 
     so that we don't needed to make database query.
+
+    The votes, members, tickets and timer count of a game are kept by a pluggable
+    state backend (see poker_board.store_backends) so that a game can be shared
+    by every ASGI worker. Running timers are kept by poker_board.timers.timer_scheduler.
+    The votes of a backend keeping the games in process memory are also appended to
+    the vote journal (see poker_board.journal), so a game lost with its worker or
+    evicted is rebuilt with the votes of its current round.
     '''
 
-    def __init__(self):
-        self.store = {}
-        self.store_user_id = {}
-        self.tickets = {}
-        self.timer_task = {}
-        self.timer = {} 
+    def __init__(self, backend=None, journal=None):
+        self.backend = backend or store_backends.get_state_backend()
+        if journal is None and self.backend.process_local:
+            journal = vote_journal
+        self.journal = journal
 
-    def create_game_instance(self, game, timer_count, game_member):
+    async def create_game_instance(self, game, timer_count, game_member):
         """
         Creates a new instance of the game with the specified name and initializes
-        necessary data structures for the game. 
+        necessary data structures for the game.
 
         Args:
         - game: A string representing the name of the game instance to be created.
+        - timer_count: Timer of the board session in seconds.
+        - game_member: A list of dicts with the id and email of the board members.
 
         Returns: None
         """
-        if self.store.get(game):
-            return
+        await self.backend.create_session(game, timer_count, game_member)
 
-        self.store[game] = {}
-        self.store_user_id[game] = {}
-        self.tickets[game] = []
-        self.timer_task[game] = ''
-        self.timer[game] = timer_count
+    async def delete_game_instance(self, game):
+        """Delete the state of the game once its session ended or it was evicted."""
 
-        self.initial_data(game_member, game)
+        await self.backend.delete_session(game)
 
-    def get_timer_task(self, game):
-        """
-        Returns the current timer task associated with the specified game instance.
+    async def approximate_size(self, game):
+        """Return the approximate number of bytes used by the game in memory, or None."""
 
-        Args:
-        - game: A string representing the name of the game instance.
+        return await self.backend.approximate_size(game)
 
-        Returns:
-        - The current timer task associated with the specified game instance.
-        """
-        return self.timer_task[game]
-    
-    def set_timer_task(self, game, value):
-        """
-        Sets the timer task for the specified game instance to the specified value.
-
-        Args:
-        - game: A string representing the name of the game instance.
-        - value: A string representing the timer task to be set.
-
-        Returns: None
-        """
-        self.timer_task[game] = value
-    
-    def set_timer(self, time, game):
+    async def set_timer(self, time, game):
         """Set the value of the timer to the given time."""
         
-        self.timer[game] = time
-
-    def get_timer(self, game):
-        """Return the current value of the timer."""
-        
-        return self.timer[game]
-    
-    def decrement_timer(self, game):
-        """Decrement the timer by 1 second."""
-        
-        self.timer[game] -= 1
+        await self.backend.set_timer(game, time)
 
-    def websocket_store(self, game):
+    async def websocket_store(self, game):
         """Return a JSON representation of the WebSocket store."""
         
-        return self.store[game]
+        return await self.backend.get_votes(game)
     
-    def get_current_ticket(self, game):
+    async def get_current_ticket(self, game):
         """Return a JSON representation of the current ticket being estimated."""
 
-        return json.loads(json.dumps(
-            poker_ticket_serializers.UserTicketEstimationSerializer(self.tickets[game][0]).data
-        )) if len(self.tickets[game]) else None
+        return await self.backend.get_current_ticket(game)
+
+    async def get_current_ticket_payload(self, game):
+        """
+        Return the json text of the current ticket being estimated.
+
+        Tickets are encoded once when they are loaded, so the text is reused
+        until the current ticket changes.
+        """
+
+        return await self.backend.get_current_ticket_payload(game)
     
-    def skip_ticket(self, game):
+    async def skip_ticket(self, game):
         """
         Remove the current ticket from the list of tickets being estimated 
         and append it to the end.
         """
         
-        if self.tickets[game]:
-            self.tickets[game].append(self.tickets[game].pop(0))
-
-    def initial_data(self, game_members, game):
-        """Initialize the WebSocket store with data about the game members."""
-        for users in list(game_members):
-           self.store[game][users["email"]] = "not estimated"
-           self.store_user_id[game][users["email"]] = users["id"]
-        return self.store[game]   
-    
-    def load_database_tickets(self, tickets, game):
-        """Load the list of poker tickets from the database."""
+        await self.backend.skip_ticket(game)
+
+    async def tickets_loaded(self, game):
+        """Return True once the tickets of the game have been loaded."""
+
+        return await self.backend.tickets_loaded(game)
+
+    async def reorder_tickets(self, ticket_ids, game):
+        """
+        Put the tickets with the given ids first in the list of tickets being estimated,
+        in that order.
+        """
+
+        await self.backend.reorder_tickets(game, ticket_ids)
+
+    async def jump_to_ticket(self, ticket_id, game):
+        """
+        Make the given ticket the current one as if the tickets before it were skipped,
+        return False if it is not in the list of tickets being estimated.
+        """
+
+        return await self.backend.jump_to_ticket(game, ticket_id)
+
+    async def change_ticket(self, ticket_id, ticket, game):
+        """
+        Apply a change of a ticket to the list of tickets being estimated: the serialized
+        ticket is added or replaces the one with its id, None removes it. Return the
+        operation applied or None when the list did not change or is not loaded yet.
+        """
+
+        return await self.backend.change_ticket(game, ticket_id, ticket)
+
+    async def load_database_tickets(self, tickets, game, session=None):
+        """
+        Load the list of serialized poker tickets fetched from the database, unless the
+        tickets of the game are already loaded. Return True if they were loaded by this call.
+
+        Tickets loaded again for a journaled session get the round of the journal back:
+        its ticket is made the current one again, e.g. after it was skipped to, with
+        the votes given on it.
+        """
+
+        loaded = await self.backend.load_tickets(game, tickets)
+        if loaded and self.journal is not None and session is not None:
+            ticket_id, votes = await self.journal.replay(session)
+            await self.backend.restore_votes(game, ticket_id, votes)
+        return loaded
+
+    async def user_estimation(self, email, user_id, estimation, game, session=None):
+        """Store the estimation made by a user for a ticket and journal it."""
+
+        votes = await self.backend.set_vote(game, email, user_id, estimation)
+        if self.journal is not None and session is not None:
+            await self.journal.append(session, await self.backend.get_current_ticket_id(game), user_id, estimation)
+        return votes
+
+    async def pop_ticket(self, game, session=None):
+        """
+        Remove the current ticket from the list of tickets being estimated,
+        the journal of the session starts the round of the next ticket.
+
+        Returns a tuple (ticket, estimations) where estimations are the
+        (user id, estimation) pairs given on the removed ticket.
+        """
+
+        ticket, estimations = await self.backend.pop_ticket(game)
+        if ticket is not None and self.journal is not None and session is not None:
+            await self.journal.new_round(session, await self.backend.get_current_ticket_id(game))
+        return ticket, estimations
+
+    async def get_round_state(self, game):
+        """Return the state of the estimation round of the game."""
+
+        return await self.backend.get_round_state(game)
+
+    async def set_round_state(self, game, state, from_states, session=None):
+        """
+        Move the estimation round of the game to `state` if it is in one of `from_states`.
+        A round starting to vote resets the votes in place and starts a new round in the
+        journal of the session. Return True if the round moved.
+        """
+
+        moved = await self.backend.set_round_state(game, state, from_states)
+        if moved and state == board_constants.VOTING_ROUND and self.journal is not None and session is not None:
+            await self.journal.new_round(session, await self.backend.get_current_ticket_id(game))
+        return moved
+
+    async def record_frame(self, game, group_name, type, data=None, encoded_data=None):
+        """
+        Stamp a frame broadcast to a group of the game with the next sequence number of
+        the game and keep it in the ring buffer of its last frames.
+        Return the sequence number and the text of the frame.
+        """
+
+        sequence = await self.backend.next_sequence(game)
+        text = encode_frame(type, data, encoded_data, sequence)
+        await self.backend.record_event(game, sequence, group_name, text)
+        return sequence, text
+
+    async def get_sequence(self, game):
+        """Return the sequence number of the last frame broadcast to the game."""
+
+        return await self.backend.get_sequence(game)
+
+    async def events_since(self, game, sequence, group_names):
+        """
+        Return the frames broadcast to the given groups of the game after the given
+        sequence number, or None when some of them are no longer buffered.
+        """
 
-        self.tickets[game] = list(tickets)
+        events = await self.backend.get_events(game, sequence)
+        if events is None:
+            return None
+        return [text for group_name, text in events if group_name in group_names]
 
-    def user_estimation(self, email, estimation, game):
-        """Store the estimation made by a user for a ticket."""
+    async def get_presence(self, game):
+        """Return the emails of the members connected to the game, on any worker."""
 
-        self.store[game][email] = estimation
-        return self.store[game]
+        return await self.backend.get_presence(game)
+
+    async def count_presence(self, game):
+        """Return the number of members connected to the game in O(1), on any worker."""
+
+        return await self.backend.count_presence(game)
+
+    async def discard_journal(self, session):
+        """Delete the vote journal of a session which ended."""
+
+        if self.journal is not None:
+            await self.journal.discard(session)
     
-    def final_estimation(self, ticket_id, game):
-        """Store the final estimation made by all users for a ticket in the database."""
+    def final_estimation(self, ticket_id, estimations):
+        """Build the estimations made by all users for a ticket to store them in the database."""
 
         user_estimations = [
             poker_ticket_models.PokerUserEstimation(
-                user_id=self.store_user_id[game][email], ticket_id=ticket_id, estimate=estimation
-            ) for email, estimation in self.store[game].items() if estimation != "not estimated"
+                user_id=user_id, ticket_id=ticket_id, estimate=estimation
+            ) for user_id, estimation in estimations
         ]
         return user_estimations
     
-    def ticket_analysis(self, game):
+    async def ticket_analysis(self, game, estimation_choices=()):
         """
-        Compute and return basic statistics about the ticket estimations.
+        Return the analysis of the ticket estimations.
 
-        This method is a class method, meaning it's called on the class object
-        rather than on an instance of the class. It uses the `self.store` class
-        attribute, which is a dictionary that stores the ticket estimations.
+        It reads the running aggregates the state backend keeps up to date on every
+        estimation, so the votes are never rescanned.
 
         If there are no ticket estimations, the method returns the string
         "TICKET IS NOT ESTIMATED BY ANYONE". Otherwise, it returns a dictionary
@@ -148,21 +259,244 @@ class WebScoketStore:
         - "min_ticket_estimation": the minimum estimation among all estimations
         - "max_ticket_estimation": the maximum estimation among all estimations
         - "avg_ticket_estimation": the average estimation among all estimations
+        - "median_ticket_estimation": the median estimation
+        - "standard_deviation": the population standard deviation of the estimations
+        - "consensus_percentage": the percentage of the votes given to the most chosen card
+        - "votes_count": the number of estimations
+        - "histogram": the number of votes of every estimation choice of the board
 
         Returns:
         --------
         Union[str, dict]: A string or a dictionary containing the ticket statistics.
         """
 
-        ticket_est = [e for e in list(self.store[game].values()) if isinstance(e, int)]
-        tikcet_statistics_analysis = {
-                board_constants.MIN_TICKET_ESTIMATION: min(ticket_est),
-                board_constants.MAX_TICKET_ESTIMATION: max(ticket_est),
-                board_constants.AVG_TICKET_ESTIMATION: statistics.mean(ticket_est)
-            } if len(ticket_est) else board_constants.NOBODY_TICKET_ESTIMATION
-        return tikcet_statistics_analysis
+        return (await self.backend.get_statistics(game)).analysis(estimation_choices)
     
 obj = WebScoketStore()
+ticket_loads = SingleFlight()
+session_lifecycle = SessionLifecycle(obj)
+local_fanout = LocalFanout(shared=not obj.backend.process_local)
+ticket_feed = TicketFeed()
+presence_tracker = PresenceTracker(obj.backend)
+
+
+def encode_frame(type, data=None, encoded_data=None, sequence=None):
+    """
+    Return the text of a websocket frame {"type": type, "data": data}, or
+    {"seq": sequence, "type": type, "data": data} when a sequence number is given.
+
+    `encoded_data` is the data already encoded to json, it is inserted as it is.
+    """
+
+    if encoded_data is None:
+        encoded_data = json.dumps(data)
+    if sequence is None:
+        return f'{{"type": {json.dumps(type)}, "data": {encoded_data}}}'
+    return f'{{"seq": {sequence}, "type": {json.dumps(type)}, "data": {encoded_data}}}'
+
+
+def encode_round(state, ticket_payload=None, data=None):
+    """
+    Return the json data of a `round` frame of the given state with the items of `data`,
+    the ticket is inserted as the json text kept by the store so it is not encoded again.
+    """
+
+    text = json.dumps({board_constants.ROUND_STATE: state, **(data or {})})
+    if ticket_payload is None:
+        return text
+    return f'{text[:-1]}, "{board_constants.TICKET}": {ticket_payload}}}'
+
+
+async def broadcast(group_name, type, data=None, handler=board_constants.BROADCAST_FRAME, game=None,
+                    encoded_data=None):
+    """
+    Send a frame encoded once to a group without a consumer instance, used by the timer
+    callbacks which must not depend on the connection that started the timer.
+    The frame is recorded in the events of the game when a game is given.
+    """
+
+    if game is None:
+        text = encode_frame(type, data, encoded_data)
+    else:
+        _, text = await obj.record_frame(game, group_name, type, data, encoded_data)
+    await local_fanout.group_send(group_name, {
+        'type': handler,
+        board_constants.TEXT: text,
+        board_constants.SENDER_CHANNEL_NAME: None
+    })
+
+
+async def broadcast_votes_delta(player_group, manager_group, votes, game=None):
+    """
+    Send the votes merged by `vote_coalescer` as one `votes_delta` frame per group.
+    Players get the emails of the members who voted, managers get the cards too.
+    Without a player group (large rooms) only managers get the votes.
+    """
+
+    if player_group is not None:
+        await broadcast(player_group, board_constants.VOTES_DELTA, [
+            {board_constants.EMAIL: vote[board_constants.EMAIL]} for vote in votes
+        ], game=game)
+    await broadcast(manager_group, board_constants.VOTES_DELTA, votes, game=game)
+
+
+async def broadcast_votes_aggregate(player_group, game, members):
+    """
+    Send the number of members who voted on the current ticket to every member of a
+    large room, read from the running aggregates of the votes.
+    """
+
+    voted = (await obj.backend.get_statistics(game)).count
+    await broadcast(player_group, board_constants.VOTES_AGGREGATE, {
+        board_constants.VOTED: voted, board_constants.MEMBERS: members
+    }, game=game)
+
+
+def game_groups(game):
+    """Return the names of the player group and the manager group of the game."""
+
+    return f'player_group{game}', f'manager_group{game}'
+
+
+async def broadcast_round(game, data=None, encoded_data=None):
+    """Send a `round` frame to the game after the votes still buffered by `vote_coalescer`."""
+
+    await vote_coalescer.flush(game)
+    player_group, _ = game_groups(game)
+    await broadcast(player_group, board_constants.ROUND, data, game=game, encoded_data=encoded_data)
+
+
+async def round_data(game, state, ticket_payload, estimation_choices):
+    """Return the json data of the `round` frame of a running round in the given state."""
+
+    if state != board_constants.REVEALED_ROUND:
+        return encode_round(state, ticket_payload)
+    return encode_round(state, ticket_payload, {
+        board_constants.VOTES: await obj.websocket_store(game),
+        board_constants.ANALYSIS: await obj.ticket_analysis(game, estimation_choices),
+    })
+
+
+async def start_round(game, session, from_states=board_constants.ROUND_STATES):
+    """
+    Start the estimation round of the current ticket if the round is in one of
+    `from_states`: the votes are reset in place, the timer of the previous round is
+    cancelled and one `round` frame carrying the ticket is broadcast. Ends the session
+    when no ticket is left.
+
+    The ticket is sent as the json text kept by the store, so it is not encoded again.
+    """
+
+    payload = await obj.get_current_ticket_payload(game)
+    if not payload:
+        await end_session(game, session)
+        return
+    if not await obj.set_round_state(game, board_constants.VOTING_ROUND, from_states, session=session):
+        return
+    timer_scheduler.cancel(game)
+    vote_coalescer.discard(game)
+    votes_aggregate_throttle.discard(game)
+    await broadcast_round(game, encoded_data=encode_round(board_constants.VOTING_ROUND, payload))
+
+
+async def reveal_round(game, estimation_choices):
+    """
+    Reveal the votes of a voting round with one `round` frame carrying the votes of
+    every member and their analysis, read once from the running aggregates.
+    Returns True if this call revealed the round.
+    """
+
+    if not await obj.set_round_state(game, board_constants.REVEALED_ROUND, (board_constants.VOTING_ROUND,)):
+        return False
+    await broadcast_round(game, encoded_data=await round_data(
+        game, board_constants.REVEALED_ROUND, await obj.get_current_ticket_payload(game), estimation_choices
+    ))
+    return True
+
+
+async def complete_round(game, session, estimation_choices, on_expire=None):
+    """
+    Complete a voting round of auto rounds, once every player voted or the timer
+    expired (`on_expire` then sends the expiry first): the round is revealed and, when
+    at least POKER_BOARD_CONSENSUS_PERCENTAGE percent of the votes are for the same
+    estimation according to the running aggregates, finalized with it through
+    `finalize_round`. Without consensus the manager finalizes the revealed round.
+
+    Only uses the store and the groups of the game, so the timer of the round completes
+    it once the connection which started the timer is gone.
+    """
+
+    if on_expire is not None:
+        await on_expire()
+    if not await reveal_round(game, estimation_choices):
+        return
+    estimation = (await obj.backend.get_statistics(game)).consensus(getattr(
+        settings, 'POKER_BOARD_CONSENSUS_PERCENTAGE', board_constants.DEFAULT_CONSENSUS_PERCENTAGE
+    ))
+    if estimation is not None:
+        await finalize_round(game, session, estimation)
+
+
+async def finalize_round(game, session, estimation):
+    """
+    Finalize a voting or revealed round with the given estimation: the ticket is saved
+    through `save_estimation`, one `round` frame with the estimation is broadcast and
+    the round of the next ticket starts. A round is finalized once, so a repeated
+    request does not pop the next ticket.
+    """
+
+    if not await obj.set_round_state(
+        game, board_constants.FINALIZED_ROUND, (board_constants.VOTING_ROUND, board_constants.REVEALED_ROUND)
+    ):
+        return
+    ticket_id = await save_estimation(game, session, estimation)
+    await broadcast_round(game, {
+        board_constants.ROUND_STATE: board_constants.FINALIZED_ROUND,
+        board_constants.ID: ticket_id,
+        board_constants.ESTIAMTION: estimation,
+    })
+    await start_round(game, session, (board_constants.FINALIZED_ROUND,))
+
+
+async def save_estimation(game, session, estimation):
+    """
+    Pop the current ticket together with its votes from the 'obj' and queue its final
+    estimation, with the 'is_estimated' flag set, and the users estimations to
+    `estimation_writer`, which writes them to the database in the background, so the
+    final estimation is broadcast without waiting for it.
+    Returns the id of the estimated ticket, or None when no ticket was left.
+    """
+
+    current_ticket, estimations = await obj.pop_ticket(game, session=session)
+    if current_ticket is None:
+        return None
+    ticket_id = current_ticket[board_constants.ID]
+    await estimation_writer.add(ticket_id, estimation, obj.final_estimation(ticket_id, estimations))
+    return ticket_id
+
+
+async def end_session(game, session):
+    """
+    Disable the board session of the game, write the queued final estimations, tear
+    down its state through `session_lifecycle` and close every connection to it.
+    """
+
+    timer_scheduler.cancel(game)
+    await vote_coalescer.flush(game)
+    await estimation_writer.flush()
+    await database_sync_to_async(BoardSession.objects.filter(id=session).update)(
+        is_active=False, updated_at=timezone.now()
+    )
+    await session_lifecycle.end(game)
+    presence_tracker.discard(game)
+    await obj.discard_journal(session)
+    player_group, manager_group = game_groups(game)
+    for group_name in (manager_group, player_group):
+        await local_fanout.group_send(group_name, {
+            'type': board_constants.SESSION_ENDED,
+            'data': 'disconnect',
+            board_constants.SENDER_CHANNEL_NAME: None
+        })
 
 
 class PokerBoardAsyncConsumer(AsyncJsonWebsocketConsumer):
@@ -173,29 +507,85 @@ class PokerBoardAsyncConsumer(AsyncJsonWebsocketConsumer):
     [1]. connect: Called when a client connects to the WebSocket and add to groups.
     [2]. disconnect: Called when a client disconnects from the WebSocket groups.
     [3]. is_manager: Return True if login user is pokerboard manager or not.
-    [4]. receive_json: Called when the consumer receives a JSON message from the client.
-    [5]. authentication_database_query: Require Database query for validate user is auth user or not.
-    [6]. save_estimation: Save manager estimation of Ticket to database.
-    [7]. ticket_database_query: Fetch Ticket from database and load to websocket store.
-    [8]. user_is_authenticated: Close connection if user is not connected.
-    [9]. timer: Start timer when game is started and same for all connected user.
-    [10]. decrement_timer: Call send message with type timer.
-    [11]. create_group: Create group in self instance.
-    [12]. add_channels_to_group: Add channels(user) to respective group.
-    [13]. send_group_message: Then sends the message to all the consumers that are currently subscribed.
-    [14]. discard_channel_from_group: The channel name of the client to remove from the group.
-    [15]. send_message: Used to send a message over the WebSocket connection.
-    [16]. estimate_card: Filter message data before send to connected channels.
-    [17]. manager_room: Send data on manager group.
-    [18]. users_estimation: Send users estimated data to all connected user.
-    [19]. final_estimation: Send manager final estimation choice to all connected user.
-    [20]. get_current_ticket: Return current ticket on which we are going to estimate.
-    [21]. end_game: Disconnect all user when event is fire from FE.
-    [22]. disable_session: call websocket_disconnect function
-    [23]. websocket_disconnect: Disconnect all user from given channels.
-    [24]. send_role: On Connection auth user's role send it to user.
-    [25]. ticket_analysis: Send Analysis data of Ticket(min, max , avg).
+    [4]. __call__: Send the messages of the connection through its bounded outbound queue.
+    [5]. receive_json: Route a JSON message of the client through the `event_handlers` table.
+    [6]. limit_message: Drop or defer a message over the rate limit of its event.
+    [7]. receive_deferred: Handle the last deferred message of an event.
+    [8]. passes_guard: Return True if the user passes the role guard of an event.
+    [9]. on_<event>: Handlers of the client events registered in `event_handlers`.
+    [10]. is_large_room: Return True if votes are sent to the room as throttled aggregates.
+    [11]. is_auto_rounds: Return True if rounds are revealed and finalized without the manager.
+    [12]. send_snapshot: Send the state of the game to a client which missed too many frames.
+    [13]. authentication_database_query: Require Database query for validate user is auth user or not.
+    [14]. admission_query: Single query returning session, board, manager, timer, role and members.
+    [15]. save_estimation: Save manager estimation of Ticket to database.
+    [16]. ticket_database_query: Fetch Ticket from database and load to websocket store.
+    [17]. load_tickets: Query Tickets once for all concurrent fetch requests of a game.
+    [18]. apply_ticket_change: Apply a published change of a ticket and broadcast the diff.
+    [19]. user_is_authenticated: Close connection if user is not connected.
+    [20]. timer: Start timer when game is started and same for all connected user.
+    [21]. timer_started: Send the deadline or count down locally for tick clients.
+    [22]. timer_expired: Send timer expiry to deadline clients.
+    [23]. create_group: Create group in self instance.
+    [24]. add_channels_to_group: Add channels(user) to respective group.
+    [25]. send_group_message: Then sends the message to all the consumers that are currently subscribed.
+    [26]. send_group_frame: Encode a frame once and send it to all the consumers of a group.
+    [27]. broadcast_frame: Send a frame encoded by the sender over the WebSocket connection.
+    [28]. discard_channel_from_group: The channel name of the client to remove from the group.
+    [29]. send_message: Used to send a message over the WebSocket connection.
+    [30]. get_current_ticket: Start the round of the current ticket or send the running round.
+    [31]. start_round: Reset the votes and broadcast the ticket of a new voting round.
+    [32]. reveal_round: Broadcast the votes and their analysis once per round.
+    [33]. complete_round: Reveal the round of auto rounds and finalize it on consensus.
+    [34]. finalize_round: Save the final estimation and start the round of the next ticket.
+    [35]. disable_session: Tear down the game and call session_ended function
+    [36]. session_ended: Disconnect all user from given channels.
+    [37]. join_presence: Count the user as present and send the members present.
+    [38]. start_heartbeat: Schedule the next heartbeat of the connection.
+    [39]. heartbeat: Ping the client or reap the connection once it missed too many pings.
+    [40]. reap: Close a connection which stopped answering and remove it from its groups.
+    [41]. send_role: On Connection auth user's role send it to user.
     '''
+    timer_tick_interval = board_constants.TIMER_TICK_IN_SECONDS
+    event_handlers = {
+        board_constants.START_TIMER: (board_constants.MANAGER_GUARD, 'on_start_timer'),
+        board_constants.SKIP_TICKET: (board_constants.MANAGER_GUARD, 'on_skip_ticket'),
+        board_constants.REORDER_TICKETS: (board_constants.MANAGER_GUARD, 'on_reorder_tickets'),
+        board_constants.JUMP_TO_TICKET: (board_constants.MANAGER_GUARD, 'on_jump_to_ticket'),
+        board_constants.USERS_ESTIMATION: (board_constants.MANAGER_GUARD, 'on_users_estimation'),
+        board_constants.FINAL_ESTIMATION: (board_constants.MANAGER_GUARD, 'on_final_estimation'),
+        board_constants.END_GAME: (board_constants.MANAGER_GUARD, 'on_end_game'),
+        board_constants.TICKET_ANALYSIS: (board_constants.MANAGER_GUARD, 'on_ticket_analysis'),
+        board_constants.FETCH_TICKET: (board_constants.ANY_GUARD, 'on_fetch_tickets'),
+        board_constants.GET_CURRENT_TICKET: (board_constants.ANY_GUARD, 'on_get_current_ticket'),
+        board_constants.CARD_SELECTED: (board_constants.PLAYER_GUARD, 'on_card_selected'),
+        board_constants.RESYNC: (board_constants.ANY_GUARD, 'on_resync'),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = RateLimiter(
+            getattr(settings, 'POKER_BOARD_EVENT_RATE_LIMITS', board_constants.EVENT_RATE_LIMITS)
+        )
+        self.deferred = {}
+        self.outbound = None
+        self.missed_heartbeats = 0
+        self.disconnected = False
+
+    async def __call__(self, scope, receive, send):
+        """
+        Run the consumer with its messages sent through a bounded `OutboundQueue`, so that
+        a slow client does not hold up the frames of the room and is disconnected once
+        POKER_BOARD_OUTBOUND_QUEUE_SIZE frames wait for it.
+        """
+
+        self.outbound = OutboundQueue(
+            send, getattr(settings, 'POKER_BOARD_OUTBOUND_QUEUE_SIZE', board_constants.OUTBOUND_QUEUE_SIZE)
+        )
+        try:
+            return await super().__call__(scope, receive, self.outbound.put)
+        finally:
+            self.outbound.close()
 
     async def connect(self):
         """
@@ -204,28 +594,49 @@ class PokerBoardAsyncConsumer(AsyncJsonWebsocketConsumer):
         This method first checks if the user is authenticated using `user_is_authenticated()`.
         It then creates a group using `create_group()`. If the user is a manager, the manager group
         is added to the group using `add_channels_to_group()`. The player group is always added to the
-        group using `add_channels_to_group()`. Finally, the user accepts the connection using `accept()`.
+        group using `add_channels_to_group()`. The connection is registered in `ticket_feed` for the
+        changes of the tickets of its board. Finally, the user accepts the connection using `accept()`,
+        the user is counted as present through `join_presence()` and the heartbeats of the
+        connection are started.
         """
 
-        await self.user_is_authenticated()  
+        if not await self.user_is_authenticated():
+            return
+        self.timer_mode = self.client_timer_mode()
         await self.create_group()
         if await self.is_manager():
             await self.add_channels_to_group(self.manager_group)
         await self.add_channels_to_group(self.player_group)
+        await ticket_feed.add(self.board_id, self)
         await self.accept()   
         await self.send_role()
+        await self.join_presence()
+        self.start_heartbeat()
     
     async def disconnect(self, code):
         """
         Disconnects the user from the application and removes the user 
         from any groups they may be a part of.
         
-from poker_ticket import 
         This method discards the player group from the group using `discard_channel_from_group()`.
         It also discards the manager group from the group using `discard_channel_from_group()`.
         The `code` parameter is the WebSocket close code that will be sent to the client.
+        A connection reaped by `heartbeat` is already disconnected when its socket closes.
         """
 
+        if self.disconnected:
+            return
+        self.disconnected = True
+        timer_scheduler.cancel(self.channel_name)
+        timer_scheduler.cancel(self.heartbeat_key())
+        for event in self.deferred:
+            timer_scheduler.cancel(self.deferred_key(event))
+        self.deferred.clear()
+        if not hasattr(self, 'player_group'):
+            return
+        session_lifecycle.disconnected(self.current_game)
+        await presence_tracker.left(self.current_game, self.scope[board_constants.USER].email)
+        await ticket_feed.discard(self.board_id, self)
         await self.discard_channel_from_group(self.player_group)
         await self.discard_channel_from_group(self.manager_group)
 
@@ -241,163 +652,508 @@ from poker_ticket import
             bool: True if the user is a manager, False otherwise.
         """
 
-        return self.scope[board_constants.USER] == self.pokerbaord_manager
+        return self.scope[board_constants.USER].id == self.pokerboard_manager_id
+
+    def parse_card(self, card):
+        """
+        Return the estimation of a selected card as a positive integer,
+        or None when the card is not a valid estimation or not a card of the board.
+        """
+
+        try:
+            estimation = int(card)
+        except (TypeError, ValueError):
+            return None
+        if self.estimation_choices and estimation not in self.estimation_choices:
+            return None
+        return estimation if 0 <= estimation <= board_constants.MAX_ESTIMATION else None
+
+    def parse_ticket_ids(self, ticket_ids):
+        """
+        Return the given ticket ids as integers, or None when they are not a list of ids.
+        """
+
+        try:
+            return [int(ticket_id) for ticket_id in ticket_ids]
+        except (TypeError, ValueError):
+            return None
+
+    def client_timer_mode(self):
+        """
+        Return the timer mode requested by the client in the `timer_mode` query param.
+
+        Clients which count down locally connect with `?timer_mode=deadline`, every
+        other client gets the legacy `timer` message each second.
+        """
+
+        query_string = parse_qs(self.scope.get('query_string', b'').decode())
+        timer_mode = query_string.get(board_constants.TIMER_MODE, [board_constants.TICK_TIMER_MODE])[0]
+        if timer_mode == board_constants.DEADLINE_TIMER_MODE:
+            return board_constants.DEADLINE_TIMER_MODE
+        return board_constants.TICK_TIMER_MODE
 
     async def receive_json(self, content):
+        """
+        Route a message of the client to the handler registered for its event in
+        `event_handlers`.
+
+        Messages of unknown events or of events whose role guard the user does not pass
+        are ignored, messages over the rate limit of their event go to `limit_message`.
+        Every handled message is timed in `event_metrics` under its event. Any message,
+        the `pong` answering a `ping` included, shows the connection is alive.
+        """
+
+        self.missed_heartbeats = 0
+        session_lifecycle.touch(self.current_game)
+        event = content.get(board_constants.EVENT)
+        handler = self.event_handlers.get(event)
+        if handler is None:
+            return
+        if not self.rate_limiter.allow(event):
+            self.limit_message(event, content)
+            return
+        guard, method_name = handler
+        if not await self.passes_guard(guard):
+            return
         content[board_constants.EMAIL] = self.scope[board_constants.USER].email
+        with event_metrics.timed(event):
+            await getattr(self, method_name)(content)
+
+    def limit_message(self, event, content):
+        """
+        Drop a message over the rate limit of its event, or defer it when the event is
+        one of POKER_BOARD_COALESCED_EVENTS: only the last deferred message of the event is
+        handled, once the event is allowed again.
+        """
+
+        if event not in getattr(settings, 'POKER_BOARD_COALESCED_EVENTS', board_constants.COALESCED_EVENTS):
+            flow_control_stats.dropped[event] += 1
+            return
+        flow_control_stats.coalesced[event] += 1
+        if event not in self.deferred:
+            timer_scheduler.start(
+                self.deferred_key(event), self.rate_limiter.wait_time(event),
+                on_expire=functools.partial(self.receive_deferred, event)
+            )
+        self.deferred[event] = content
+
+    def deferred_key(self, event):
+        """Return the scheduler key of the deferred message of an event of this connection."""
+        return f'{self.channel_name}:{event}'
+
+    async def receive_deferred(self, event):
+        """Handle the last message of an event deferred by `limit_message` once the event is allowed again."""
+        content = self.deferred.pop(event, None)
+        if content is not None:
+            await self.receive_json(content)
+
+    async def passes_guard(self, guard):
+        """Return True if the user may send the events of the given role guard."""
+
+        if guard == board_constants.MANAGER_GUARD:
+            return await self.is_manager()
+        if guard == board_constants.PLAYER_GUARD:
+            return self.role == board_constants.PLAYER
+        return True
+
+    async def on_start_timer(self, content):
+        await obj.set_timer(self.timer_count, self.current_game)
+        await self.timer()
+
+    async def on_skip_ticket(self, content):
+        await obj.skip_ticket(self.current_game)
+        await self.start_round()
+
+    async def on_reorder_tickets(self, content):
+        ticket_ids = self.parse_ticket_ids(content.get(board_constants.TICKETS))
+        if ticket_ids is None:
+            return
+        current_ticket = await obj.get_current_ticket_payload(self.current_game)
+        await obj.reorder_tickets(ticket_ids, self.current_game)
+        if await obj.get_current_ticket_payload(self.current_game) != current_ticket:
+            await self.start_round()
+
+    async def on_jump_to_ticket(self, content):
+        ticket_ids = self.parse_ticket_ids([content.get(board_constants.ID)])
+        if ticket_ids is not None and await obj.jump_to_ticket(ticket_ids[0], self.current_game):
+            await self.start_round()
+
+    async def on_users_estimation(self, content):
+        await self.reveal_round()
+
+    async def on_final_estimation(self, content):
+        try:
+            estimation = int(content.get(board_constants.ESTIAMTION))
+        except (TypeError, ValueError):
+            return
+        if 0 <= estimation <= board_constants.MAX_ESTIMATION:
+            await self.finalize_round(estimation)
+
+    async def on_end_game(self, content):
+        await self.disable_session()
+
+    async def on_ticket_analysis(self, content):
+        await self.reveal_round()
+
+    async def on_fetch_tickets(self, content):
+        await self.ticket_database_query()
+
+    async def on_get_current_ticket(self, content):
+        await self.get_current_ticket()
+
+    async def on_card_selected(self, content):
+        content[board_constants.CARD] = self.parse_card(content.get(board_constants.CARD))
+        if content[board_constants.CARD] is None:
+            return
+        if await obj.get_round_state(self.current_game) != board_constants.VOTING_ROUND:
+            return
+        await obj.user_estimation(
+            content[board_constants.EMAIL], self.scope[board_constants.USER].id,
+            content[board_constants.CARD], self.current_game, session=self.session
+        )
+        large_room = self.is_large_room()
+        if large_room:
+            votes_aggregate_throttle.schedule(
+                self.current_game,
+                getattr(settings, 'POKER_BOARD_VOTES_AGGREGATE_INTERVAL',
+                        board_constants.VOTES_AGGREGATE_INTERVAL_IN_SECONDS),
+                functools.partial(
+                    broadcast_votes_aggregate, self.player_group, self.current_game, len(self.game_members)
+                )
+            )
+        window = getattr(
+            settings, 'POKER_BOARD_VOTE_COALESCING_WINDOW', board_constants.VOTE_COALESCING_WINDOW_IN_SECONDS
+        )
+        if window:
+            await self.send_message(board_constants.CARD_SELECTED, content)
+            vote_coalescer.add(
+                self.current_game, content[board_constants.EMAIL], content, window,
+                functools.partial(
+                    broadcast_votes_delta, None if large_room else self.player_group, self.manager_group,
+                    game=self.current_game
+                )
+            )
+        elif large_room:
+            await self.send_message(board_constants.CARD_SELECTED, content)
+            await self.send_group_frame(
+                self.manager_group, board_constants.CARD_SELECTED_BY_PLAYER_FOR_MANAGER, content
+            )
+        else:
+            await self.send_group_frame(
+                self.player_group, board_constants.CARD_SELECTED_BY_PLAYER,
+                {board_constants.EMAIL: content[board_constants.EMAIL]},
+                sender_type=board_constants.CARD_SELECTED, sender_data=content
+            )
+            await self.send_group_frame(
+                self.manager_group, board_constants.CARD_SELECTED_BY_PLAYER_FOR_MANAGER, content
+            )
+        if self.is_auto_rounds() and \
+                (await obj.backend.get_statistics(self.current_game)).count >= self.player_count:
+            await self.complete_round()
+
+    def is_large_room(self):
+        """
+        Return True when the board has at least POKER_BOARD_LARGE_ROOM_SIZE members. In a
+        large room only managers get a frame per vote, the other members get the number of
+        members who voted at most once per POKER_BOARD_VOTES_AGGREGATE_INTERVAL seconds.
+        """
+
+        return len(self.game_members) >= getattr(
+            settings, 'POKER_BOARD_LARGE_ROOM_SIZE', board_constants.LARGE_ROOM_SIZE
+        )
+
+    def is_auto_rounds(self):
+        """
+        Return True when POKER_BOARD_AUTO_ROUNDS is set: a round is revealed once every
+        player voted or the timer expired, and finalized right away on consensus, so the
+        manager only has to step in when the players disagree.
+        """
+
+        return getattr(settings, 'POKER_BOARD_AUTO_ROUNDS', board_constants.AUTO_ROUNDS)
+
+    async def on_resync(self, content):
+        """
+        Send a reconnecting client the frames it missed since the sequence number it saw
+        last, or a snapshot of the game when they are no longer buffered. Nothing is sent
+        to the rest of the room.
+        """
+
+        try:
+            sequence = int(content.get(board_constants.SEQUENCE))
+        except (TypeError, ValueError):
+            sequence = -1
+        group_names = [self.player_group]
         if await self.is_manager():
-            if content[board_constants.EVENT] == board_constants.START_TIMER:
-                obj.set_timer(self.timer_count, self.current_game)
-                if obj.get_timer_task(self.current_game) != '':
-                    obj.get_timer_task(self.current_game).cancel()
-                obj.set_timer_task(self.current_game, asyncio.create_task(self.timer()))
-            elif content[board_constants.EVENT] == board_constants.SKIP_TICKET:
-                obj.skip_ticket(self.current_game)
-            elif content[board_constants.EVENT] == board_constants.USERS_ESTIMATION:
-                await self.send_group_message(board_constants.USERS_ESTIMATION, self.player_group, content)
-            elif content[board_constants.EVENT] == board_constants.FINAL_ESTIMATION:
-                await self.save_estimation(content[board_constants.ESTIAMTION])
-                await self.send_group_message(board_constants.FINAL_ESTIMATION, self.player_group, content)
-            elif content[board_constants.EVENT] == board_constants.END_GAME:
-                await self.send_group_message(board_constants.END_GAME, self.player_group, content)
-            elif content[board_constants.EVENT] == board_constants.TICKET_ANALYSIS:
-                await self.send_group_message(board_constants.TICKET_ANALYSIS, self.player_group, content)
-        
-        if content[board_constants.EVENT] == board_constants.FETCH_TICKET:
-            await self.ticket_database_query()
-        elif content[board_constants.EVENT] == board_constants.GET_CURRENT_TICKET:
-            await self.send_group_message(board_constants.GET_CURRENT_TICKET, self.player_group, 
-                obj.get_current_ticket(self.current_game)
-            )   
-        elif content[board_constants.EVENT] == board_constants.CARD_SELECTED and self.role == board_constants.PLAYER:
-            obj.user_estimation(content[board_constants.EMAIL], content[board_constants.CARD], self.current_game)
-            await self.send_group_message(board_constants.ESTIMATED_CARD, self.player_group, content)
-            await self.send_group_message(board_constants.MANAGER_ROOM, self.manager_group, content)
+            group_names.append(self.manager_group)
+        frames = await obj.events_since(self.current_game, sequence, group_names) if sequence >= 0 else None
+        if frames is None:
+            await self.send_snapshot()
+            return
+        for text in frames:
+            await self.send(text_data=text)
+
+    async def send_snapshot(self):
+        """
+        Send the state of the game as one `snapshot` frame carrying the sequence number of
+        the last frame, the state of the round, the current ticket, the votes (only who
+        voted for players until the round is revealed), the members present and the
+        seconds left on the timer.
+        """
+
+        await vote_coalescer.flush(self.current_game)
+        sequence = await obj.get_sequence(self.current_game)
+        state = await obj.get_round_state(self.current_game)
+        snapshot = {
+            board_constants.ROUND: state,
+            board_constants.TICKET: await obj.get_current_ticket(self.current_game),
+        }
+        votes = await obj.websocket_store(self.current_game)
+        if state == board_constants.REVEALED_ROUND or await self.is_manager():
+            snapshot[board_constants.VOTES] = votes
+        else:
+            snapshot[board_constants.VOTED] = [
+                email for email, estimation in votes.items() if estimation != board_constants.NOT_ESTIMATED
+            ]
+        snapshot[board_constants.PRESENT] = await obj.get_presence(self.current_game)
+        remaining_time = timer_scheduler.remaining(self.current_game)
+        snapshot[board_constants.REMAINING_TIME] = round(remaining_time) if remaining_time is not None else None
+        await self.send(text_data=encode_frame(board_constants.SNAPSHOT, snapshot, sequence=sequence))
 
     async def authentication_database_query(self):
         """
         Queries the database to authenticate the WebSocket client.
         
-        This method queries the database to authenticate the WebSocket 
-        client using the 'id' key from the 'url_route' dictionary in 
-        the 'scope' attribute of the current instance. It retrieves the
-        BoardSession object corresponding to the given ID and its associated members, 
-        and checks if the current user is a member of the board. It also retrieves 
-        the board's manager and the timer count for the current session. 
-        The results of the database queries are stored in various
-        attributes of the current instance for later use.
-        """
-
-        self.session = self.scope['url_route']['kwargs']['id']
-        self.game_session = await database_sync_to_async(
-            BoardSession.objects.get
-        )(id = self.session)
-        self.game_members = await database_sync_to_async(
-            self.game_session.board.users.values
-        )('id', 'email')
-        self.is_user_member_of_pokerboard = await database_sync_to_async(
-            self.game_members.filter
-        )(email = self.scope[board_constants.USER].email)
-        self.poker_role_instance = await database_sync_to_async(
-            self.game_session.board.pokerrole_set.get)(user = self.scope[board_constants.USER]
-        )
-        
-        self.current_game = board_constants.POKERBOARD + str(self.game_session.board.id) + board_constants.SESSION + str(self.game_session.id) 
-        self.role = self.poker_role_instance.role
-        self.pokerbaord_manager = self.game_session.board.manager
-        self.timer_count = self.game_session.timer
+        The session id is read from the 'url_route' dictionary in the 'scope' attribute
+        of the current instance. The admission data of the session for the current user
+        (see `admission_query`) is read from `admission_cache` or queried in one round trip
+        and cached, so that reconnects within the cache ttl do not query the database.
+        The results are stored in various attributes of the current instance for later use.
 
-    async def save_estimation(self, estimation):
+        Returns:
+            bool: True if the session exists and the user is a member of its board.
+        """
+
+        self.session = int(self.scope['url_route']['kwargs']['id'])
+        user = self.scope[board_constants.USER]
+        cache_key = (self.session, user.id)
+        admission = admission_cache.get(cache_key)
+        if admission is None:
+            admission = await database_sync_to_async(self.admission_query)(self.session, user.id)
+            if admission is None or admission[board_constants.ROLE] is None:
+                return False
+            admission_cache.set(cache_key, admission)
+
+        self.board_id = admission['board_id']
+        self.current_game = board_constants.POKERBOARD + str(self.board_id) + board_constants.SESSION + str(self.session)
+        self.role = admission[board_constants.ROLE]
+        self.pokerboard_manager_id = admission['board__manager_id']
+        self.timer_count = admission['timer']
+        self.player_count = admission[board_constants.PLAYER_COUNT]
+        self.estimation_choices = [
+            choice for choice in admission['board__estimation_choices'] or () if choice is not None
+        ]
+        self.game_members = [
+            {board_constants.ID: user_id, board_constants.EMAIL: email}
+            for user_id, email in zip(admission['member_ids'], admission['member_emails'])
+        ]
+        return True
+
+    def admission_query(self, session_id, user_id):
+        """
+        Return the admission data of a board session for a user in a single query, or None
+        when the session does not exist.
+
+        The returned dict holds the session id, board id, manager id, estimation choices, timer, the role of the
+        user on the board (None when the user is not a member), the number of players of
+        the board and the ids and emails of the board members ordered by id.
         """
-        Saves the estimation for the current ticket to the database.
 
-        This method retrieves the current ticket from the 'obj' and updates 
-        its estimation details with the provided board_constants.ESTIAMTION. It then sets the 
-        'is_estimated' flag to True for the current ticket and saves the changes to the 
-        database. Finally, it updates the 'obj' with the final estimation 
-        details of the current ticket. The method does not return anything.
+        role = PokerRole.objects.filter(poker_id=OuterRef('board_id'), user_id=user_id).values('role')[:1]
+        players = PokerRole.objects.filter(
+            poker_id=OuterRef('board_id'), role=board_constants.PLAYER
+        ).order_by().values('poker_id').annotate(count=Count('id')).values('count')
+        return BoardSession.objects.filter(id=session_id).annotate(
+            role=Subquery(role),
+            player_count=Coalesce(Subquery(players), 0),
+            member_ids=ArrayAgg('board__users__id', ordering='board__users__id'),
+            member_emails=ArrayAgg('board__users__email', ordering='board__users__id'),
+        ).values(
+            'id', 'board_id', 'board__manager_id', 'board__estimation_choices', 'timer', board_constants.ROLE,
+            board_constants.PLAYER_COUNT, 'member_ids', 'member_emails'
+        ).first()
+
+    async def save_estimation(self, estimation):
+        """
+        Saves the estimation for the current ticket to the database in the background,
+        see the `save_estimation` function. Returns the id of the estimated ticket, or
+        None when no ticket was left.
         
         Args:
             estimation: The final estimation value for the current ticket.
         """
 
-        current_ticket = obj.tickets[self.current_game].pop(0)
-        current_ticket.is_estimated = True
-        current_ticket.final_estimation = estimation
-        await database_sync_to_async(current_ticket.save)()
-        user_estimations = obj.final_estimation(current_ticket.id, self.current_game)
-        await database_sync_to_async(
-            poker_ticket_models.PokerUserEstimation.objects.bulk_create
-        )(user_estimations)
+        return await save_estimation(self.current_game, self.session, estimation)
 
     async def ticket_database_query(self):
         """
-        Queries the database to retrieve the tickets for the current session.
+        Loads the tickets of the current session from the database once.
 
-        This method queries the database to retrieve all the poker tickets associated 
-        with the current board session. The retrieved tickets are then passed to the 
-        'load_database_tickets()' method of the 'obj' to update the store 
-        with the latest tickets. The method does not return anything.
+        The tickets are queried only when the store does not hold them yet, and concurrent
+        requests of the same game share one in-flight query through `ticket_loads`, so
+        the skip order of the queue is kept and a room joining at once costs one query.
+        The method does not return anything.
         """
 
-        self.ticket = await database_sync_to_async(
-            self.game_session.board.poker_ticket.filter
-        )(is_estimated=False)
-        
-        obj.load_database_tickets(self.ticket, self.current_game)
+        if await obj.tickets_loaded(self.current_game):
+            return
+        await ticket_loads.do(self.current_game, self.load_tickets)
+
+    async def load_tickets(self):
+        """
+        Query the tickets of the current session and load them to the store, once the
+        pending final estimations are written so estimated tickets are not queued again.
+        """
+
+        if await obj.tickets_loaded(self.current_game):
+            return
+        await estimation_writer.flush()
+        tickets = await database_sync_to_async(self.serialized_tickets)()
+        await obj.load_database_tickets(tickets, self.current_game, session=self.session)
+
+    def serialized_tickets(self):
+        """
+        Return the not estimated tickets of the board as json compatible dicts,
+        so that they can be kept by any state backend.
+        """
+
+        tickets = poker_ticket_models.Ticket.objects.filter(
+            pokerboard_id=self.board_id, is_estimated=False
+        ).prefetch_related('user_estimation')
+        return json.loads(json.dumps(
+            poker_ticket_serializers.UserTicketEstimationSerializer(tickets, many=True).data
+        ))
         
+    async def apply_ticket_change(self, ticket_id, ticket):
+        """
+        Apply a change of a ticket of the board published through `ticket_feed` to the
+        tickets of the game, and broadcast only the changed ticket as a `ticket_changed`
+        frame, so that a ticket edited, created or deleted during the session does not
+        require a reload of every ticket. A change which leaves the tickets as they are,
+        e.g. one already applied by another worker sharing the game, is not broadcast.
+        Removing the current ticket starts the round of the next one.
+        """
+
+        current_ticket = await obj.get_current_ticket(self.current_game)
+        operation = await obj.change_ticket(ticket_id, ticket, self.current_game)
+        if operation is None:
+            return
+        data = {board_constants.OPERATION: operation, board_constants.ID: ticket_id}
+        if ticket is not None:
+            data[board_constants.TICKET] = ticket
+        await self.send_group_frame(self.player_group, board_constants.TICKET_CHANGED, data)
+        if operation == board_constants.REMOVED_TICKET and current_ticket[board_constants.ID] == ticket_id and \
+                await obj.get_current_ticket_payload(self.current_game):
+            await self.start_round()
+
     async def user_is_authenticated(self):
         """
         Checks if the user is authenticated and a member of the current board session.
 
-        This method first checks if the user is authenticated. If the user is not authenticated,
-        the method closes the WebSocket connection by calling the 'close()' method. 
-        Next, the method calls the 'authentication_database_query()' method to retrieve information
-        about the current board session and its members. If the user is not a member of the current 
-        board session, the method closes the WebSocket connection.
+        This method first checks if the user is authenticated, then calls the
+        'authentication_database_query()' method to retrieve information about the current
+        board session and its members. If the user is not authenticated or not a member of the
+        current board session, the method closes the WebSocket connection.
         Finally, the method initializes the WebSocketStore with the retrieved member data using the
-        'initial_data()' method of the 'obj'. 
-        The method does not return anything.
+        'create_game_instance()' method of the 'obj'. 
+        Returns True when the connection is accepted.
         """
 
-        if not self.scope[board_constants.USER].is_authenticated:
-            await self.close() 
-        await self.authentication_database_query()
-        if not self.is_user_member_of_pokerboard.exists():
+        if not self.scope[board_constants.USER].is_authenticated or \
+                not await self.authentication_database_query():
             await self.close()
-        
-        obj.create_game_instance(self.current_game, self.timer_count, self.game_members)
+            return False
+
+        await obj.create_game_instance(self.current_game, self.timer_count, self.game_members)
+        await session_lifecycle.connected(self.current_game)
+        return True
         
     async def timer(self):  
         """
-        An async method that implements a timer functionality for a WebSocket connection. 
-        The timer is implemented using a while loop that will continue running as long as 
-        the remaining time is greater than zero. The timer updates and broadcasts the remaining 
-        time to the WebSocket connection's player group after every second using the
-        `send_group_message` method. Additionally, the `obj.update_timer()` method 
-        is called to decrement the remaining time by 1 second.
+        Start timer when game is started and same for all connected user.
+
+        The timer is driven by the process wide `timer_scheduler` and its callbacks only
+        use the channel layer, so the timer keeps running when the manager disconnects and
+        restarting it replaces the running one.
+
+        With POKER_BOARD_TIMER_MODE set to 'deadline' (the default) a `timer_started` event
+        carrying the deadline is broadcast now and a `timer_expired` event at the deadline.
+        With 'tick' the remaining time is broadcast as `timer` every second. In auto rounds
+        the round is completed once the timer expired by the `complete_round` function,
+        keyed on the game and session only.
         """
 
-        while obj.get_timer(self.current_game) >= 0:
-            await asyncio.sleep(1)
-            await self.send_group_message('timer_update', self.player_group, 
-                                          obj.get_timer(self.current_game)
+        player_group = self.player_group
+        auto_round = functools.partial(complete_round, self.current_game, self.session, self.estimation_choices)
+        if getattr(settings, 'POKER_BOARD_TIMER_MODE', board_constants.DEADLINE_TIMER_MODE) == \
+                board_constants.TICK_TIMER_MODE:
+            on_expire = functools.partial(broadcast, player_group, board_constants.TIMER, 0)
+            timer_scheduler.start(
+                self.current_game, self.timer_count,
+                on_expire=functools.partial(auto_round, on_expire) if self.is_auto_rounds() else on_expire,
+                on_tick=functools.partial(broadcast, player_group, board_constants.TIMER),
+                tick_interval=self.timer_tick_interval
             )
-            obj.decrement_timer(self.current_game)
+            return
+
+        server_time = time.time()
+        on_expire = functools.partial(
+            broadcast, player_group, board_constants.TIMER_EXPIRED, {},
+            handler=board_constants.TIMER_EXPIRED, game=self.current_game
+        )
+        if self.is_auto_rounds():
+            on_expire = functools.partial(auto_round, on_expire)
+        timer_scheduler.start(self.current_game, self.timer_count, on_expire=on_expire)
+        data = {
+            board_constants.DEADLINE: int((server_time + self.timer_count) * 1000),
+            board_constants.DURATION: self.timer_count,
+            board_constants.SERVER_TIME: int(server_time * 1000),
+        }
+        _, text = await obj.record_frame(self.current_game, player_group, board_constants.TIMER_STARTED, data)
+        await local_fanout.group_send(player_group, {
+            'type': board_constants.TIMER_STARTED,
+            board_constants.DATA: data,
+            board_constants.TEXT: text,
+            board_constants.SENDER_CHANNEL_NAME: self.channel_name
+        })
 
-    async def timer_update(self, event):
+    async def timer_started(self, event):
         """
-        A WebSocket event handler that sends the updated timer value to the client.
+        A WebSocket event handler for the start of a deadline timer.
 
-        Parameters:
-        - event (dict): A dictionary containing the event data. It should have a board_constants.DATA key
-        that contains the updated timer value.
+        Deadline clients get the deadline once, as the frame encoded by the sender. Tick
+        clients get a `timer` message every second from a timer of this connection in
+        `timer_scheduler`, so that nothing is broadcast per second.
+        """
 
-        Returns:
-        - None
+        if self.timer_mode == board_constants.DEADLINE_TIMER_MODE:
+            await self.send(text_data=event[board_constants.TEXT])
+        else:
+            timer_scheduler.start(
+                self.channel_name,
+                event[board_constants.DATA][board_constants.DEADLINE] / 1000 - time.time(),
+                on_expire=functools.partial(self.send_message, board_constants.TIMER, 0),
+                on_tick=functools.partial(self.send_message, board_constants.TIMER),
+                tick_interval=self.timer_tick_interval
+            )
+
+    async def timer_expired(self, event):
+        """
+        A WebSocket event handler that sends the expiry of the timer to deadline clients.
+        Tick clients receive their last `timer` message from the timer of their connection.
         """
 
-        await self.send_message('timer', event[board_constants.DATA])
+        if self.timer_mode == board_constants.DEADLINE_TIMER_MODE:
+            await self.send(text_data=event[board_constants.TEXT])
 
     async def create_group(self):
         """
@@ -405,12 +1161,11 @@ from poker_ticket import
         a player group and a manager group.
         """
         
-        self.player_group = f'player_group{self.current_game}'
-        self.manager_group = f'manager_group{self.current_game}'
+        self.player_group, self.manager_group = game_groups(self.current_game)
 
     async def add_channels_to_group(self, group_name):
         """
-        Asynchronously adds the current channel to the specified group in the channel layer.
+        Asynchronously adds the current channel to the specified group through `local_fanout`.
         Arguments:
         - group_name (str): The name of the group to which the channel needs to be added.
 
@@ -418,10 +1173,7 @@ from poker_ticket import
         - Coroutine object representing the result of the group add operation.
         """
 
-        return await self.channel_layer.group_add(
-            group_name,
-            self.channel_name
-        )
+        return await local_fanout.add(group_name, self)
     
     async def send_group_message(self, type, group_name, data):
         """
@@ -437,7 +1189,7 @@ from poker_ticket import
         A coroutine that sends the message to all channels in the group.
         """
 
-        return await self.channel_layer.group_send(
+        return await local_fanout.group_send(
             group_name,
             {
                 'type': type,
@@ -446,6 +1198,46 @@ from poker_ticket import
             }
         )
     
+    async def send_group_frame(self, group_name, type, data=None, encoded_data=None,
+                               sender_type=None, sender_data=None):
+        """
+        Send a frame to all channels in a group, the frame is encoded to json once here
+        instead of once per receiving consumer.
+
+        Args:
+
+        group_name: A string representing the name of the group to send the frame to.
+        type: A string representing the type of the frame.
+        data: The data payload of the frame.
+        encoded_data: The data payload already encoded to json, used instead of data.
+        sender_type, sender_data: When given, the sending channel gets a frame of this type
+        and data instead of the one sent to the group.
+
+        Votes of the game still buffered by `vote_coalescer` are sent first.
+        """
+
+        await vote_coalescer.flush(self.current_game)
+        sequence, text = await obj.record_frame(self.current_game, group_name, type, data, encoded_data)
+        message = {
+            'type': board_constants.BROADCAST_FRAME,
+            board_constants.TEXT: text,
+            board_constants.SENDER_CHANNEL_NAME: self.channel_name
+        }
+        if sender_type is not None:
+            message[board_constants.SENDER_TEXT] = encode_frame(sender_type, sender_data, sequence=sequence)
+        return await local_fanout.group_send(group_name, message)
+
+    async def broadcast_frame(self, event):
+        """
+        A WebSocket event handler that sends a frame encoded by the sender as it is.
+        """
+
+        if board_constants.SENDER_TEXT in event and \
+                event[board_constants.SENDER_CHANNEL_NAME] == self.channel_name:
+            await self.send(text_data=event[board_constants.SENDER_TEXT])
+        else:
+            await self.send(text_data=event[board_constants.TEXT])
+    
     async def discard_channel_from_group(self, group_name):
         """
         This function removes the channel associated with the current WebSocket consumer instance 
@@ -455,10 +1247,7 @@ from poker_ticket import
 
         group_name (str): The name of the group to remove the channel from.
         """
-        return await self.channel_layer.group_discard(
-            group_name,
-            self.channel_name
-        )
+        return await local_fanout.discard(group_name, self)
     
     async def send_message(self, type, data):
         """
@@ -474,77 +1263,61 @@ from poker_ticket import
             'data': data
         })
 
-    async def estimate_card(self, event):
+    async def get_current_ticket(self):
         """
-        This function estimate_card is an asynchronous function that takes an event as a parameter. 
-        The event is a dictionary that contains information about the estimation of a card by a player. 
-        This function checks if the sender_channel_name of the event matches the current channel_name of 
-        the player. If they match, the function sends a message to the player informing that their card 
-        has been selected. If the names do not match, the function sends a message to the player that 
-        shows which other player selected a card. The function does not return any value.
+        Start the round of the current ticket when none is running, otherwise send the
+        `round` frame of the running round to the requesting client only, so a client
+        joining or reloading does not cause a broadcast to the room.
         """
 
-        if event[board_constants.SENDER_CHANNEL_NAME] == self.channel_name:
-            await self.send_message(board_constants.CARD_SELECTED, event[board_constants.DATA])
-        else:
-            await self.send_message(board_constants.CARD_SELECTED_BY_PLAYER, { "email" : event[board_constants.DATA][board_constants.EMAIL] })
+        state = await obj.get_round_state(self.current_game)
+        if state in (board_constants.IDLE_ROUND, board_constants.FINALIZED_ROUND):
+            await self.start_round((board_constants.IDLE_ROUND, board_constants.FINALIZED_ROUND))
+            return
+        payload = await obj.get_current_ticket_payload(self.current_game)
+        await self.send(text_data=encode_frame(board_constants.ROUND, encoded_data=await round_data(
+            self.current_game, state, payload, self.estimation_choices
+        )))
 
-    async def manager_room(self, event):
-        """
-        Sends a message to the current WebSocket client with type `card_selected_by_player_for_manager` 
-        and the data from the `event` parameter. The message contains information about a card selection 
-        made by a player and is intended for the manager of the poker game to see.
-        """
+    async def start_round(self, from_states=board_constants.ROUND_STATES):
+        """Start the round of the current ticket of the game, see the `start_round` function."""
 
-        await self.send_message(board_constants.CARD_SELECTED_BY_PLAYER_FOR_MANAGER, event[board_constants.DATA])
+        await start_round(self.current_game, self.session, from_states)
 
-    async def users_estimation(self, event):
+    async def reveal_round(self, resend=True):
         """
-        Sends a WebSocket message to the connected client with the estimation data of all users.
-
-        Args:
-            event: A dictionary that is not used in the method body.
-
-        Returns:
-            None.
-        """
-                
-        await self.send_message(board_constants.USERS_ESTIMATION, obj.websocket_store(self.current_game))
-
-    async def final_estimation(self, event):
+        Reveal the votes of a voting round, see the `reveal_round` function. Once the
+        round is revealed, the frame is only sent again to the requesting client, unless
+        `resend` is False. Returns True if this call revealed the round.
         """
-        Asynchronously sends a message of type board_constants.FINAL_ESTIMATION to the WebSocket consumer.
-
-        Parameters:
-        - event (Dict[str, Any]): A dictionary containing the final estimation data.
 
-        Returns:
-        - None
-        """
+        if await reveal_round(self.current_game, self.estimation_choices):
+            return True
+        if resend and await obj.get_round_state(self.current_game) == board_constants.REVEALED_ROUND:
+            await self.send(text_data=encode_frame(board_constants.ROUND, encoded_data=await round_data(
+                self.current_game, board_constants.REVEALED_ROUND,
+                await obj.get_current_ticket_payload(self.current_game), self.estimation_choices
+            )))
+        return False
 
-        await self.send_message(board_constants.FINAL_ESTIMATION, event[board_constants.DATA])
+    async def complete_round(self):
+        """Complete the voting round of auto rounds, see the `complete_round` function."""
 
-    async def get_current_ticket(self, event):
-        """
-        Send the current ticket details to the client.
+        await complete_round(self.current_game, self.session, self.estimation_choices)
 
-        Parameters:
-            - event: A dictionary containing the WebSocket event data.
+    async def finalize_round(self, estimation):
+        """Finalize the round with the estimation of the manager, see the `finalize_round` function."""
 
-        Returns:
-            None
-        """
-        if not event[board_constants.DATA]:
-            await self.disable_session()
-        else:
-            await self.send_message(board_constants.GET_CURRENT_TICKET, event[board_constants.DATA])
+        await finalize_round(self.current_game, self.session, estimation)
 
-    async def end_game(self, event):
+    async def disable_session(self):
         """
-        A coroutine function that ends the current game session.
+        A coroutine function that disables the current game session, writes the queued
+        final estimations, tears down its state through `session_lifecycle` and closes
+        every connection to it, see the `end_session` function.
 
         Args:
-            event: A dictionary that contains the event data.
+            None.
 
         Returns:
             None.
@@ -552,40 +1325,76 @@ from poker_ticket import
         Raises:
             None.
         """
-        await self.disable_session()
 
-    async def disable_session(self):
+        await end_session(self.current_game, self.session)
+
+    async def session_ended(self, event):
         """
-        A coroutine function that disables the current game session.
+        Called on every connection of a session which ended. This method closes the
+        WebSocket by calling the `close` method, `disconnect` runs once it is closed.
 
         Args:
-            None.
+            event: A dictionary containing information about the event.
 
         Returns:
             None.
+        """
+        await self.close()
 
-        Raises:
-            None.
+    async def join_presence(self):
+        """
+        Count the user as present through `presence_tracker` and send the connection the
+        members present as a `presence` frame {"present": [...]}. The room gets the joins
+        and leaves as debounced `presence` frames {"joined": [...], "left": [...]}.
         """
 
-        self.game_session.is_active=False
-        await database_sync_to_async(self.game_session.save)()
-        await self.send_group_message('websocket_disconnect', self.manager_group, 'disconnect')
-        await self.send_group_message('websocket_disconnect', self.player_group, 'disconnect')
+        await presence_tracker.joined(
+            self.current_game, self.scope[board_constants.USER].email,
+            functools.partial(broadcast, self.player_group, board_constants.PRESENCE, game=self.current_game)
+        )
+        await self.send_message(board_constants.PRESENCE, {
+            board_constants.PRESENT: await obj.get_presence(self.current_game)
+        })
 
-    async def websocket_disconnect(self, event):
+    def heartbeat_key(self):
+        """Return the scheduler key of the heartbeat of this connection."""
+        return f'{self.channel_name}:{board_constants.HEARTBEAT}'
+
+    def start_heartbeat(self):
+        """
+        Schedule the next heartbeat of the connection in POKER_BOARD_HEARTBEAT_INTERVAL
+        seconds on `timer_scheduler`, an interval of 0 disables the heartbeats.
         """
-        Called when a WebSocket connection is closed. This method closes the WebSocket
-        channel by calling the `close` method.
 
-        Args:
-            event: A dictionary containing information about the disconnection event.
-                This dictionary may contain additional keys depending on the event.
+        interval = getattr(settings, 'POKER_BOARD_HEARTBEAT_INTERVAL', board_constants.HEARTBEAT_INTERVAL_IN_SECONDS)
+        if interval:
+            timer_scheduler.start(self.heartbeat_key(), interval, on_expire=self.heartbeat)
 
-        Returns:
-            None.
+    async def heartbeat(self):
+        """
+        Send the client a `ping` frame, it answers with a `pong` event. A connection which
+        sent no message since the last POKER_BOARD_MISSED_HEARTBEATS pings is reaped.
         """
-        await self.close()
+
+        if self.disconnected:
+            return
+        if self.missed_heartbeats >= getattr(settings, 'POKER_BOARD_MISSED_HEARTBEATS', board_constants.MISSED_HEARTBEATS):
+            await self.reap()
+            return
+        self.missed_heartbeats += 1
+        self.start_heartbeat()
+        await self.send_message(board_constants.PING, None)
+
+    async def reap(self):
+        """
+        Remove a connection which stopped answering from its groups right away, so that
+        the broadcasts of the room stop queueing up for it, and close it. The reaped
+        connections of the process are counted in `flow_control_stats`.
+        """
+
+        flow_control_stats.reaped_connections += 1
+        await self.disconnect(board_constants.IDLE_CONNECTION_CLOSE_CODE)
+        await self.close(code=board_constants.IDLE_CONNECTION_CLOSE_CODE)
 
     async def send_role(self):
         """
@@ -603,21 +1412,3 @@ from poker_ticket import
             'type': board_constants.ROLE,
             'data': self.role
         })
-
-    async def ticket_analysis(self, event):
-        """
-        Send a message containing basic statistics about the ticket estimations.
-
-        This method is asynchronous and uses the `await` keyword to pause its
-        execution if necessary. It takes an `event` argument, which is a string
-        identifying the type of the message to send.
-
-        The method calls the `obj.ticket_analysis()` class method
-        to compute the ticket statistics and sends them as a message to the
-        recipient using the `send_message` method of this object.
-
-        Returns:
-        --------
-        None
-        """
-        await self.send_message(board_constants.TICKET_ANALYSIS, obj.ticket_analysis(self.current_game))
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from poker_board import constants as board_constants
+
+logger = logging.getLogger(__name__)
+
+
+class LocalFanout:
+    '''
+    Delivers the group messages of the consumers of the process in-process.
+
+    The consumers of the process are registered per group and a group message is
+    dispatched to them directly, without a channel layer round trip and encoding per
+    receiver. When the games are shared between workers (`shared`), the process also
+    joins each group it has consumers in with a single worker channel, and a group
+    message is published once on the channel layer so that the other workers deliver
+    it to their own consumers, the worker which sent it skips its own copy. So the
+    channel layer carries one message per worker instead of one per connection.
+
+    Disabled by the POKER_BOARD_LOCAL_FANOUT setting, every call then goes to the
+    channel layer as before.
+    '''
+
+    def __init__(self, shared=True):
+        self.shared = shared
+        self.groups = {}
+        self.worker_channel = None
+        self.reader = None
+        self.local_deliveries = 0
+        self.published = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'POKER_BOARD_LOCAL_FANOUT', board_constants.LOCAL_FANOUT)
+
+    async def add(self, group_name, consumer):
+        """Add the consumer to the group."""
+        if not self.enabled:
+            return await consumer.channel_layer.group_add(group_name, consumer.channel_name)
+        members = self.groups.setdefault(group_name, {})
+        members[consumer.channel_name] = consumer
+        if self.shared and len(members) == 1:
+            await get_channel_layer().group_add(group_name, await self.get_worker_channel())
+
+    async def discard(self, group_name, consumer):
+        """Remove the consumer from the group."""
+        if not self.enabled:
+            return await consumer.channel_layer.group_discard(group_name, consumer.channel_name)
+        members = self.groups.get(group_name)
+        if members is None or members.pop(consumer.channel_name, None) is None or members:
+            return
+        del self.groups[group_name]
+        if self.shared:
+            await get_channel_layer().group_discard(group_name, self.worker_channel)
+
+    async def group_send(self, group_name, message):
+        """
+        Dispatch the message to the consumers of the group in the process, and publish it
+        once for the other workers when the games are shared.
+        """
+        if not self.enabled:
+            return await get_channel_layer().group_send(group_name, message)
+        await self.deliver(group_name, message)
+        if self.shared:
+            self.published += 1
+            await get_channel_layer().group_send(group_name, {
+                **message,
+                board_constants.GROUP: group_name,
+                board_constants.ORIGIN: await self.get_worker_channel(),
+            })
+
+    async def deliver(self, group_name, message):
+        for consumer in list(self.groups.get(group_name, {}).values()):
+            self.local_deliveries += 1
+            try:
+                await consumer.dispatch(message)
+            except Exception:
+                logger.exception('Could not deliver %s to %s', message.get('type'), consumer.channel_name)
+
+    async def get_worker_channel(self):
+        """Return the channel of the process, reading the messages of the other workers."""
+        loop = asyncio.get_running_loop()
+        if self.reader is None or self.reader.done() or self.reader.get_loop() is not loop:
+            self.worker_channel = await get_channel_layer().new_channel()
+            self.reader = loop.create_task(self.read())
+        return self.worker_channel
+
+    async def read(self):
+        channel_layer, worker_channel = get_channel_layer(), self.worker_channel
+        while True:
+            message = await channel_layer.receive(worker_channel)
+            if message.get(board_constants.ORIGIN) != worker_channel:
+                await self.deliver(message[board_constants.GROUP], message)
+
+    def stats(self):
+        """Return the counters of the in-process delivery."""
+        return {
+            board_constants.LOCAL_GROUPS: len(self.groups),
+            board_constants.LOCAL_CONNECTIONS: sum(len(members) for members in self.groups.values()),
+            board_constants.LOCAL_DELIVERIES: self.local_deliveries,
+            board_constants.PUBLISHED_MESSAGES: self.published,
+        }
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from poker_board import constants as board_constants
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    '''
+    Tokens left for the messages of one event of a connection.
+
+    Fields
+    ----------
+    tokens : float
+        messages allowed right now, refilled continuously up to the burst size
+    updated_at : float
+        monotonic time the tokens were last refilled at
+    '''
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, tokens, updated_at):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class RateLimiter:
+    '''
+    Token bucket rate limits of the messages of one connection, one bucket per event.
+
+    `rates` maps an event to `(rate, burst)`: the bucket of the event is refilled with
+    `rate` tokens per second up to `burst` tokens and every message takes one. Events
+    without a rate are not limited.
+    '''
+
+    def __init__(self, rates, clock=time.monotonic):
+        self.rates = rates
+        self.clock = clock
+        self.buckets = {}
+
+    def refill(self, event):
+        rate, burst = self.rates[event]
+        now = self.clock()
+        bucket = self.buckets.get(event)
+        if bucket is None:
+            bucket = self.buckets[event] = TokenBucket(burst, now)
+        bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * rate)
+        bucket.updated_at = now
+        return bucket
+
+    def allow(self, event):
+        """Take a token for a message of the event, return False when the event is over its limit."""
+        if event not in self.rates:
+            return True
+        bucket = self.refill(event)
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def wait_time(self, event):
+        """Return the seconds until a message of the event is allowed again."""
+        rate, _ = self.rates[event]
+        return max(0, (1 - self.refill(event).tokens) / rate)
+
+
+class OutboundQueue:
+    '''
+    Bounded queue of the ASGI messages sent to one websocket connection.
+
+    Messages are written by a task of the queue, so a client reading slowly only delays
+    its own frames and never the consumer sending to the whole room. Once `size`
+    messages are waiting, the client is considered too slow: the waiting messages are
+    dropped, the connection is closed with `close_code` and every later message is
+    dropped until it is gone. When writing a message fails, the connection is closed
+    with `error_close_code` and the later messages are dropped as well.
+    '''
+
+    def __init__(self, send, size, close_code=board_constants.SLOW_CONSUMER_CLOSE_CODE,
+                 error_close_code=board_constants.SEND_ERROR_CLOSE_CODE, stats=None):
+        self.send = send
+        self.size = size
+        self.close_code = close_code
+        self.error_close_code = error_close_code
+        self.stats = stats if stats is not None else flow_control_stats
+        self.queue = asyncio.Queue()
+        self.writer = None
+        self.overflowed = False
+        self.failed = False
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    async def put(self, message):
+        """Queue a message for the client, used as the ASGI send callable of the consumer."""
+        if self.overflowed or self.failed:
+            return
+        if self.queue.qsize() >= self.size:
+            self.overflowed = True
+            self.stats.slow_consumers += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = {'type': 'websocket.close', 'code': self.close_code}
+        self.queue.put_nowait(message)
+        self.stats.peak_outbound_depth = max(self.stats.peak_outbound_depth, self.queue.qsize())
+        if self.writer is None:
+            self.writer = asyncio.ensure_future(self.write())
+
+    async def write(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.send(message)
+            except Exception:
+                logger.exception('Could not send %s, closing the connection', message.get('type'))
+                await self.fail()
+                return
+
+    async def fail(self):
+        """Drop the waiting messages and close the connection whose last message could not be sent."""
+        self.failed = True
+        self.stats.failed_sends += 1
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        try:
+            await self.send({'type': 'websocket.close', 'code': self.error_close_code})
+        except Exception:
+            pass
+
+    def close(self):
+        """Stop writing, the messages still waiting are dropped."""
+        if self.writer is not None:
+            self.writer.cancel()
+
+
+class FlowControlStats:
+    '''
+    Counters of the rate limits, outbound queues and heartbeats of the connections of the process.
+
+    Fields
+    ----------
+    dropped : Counter
+        over-limit messages dropped, per event
+    coalesced : Counter
+        over-limit messages deferred until the event is allowed again, per event, only
+        the last deferred message of an event is handled
+    slow_consumers : int
+        connections closed because their outbound queue was full
+    peak_outbound_depth : int
+        the most messages ever waiting on an outbound queue
+    failed_sends : int
+        connections closed because a message could not be written to them
+    reaped_connections : int
+        connections closed because they missed too many heartbeats
+    '''
+
+    def __init__(self):
+        self.dropped = Counter()
+        self.coalesced = Counter()
+        self.slow_consumers = 0
+        self.peak_outbound_depth = 0
+        self.failed_sends = 0
+        self.reaped_connections = 0
+
+    def snapshot(self):
+        return {
+            board_constants.DROPPED_MESSAGES: dict(self.dropped),
+            board_constants.COALESCED_MESSAGES: dict(self.coalesced),
+            board_constants.SLOW_CONSUMERS: self.slow_consumers,
+            board_constants.PEAK_OUTBOUND_DEPTH: self.peak_outbound_depth,
+            board_constants.FAILED_SENDS: self.failed_sends,
+            board_constants.REAPED_CONNECTIONS: self.reaped_connections,
+        }
+
+    def clear(self):
+        self.__init__()
+
+
+flow_control_stats = FlowControlStats()
@@ -0,0 +1,325 @@
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter, deque
+from operator import itemgetter
+
+from poker_board import constants as board_constants
+from poker_board.ticket_statistics import TicketStatistics
+
+
+class TicketRecord:
+    '''
+    A ticket of the queue of a game, instead of a whole Ticket model instance.
+
+    Fields
+    ----------
+    id : int
+        id of the ticket
+    key : str
+        jira key of the ticket
+    summary : str
+        summary of the ticket
+    payload : str
+        the serialized ticket encoded to json once, sent as it is to the clients
+    '''
+    __slots__ = ('id', 'key', 'summary', 'payload')
+
+    def __init__(self, id, key, summary, payload):
+        self.id = id
+        self.key = key
+        self.summary = summary
+        self.payload = payload
+
+    @classmethod
+    def from_ticket(cls, ticket):
+        """Build the record of a serialized ticket."""
+        return cls(
+            ticket[board_constants.ID], ticket.get('jira_ticket'), ticket.get('summary'), json.dumps(ticket)
+        )
+
+
+class GameSession:
+    '''
+    The in-process state of one pokerboard game.
+
+    Members are kept sorted by user id, the position of a member in `member_ids` is
+    their dense integer slot and is found with a binary search, so no per game dict
+    is needed. `member_emails` and `votes` are indexed by the same slot. A slot
+    holding NOT_VOTED in `votes` means the member has not estimated the ticket yet.
+
+    Fields
+    ----------
+    member_ids : array
+        sorted user ids of the members
+    member_emails : tuple
+        slot -> email of the member
+    votes : array
+        slot -> estimation of the member on the current ticket or NOT_VOTED
+    tickets : deque
+        TicketRecord of the tickets left to estimate, the first one is the current
+        ticket, an empty tuple until the tickets are loaded
+    timer : int
+        timer of the game in seconds
+    vote_count, vote_total, vote_squares : int
+        running number, sum and sum of the squares of the votes on the current ticket,
+        kept inline so that a game holds no aggregates object, see `ticket_statistics`
+    sequence : int
+        sequence number of the last frame broadcast to the game
+    events : deque
+        (sequence, group name, frame) of the last frames broadcast to the game, None until
+        the first one
+    round_state : str
+        state of the estimation round of the current ticket, one of ROUND_STATES
+    presence : dict
+        email -> [connections, expiry time] of the members connected to the game, None
+        while nobody is connected
+    '''
+    __slots__ = (
+        'member_ids', 'member_emails', 'votes', 'tickets', 'timer', 'vote_count', 'vote_total', 'vote_squares',
+        'sequence', 'events', 'round_state', 'presence'
+    )
+
+    def __init__(self, timer, members=()):
+        """Create the game with the given (email, user id) members."""
+        members = sorted(members, key=itemgetter(1))
+        self.member_ids = array('q', [user_id for _, user_id in members])
+        self.member_emails = tuple(email for email, _ in members)
+        self.votes = array('i', [board_constants.NOT_VOTED]) * len(members)
+        self.tickets = ()
+        self.timer = timer
+        self.vote_count = self.vote_total = self.vote_squares = 0
+        self.sequence = 0
+        self.events = None
+        self.round_state = board_constants.IDLE_ROUND
+        self.presence = None
+
+    def __len__(self):
+        return len(self.member_ids)
+
+    @property
+    def tickets_loaded(self):
+        """True once the tickets have been loaded, even if none is left."""
+        return isinstance(self.tickets, deque)
+
+    def load_tickets(self, tickets):
+        """Replace the queue with records of the given serialized tickets."""
+        self.tickets = deque(TicketRecord.from_ticket(ticket) for ticket in tickets)
+
+    def current_ticket(self):
+        """Return the TicketRecord of the current ticket or None."""
+        return self.tickets[0] if self.tickets else None
+
+    def skip_ticket(self):
+        """Move the current ticket to the end of the queue."""
+        if self.tickets:
+            self.tickets.rotate(-1)
+
+    def pop_ticket(self):
+        """Remove and return the TicketRecord of the current ticket, or None."""
+        return self.tickets.popleft() if self.tickets else None
+
+    def reorder_tickets(self, ticket_ids):
+        """
+        Put the tickets with the given ids first, in that order. The other tickets
+        follow in their current order and unknown ids are ignored.
+        """
+        if not self.tickets:
+            return
+        position = {ticket_id: index for index, ticket_id in enumerate(ticket_ids)}
+        self.tickets = deque(sorted(
+            self.tickets, key=lambda ticket: position.get(ticket.id, len(position))
+        ))
+
+    def jump_to_ticket(self, ticket_id):
+        """
+        Make the ticket with the given id the current one as if the tickets before it were
+        skipped, return False when it is not in the queue.
+        """
+        for index, ticket in enumerate(self.tickets):
+            if ticket.id == ticket_id:
+                self.tickets.rotate(-index)
+                return True
+        return False
+
+    def change_ticket(self, ticket_id, ticket):
+        """
+        Insert, update or remove a ticket of the queue: a serialized ticket which is not
+        queued is appended, a queued one replaced in place, and None removes the ticket.
+        Returns the operation applied, None when the queue is left as it is.
+        """
+        if not self.tickets_loaded:
+            return None
+        for index, record in enumerate(self.tickets):
+            if record.id != ticket_id:
+                continue
+            if ticket is None:
+                del self.tickets[index]
+                return board_constants.REMOVED_TICKET
+            record = TicketRecord.from_ticket(ticket)
+            if record.payload == self.tickets[index].payload:
+                return None
+            self.tickets[index] = record
+            return board_constants.UPDATED_TICKET
+        if ticket is None:
+            return None
+        self.tickets.append(TicketRecord.from_ticket(ticket))
+        return board_constants.INSERTED_TICKET
+
+    def next_sequence(self):
+        """Return the sequence number of the next frame broadcast to the game."""
+        self.sequence += 1
+        return self.sequence
+
+    def record_event(self, sequence, group_name, text, size):
+        """Keep the frame in the ring buffer of the last `size` frames."""
+        if self.events is None:
+            self.events = deque(maxlen=size)
+        self.events.append((sequence, group_name, text))
+
+    def events_since(self, sequence):
+        """
+        Return the (group name, frame) of the frames broadcast after the given sequence
+        number, or None when some of them already left the ring buffer.
+        """
+        if sequence >= self.sequence:
+            return []
+        if not self.events or self.events[0][0] > sequence + 1:
+            return None
+        return [(group_name, text) for event_sequence, group_name, text in self.events if event_sequence > sequence]
+
+    def approximate_size(self):
+        """Return the approximate number of bytes used by the game and its tickets."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.member_ids) + sys.getsizeof(self.votes)
+        size += sys.getsizeof(self.member_emails) + sum(sys.getsizeof(email) for email in self.member_emails)
+        size += sys.getsizeof(self.tickets) + sum(
+            sys.getsizeof(ticket) + sys.getsizeof(ticket.key) + sys.getsizeof(ticket.summary)
+            + sys.getsizeof(ticket.payload) for ticket in self.tickets
+        )
+        if self.events is not None:
+            size += sys.getsizeof(self.events) + sum(sys.getsizeof(text) for _, _, text in self.events)
+        return size
+
+    def slot(self, user_id):
+        """Return the slot of the member with the given user id or None."""
+        slot = bisect_left(self.member_ids, user_id)
+        if slot < len(self.member_ids) and self.member_ids[slot] == user_id:
+            return slot
+        return None
+
+    def add_member(self, email, user_id):
+        """Give a slot to the member if they do not have one yet and return the slot."""
+        slot = bisect_left(self.member_ids, user_id)
+        if slot < len(self.member_ids) and self.member_ids[slot] == user_id:
+            return slot
+        self.member_ids.insert(slot, user_id)
+        self.votes.insert(slot, board_constants.NOT_VOTED)
+        self.member_emails = self.member_emails[:slot] + (email,) + self.member_emails[slot:]
+        return slot
+
+    def set_vote(self, user_id, estimation):
+        """Store the estimation of a member, votes of non members are ignored."""
+        slot = self.slot(user_id)
+        if slot is None:
+            return
+        previous = self.votes[slot]
+        if previous != board_constants.NOT_VOTED:
+            self.vote_count -= 1
+            self.vote_total -= previous
+            self.vote_squares -= previous * previous
+        if estimation != board_constants.NOT_VOTED:
+            self.vote_count += 1
+            self.vote_total += estimation
+            self.vote_squares += estimation * estimation
+        self.votes[slot] = estimation
+
+    def reset_votes(self):
+        """Mark every member as not voted, in place."""
+        self.votes[:] = array('i', [board_constants.NOT_VOTED]) * len(self.votes)
+        self.vote_count = self.vote_total = self.vote_squares = 0
+
+    def set_round_state(self, state, from_states):
+        """
+        Move the round to `state` if it is in one of `from_states`, the votes are reset
+        when a round starts voting. Return True if the round moved.
+        """
+        if self.round_state not in from_states:
+            return False
+        if state == board_constants.VOTING_ROUND:
+            self.reset_votes()
+        self.round_state = state
+        return True
+
+    def join_presence(self, email, expires_at):
+        """Count a connection of the member, return True if the member was not present."""
+        if self.presence is None:
+            self.presence = {}
+        entry = self.presence.get(email)
+        if entry is None:
+            self.presence[email] = [1, expires_at]
+            return True
+        entry[0] += 1
+        entry[1] = max(entry[1], expires_at)
+        return False
+
+    def leave_presence(self, email):
+        """Count a dropped connection of the member, return True if the member left."""
+        entry = self.presence.get(email) if self.presence is not None else None
+        if entry is None:
+            return False
+        entry[0] -= 1
+        if entry[0] > 0:
+            return False
+        self.discard_presence(email)
+        return True
+
+    def refresh_presence(self, emails, expires_at):
+        """Move the expiry of the present members among `emails`."""
+        if self.presence is None:
+            return
+        for email in emails:
+            entry = self.presence.get(email)
+            if entry is not None:
+                entry[1] = expires_at
+
+    def expire_presence(self, now):
+        """Drop the members whose presence expired and return their emails."""
+        if self.presence is None:
+            return []
+        expired = [email for email, (_, expires_at) in self.presence.items() if expires_at <= now]
+        for email in expired:
+            self.discard_presence(email)
+        return expired
+
+    def discard_presence(self, email):
+        """Forget the presence of the member, the map is dropped with the last one."""
+        del self.presence[email]
+        if not self.presence:
+            self.presence = None
+
+    def present_members(self):
+        """Return the emails of the members connected to the game."""
+        return list(self.presence or ())
+
+    def vote_dict(self):
+        """Return the votes as a dict of email -> estimation or NOT_ESTIMATED."""
+        return {
+            email: board_constants.NOT_ESTIMATED if estimation == board_constants.NOT_VOTED else estimation
+            for email, estimation in zip(self.member_emails, self.votes)
+        }
+
+    def ticket_statistics(self):
+        """
+        Return the TicketStatistics of the votes on the current ticket from the inline
+        aggregates, only the histogram is counted from the votes.
+        """
+        counts = Counter(estimation for estimation in self.votes if estimation != board_constants.NOT_VOTED)
+        return TicketStatistics.from_counts(self.vote_count, self.vote_total, self.vote_squares, counts)
+
+    def estimations(self):
+        """Return the (user id, estimation) pairs of the members who voted."""
+        return [
+            (user_id, estimation) for user_id, estimation in zip(self.member_ids, self.votes)
+            if estimation != board_constants.NOT_VOTED
+        ]
@@ -0,0 +1,72 @@
+import atexit
+
+from channels.db import database_sync_to_async
+from django.db import DatabaseError, transaction
+
+from board_session.models import VoteJournal
+from poker_board import constants as board_constants
+from poker_board.write_behind import WriteBehindQueue
+
+
+class VoteJournalWriter(WriteBehindQueue):
+    '''
+    Append-only journal of the votes of the games kept in process memory.
+
+    Every vote is appended to the VoteJournal table in batches with the id of the ticket
+    voted on, and starting the round of a ticket appends an entry without user for it.
+    A game rebuilt after a crash or an eviction replays only the entries after the last
+    round entry, so the replay cost is proportional to the current round. The entries of a session are deleted
+    once it ends. A batch is inserted at once, and entry by entry when that fails.
+    '''
+    key = board_constants.VOTE_JOURNAL
+
+    async def append(self, session_id, ticket_id, user_id, estimation):
+        """Journal the estimation of a member on a ticket."""
+        await self.enqueue(VoteJournal(
+            session_id=session_id, ticket_id=ticket_id, user_id=user_id, estimation=estimation
+        ))
+
+    async def new_round(self, session_id, ticket_id):
+        """Journal the start of the round of a ticket, the votes before it are not replayed."""
+        await self.enqueue(VoteJournal(session_id=session_id, ticket_id=ticket_id))
+
+    def write(self, batch):
+        try:
+            with transaction.atomic():
+                VoteJournal.objects.bulk_create(batch)
+        except DatabaseError:
+            super().write(batch)
+
+    def write_row(self, row):
+        row.save()
+
+    async def replay(self, session_id):
+        """
+        Return a tuple (ticket id, votes) of the current round, where votes are the last
+        (user id, estimation) of every member who voted on its ticket. The ticket id is
+        None when nothing was journaled.
+        """
+        await self.flush()
+        return await database_sync_to_async(self.current_round)(session_id)
+
+    def current_round(self, session_id):
+        journal = VoteJournal.objects.filter(session_id=session_id)
+        round_id, ticket_id = journal.filter(user__isnull=True).order_by('-id').values_list(
+            'id', 'ticket_id'
+        ).first() or (0, None)
+        entries = list(journal.filter(user__isnull=False, id__gt=round_id).order_by('id').values_list(
+            'ticket_id', 'user_id', 'estimation'
+        ))
+        if entries:
+            ticket_id = entries[-1][0]
+        votes = {user_id: estimation for entry_ticket_id, user_id, estimation in entries if entry_ticket_id == ticket_id}
+        return ticket_id, list(votes.items())
+
+    async def discard(self, session_id):
+        """Delete the journal of a session which ended."""
+        self.pending = [entry for entry in self.pending if entry.session_id != session_id]
+        await database_sync_to_async(VoteJournal.objects.filter(session_id=session_id).delete)()
+
+
+vote_journal = VoteJournalWriter()
+atexit.register(vote_journal.close)
@@ -0,0 +1,115 @@
+import functools
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+
+from poker_board import constants as board_constants
+from poker_board.coalescing import vote_coalescer, votes_aggregate_throttle
+from poker_board.timers import timer_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLifecycle:
+    '''
+    Bounds the number of games kept by the WebScoketStore of the process.
+
+    A game is torn down when its session ends, evicted `idle_ttl` seconds after the last
+    connection of the process to it drops, and the least recently used games without a
+    connection are evicted once more than `max_sessions` games are resident. Idle
+    evictions are driven by the process wide `timer_scheduler`.
+
+    Connections are counted per process, so with a state backend shared between
+    workers only the explicit teardown removes the shared state, idle games are left
+    to the backend expiry.
+    '''
+
+    def __init__(self, store, scheduler=timer_scheduler, idle_ttl=None, max_sessions=None):
+        self.store = store
+        self.scheduler = scheduler
+        self.idle_ttl = idle_ttl if idle_ttl is not None else getattr(
+            settings, 'POKER_BOARD_SESSION_IDLE_TTL', board_constants.SESSION_IDLE_TTL_IN_SECONDS
+        )
+        self.max_sessions = max_sessions or getattr(
+            settings, 'POKER_BOARD_MAX_RESIDENT_SESSIONS', board_constants.MAX_RESIDENT_SESSIONS
+        )
+        self.connections = OrderedDict()
+        self.ended = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def __len__(self):
+        return len(self.connections)
+
+    def key(self, game):
+        """Return the scheduler key of the idle timer of the given game."""
+        return f'{board_constants.EVICT}:{game}'
+
+    def touch(self, game):
+        """Mark the game as recently used."""
+        if game in self.connections:
+            self.connections.move_to_end(game)
+
+    async def connected(self, game):
+        """Count a new connection to the game and evict games over the resident limit."""
+        self.scheduler.cancel(self.key(game))
+        self.connections[game] = self.connections.get(game, 0) + 1
+        self.connections.move_to_end(game)
+        if len(self.connections) > self.max_sessions:
+            await self.evict_least_recently_used()
+
+    def disconnected(self, game):
+        """Count a dropped connection, the game is evicted after `idle_ttl` without connections."""
+        if game not in self.connections:
+            return
+        self.connections[game] -= 1
+        if self.connections[game] <= 0:
+            self.connections[game] = 0
+            self.scheduler.start(self.key(game), self.idle_ttl, on_expire=functools.partial(self.evict_idle, game))
+
+    async def end(self, game):
+        """Tear down a game whose session ended."""
+        if await self.remove(game, shared=True):
+            self.ended += 1
+
+    async def evict_idle(self, game):
+        if self.connections.get(game) == 0 and await self.remove(game):
+            self.evicted_idle += 1
+
+    async def evict_least_recently_used(self):
+        for game, connections in list(self.connections.items()):
+            if len(self.connections) <= self.max_sessions:
+                return
+            if not connections and await self.remove(game):
+                self.evicted_lru += 1
+        if len(self.connections) > self.max_sessions:
+            logger.warning('%s resident games have open connections, more than %s', len(self), self.max_sessions)
+
+    async def remove(self, game, shared=False):
+        """
+        Drop the state of the game kept by the process. The state kept by a shared
+        backend is only deleted when `shared` is True.
+        """
+        self.scheduler.cancel(self.key(game))
+        self.scheduler.cancel(game)
+        vote_coalescer.discard(game)
+        votes_aggregate_throttle.discard(game)
+        known = self.connections.pop(game, None) is not None
+        if shared or self.store.backend.process_local:
+            await self.store.delete_game_instance(game)
+        return known
+
+    async def stats(self):
+        """Return the counters of the games of the process."""
+        sizes = [await self.store.approximate_size(game) for game in self.connections]
+        sizes = [size for size in sizes if size is not None]
+        return {
+            board_constants.RESIDENT_SESSIONS: len(self.connections),
+            board_constants.CONNECTIONS: sum(self.connections.values()),
+            board_constants.APPROXIMATE_BYTES: sum(sizes),
+            board_constants.APPROXIMATE_BYTES_PER_SESSION: sum(sizes) // len(sizes) if sizes else 0,
+            board_constants.ENDED_SESSIONS: self.ended,
+            board_constants.EVICTED_IDLE_SESSIONS: self.evicted_idle,
+            board_constants.EVICTED_LRU_SESSIONS: self.evicted_lru,
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from poker_board import constants as board_constants
+from poker_board.fanout import LocalFanout
+
+
+class Receiver:
+    '''
+    Stands for a connection of the room, counts the frames dispatched to it.
+    '''
+
+    def __init__(self, channel_name, room):
+        self.channel_name = channel_name
+        self.room = room
+
+    async def dispatch(self, message):
+        self.room.received()
+
+
+class Room:
+    '''
+    Counts the frames received by the connections of a room, `done` is set once every
+    connection got the current frame.
+    '''
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.pending = 0
+        self.done = None
+
+    def expect(self):
+        self.pending = self.connections
+        self.done = asyncio.Event()
+
+    def received(self):
+        self.pending -= 1
+        if not self.pending:
+            self.done.set()
+
+
+class Command(BaseCommand):
+    '''
+    Compares the broadcast latency to a room through the channel layer, one message per
+    connection, with the in-process delivery of LocalFanout, for rooms of the given sizes.
+    Uses the channel layer configured by CHANNEL_LAYERS, so run it with channels_redis to
+    measure the Redis path.
+
+    usage: python manage.py fanout_benchmark --connections 10 100 1000 --broadcasts 50
+    '''
+    help = 'Measure the broadcast latency of the channel layer and of the in-process fan-out.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--broadcasts', type=int, default=50)
+
+    def handle(self, *args, **options):
+        for connections in options['connections']:
+            for name, run in (('channel layer', self.run_channel_layer), ('local fan-out', self.run_local_fanout)):
+                latencies = async_to_sync(run)(connections, options['broadcasts'])
+                self.stdout.write(
+                    f'{name}: {connections} connections, {options["broadcasts"]} broadcasts, '
+                    f'p50 {self.milliseconds(latencies, 50)} ms, p99 {self.milliseconds(latencies, 99)} ms, '
+                    f'{connections * len(latencies) / sum(latencies):.0f} frames/s'
+                )
+
+    def milliseconds(self, latencies, percentile):
+        return f'{statistics.quantiles(latencies, n=100)[percentile - 1] * 1000:.3f}'
+
+    async def broadcast(self, room, broadcasts, group_send):
+        """Return the seconds taken by every broadcast until the whole room received it."""
+        latencies = []
+        for index in range(broadcasts):
+            room.expect()
+            started = time.perf_counter()
+            await group_send({
+                'type': board_constants.BROADCAST_FRAME,
+                board_constants.TEXT: f'{{"type": "timer", "data": {index}}}',
+                board_constants.SENDER_CHANNEL_NAME: None,
+            })
+            await room.done.wait()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    async def run_channel_layer(self, connections, broadcasts):
+        channel_layer, room = get_channel_layer(), Room(connections)
+        group_name = f'benchmark{connections}'
+        channels = [await channel_layer.new_channel() for _ in range(connections)]
+        for channel in channels:
+            await channel_layer.group_add(group_name, channel)
+
+        async def receive(channel):
+            while True:
+                await channel_layer.receive(channel)
+                room.received()
+        readers = [asyncio.ensure_future(receive(channel)) for channel in channels]
+        try:
+            return await self.broadcast(
+                room, broadcasts, lambda message: channel_layer.group_send(group_name, message)
+            )
+        finally:
+            for reader in readers:
+                reader.cancel()
+            for channel in channels:
+                await channel_layer.group_discard(group_name, channel)
+
+    async def run_local_fanout(self, connections, broadcasts):
+        fanout, room = LocalFanout(shared=False), Room(connections)
+        group_name = f'benchmark{connections}'
+        for index in range(connections):
+            await fanout.add(group_name, Receiver(f'receiver{index}', room))
+        return await self.broadcast(room, broadcasts, lambda message: fanout.group_send(group_name, message))
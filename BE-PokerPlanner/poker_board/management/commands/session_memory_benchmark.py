@@ -0,0 +1,68 @@
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from poker_board import constants as board_constants
+from poker_board.game_session import GameSession
+
+
+class Command(BaseCommand):
+    '''
+    Compares the memory used by live games kept as GameSession objects with the
+    memory used by the five parallel dicts WebScoketStore used to keep.
+
+    usage: python manage.py session_memory_benchmark --sessions 10000 --members 8
+    '''
+    help = 'Measure the memory used by live game sessions of the in-memory state backend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=10000)
+        parser.add_argument('--members', type=int, default=8)
+
+    def handle(self, *args, **options):
+        sessions = options['sessions']
+        # Games and members are built beforehand, both layouts reference the same strings.
+        games = [
+            board_constants.POKERBOARD + str(session) + board_constants.SESSION + str(session)
+            for session in range(sessions)
+        ]
+        members = [
+            [(f'user{session}.{member}@example.com', session * 1000 + member)
+             for member in range(options['members'])]
+            for session in range(sessions)
+        ]
+        for name, build in (('dicts', self.build_dict_store), ('GameSession', self.build_game_sessions)):
+            used = self.measure(build, games, members)
+            self.stdout.write(
+                f'{name}: {sessions} sessions of {options["members"]} members use {used / 1024 / 1024:.1f} MiB, '
+                f'{used // sessions} bytes per session'
+            )
+
+    def measure(self, build, games, members):
+        """Return the bytes allocated by build and still alive once it returns."""
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        store = build(games, members)
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del store
+        return used
+
+    def build_dict_store(self, games, members):
+        store, store_user_id, tickets, timer_task, timer = {}, {}, {}, {}, {}
+        for game, game_members in zip(games, members):
+            store[game], store_user_id[game] = {}, {}
+            tickets[game], timer_task[game], timer[game] = [], '', 30
+            for member, (email, user_id) in enumerate(game_members):
+                store[game][email] = member if member % 2 else board_constants.NOT_ESTIMATED
+                store_user_id[game][email] = user_id
+        return store, store_user_id, tickets, timer_task, timer
+
+    def build_game_sessions(self, games, members):
+        store = {}
+        for game, game_members in zip(games, members):
+            store[game] = GameSession(30, game_members)
+            for member, (email, user_id) in enumerate(game_members):
+                if member % 2:
+                    store[game].set_vote(user_id, member)
+        return store
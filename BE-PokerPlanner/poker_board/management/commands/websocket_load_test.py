@@ -0,0 +1,324 @@
+import asyncio
+import json
+import resource
+import statistics
+import time
+import uuid
+from collections import namedtuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework_multitoken.models import MultiToken
+
+import constants
+from board_session.models import BoardSession
+from poker_board import constants as board_constants
+from poker_board import routing
+from poker_board.journal import vote_journal
+from poker_board.models import PokerBoard, PokerRole
+from poker_board.token_authentication_stack import TokenAuthMiddlewareStack
+from poker_board.write_behind import estimation_writer
+from poker_ticket.models import Ticket
+
+ESTIMATION_CHOICES = [1, 2, 3, 5, 8, 13, 21, 34]
+
+Member = namedtuple('Member', ['email', 'token'])
+SeededSession = namedtuple('SeededSession', ['id', 'manager', 'players'])
+
+
+class SimulatedClient:
+    '''
+    A websocket connection of a member to a session. Records the arrival time of every
+    frame it receives, the last sequence number it saw and, for the manager, when the
+    vote of each player arrived.
+    '''
+
+    def __init__(self, harness, session_id, member):
+        self.harness = harness
+        self.session_id = session_id
+        self.email = member.email
+        self.token = member.token
+        self.communicator = None
+        self.reader = None
+        self.arrivals = {}
+        self.votes = {}
+        self.sequence = None
+        self.closed = False
+        self.changed = asyncio.Event()
+
+    async def connect(self):
+        self.communicator = WebsocketCommunicator(
+            self.harness.application,
+            f'/session/{self.session_id}/?token={self.token}&{board_constants.TIMER_MODE}='
+            f'{board_constants.DEADLINE_TIMER_MODE}'
+        )
+        connected, _ = await self.communicator.connect(self.harness.timeout)
+        if not connected:
+            raise CommandError(f'{self.email} could not connect to session {self.session_id}')
+        self.closed = False
+        self.reader = asyncio.ensure_future(self.read())
+
+    async def disconnect(self):
+        self.reader.cancel()
+        try:
+            await self.reader
+        except asyncio.CancelledError:
+            pass
+        await self.communicator.disconnect(timeout=self.harness.timeout)
+
+    async def send(self, content):
+        self.harness.sent += 1
+        await self.communicator.send_json_to(content)
+
+    async def read(self):
+        while True:
+            message = await self.communicator.receive_output(timeout=None)
+            arrived = time.perf_counter()
+            if message['type'] == 'websocket.close':
+                self.closed = True
+                self.changed.set()
+                return
+            frame = json.loads(message['text'])
+            self.harness.received += 1
+            self.sequence = frame.get(board_constants.SEQUENCE, self.sequence)
+            self.arrivals.setdefault(frame['type'], []).append(arrived)
+            if frame['type'] == board_constants.CARD_SELECTED_BY_PLAYER_FOR_MANAGER:
+                self.votes.setdefault(frame['data'][board_constants.EMAIL], arrived)
+            elif frame['type'] == board_constants.VOTES_DELTA:
+                for vote in frame['data']:
+                    self.votes.setdefault(vote[board_constants.EMAIL], arrived)
+            elif frame['type'] == board_constants.PING:
+                await self.communicator.send_json_to({board_constants.EVENT: board_constants.PONG})
+            self.changed.set()
+
+    def count(self, type):
+        return len(self.arrivals.get(type, ()))
+
+    async def wait_until(self, predicate):
+        """Wait until predicate returns True, the frames it waits for are received meanwhile."""
+        while not predicate():
+            if self.closed:
+                raise CommandError(f'The connection of {self.email} was closed')
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), self.harness.timeout)
+            except asyncio.TimeoutError:
+                raise CommandError(f'{self.email} got no frame for {self.harness.timeout} seconds')
+
+
+class Command(BaseCommand):
+    '''
+    Load test of PokerBoardAsyncConsumer through the websocket routes of the project.
+
+    Seeds `--sessions` board sessions of one manager and `--players` players, each with
+    `--tickets` tickets to estimate, and plays them concurrently over WebsocketCommunicator
+    connections: every player votes on every ticket, every `--skip-every`th ticket is
+    skipped instead of finalized, and after every `--reconnect-every`th round one player
+    reconnects and resyncs. Uses an in-memory channel layer unless `--configured-layer`
+    is given, and the database of the settings, the seeded rows are deleted afterwards
+    unless `--keep` is given. The rate limits of the connections apply, a manager moving
+    through tickets faster than they allow waits for them, `--without-rate-limits` turns
+    them off.
+
+    Reports the frames received per second, the broadcast latency (until every member
+    got a frame sent to the room), the latency of a vote to the manager, the database
+    queries per client event and the peak RSS of the process. The queries are counted
+    on the connection of the thread running the command, which runs every query of
+    database_sync_to_async.
+
+    usage: python manage.py websocket_load_test --sessions 20 --players 8 --tickets 10
+    '''
+    help = 'Play simulated board sessions over websocket connections and report throughput and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=10)
+        parser.add_argument('--players', type=int, default=8)
+        parser.add_argument('--tickets', type=int, default=10)
+        parser.add_argument('--skip-every', type=int, default=4)
+        parser.add_argument('--reconnect-every', type=int, default=3)
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--configured-layer', action='store_true')
+        parser.add_argument('--keep', action='store_true')
+        parser.add_argument('--without-rate-limits', action='store_true')
+
+    def handle(self, *args, **options):
+        self.timeout = options['timeout']
+        self.tickets = options['tickets']
+        self.skip_every = options['skip_every']
+        self.reconnect_every = options['reconnect_every']
+        self.application = TokenAuthMiddlewareStack(URLRouter(routing.websocket_urlpatterns))
+        if not options['configured_layer']:
+            channel_layers.set(DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer())
+        prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        seeded = self.seed(prefix, options['sessions'], options['players'], options['tickets'])
+        try:
+            self.sent = self.received = self.queries = self.reconnects = 0
+            self.broadcast_latencies, self.vote_latencies, self.reconnect_latencies = [], [], []
+            rate_limits = {} if options['without_rate_limits'] else getattr(
+                settings, 'POKER_BOARD_EVENT_RATE_LIMITS', board_constants.EVENT_RATE_LIMITS
+            )
+            with override_settings(POKER_BOARD_EVENT_RATE_LIMITS=rate_limits), \
+                    connection.execute_wrapper(self.count_query):
+                started = time.perf_counter()
+                async_to_sync(self.run)(seeded)
+                elapsed = time.perf_counter() - started
+        finally:
+            async_to_sync(self.flush)()
+            if not options['keep']:
+                get_user_model().objects.filter(email__startswith=prefix).delete()
+        self.report(options, elapsed)
+
+    def seed(self, prefix, sessions, players, tickets):
+        """Create the members, boards, tickets and sessions of the run, in bulk."""
+        user_model = get_user_model()
+        password = make_password(None)
+        user_model.objects.bulk_create([
+            user_model(email=f'{prefix}-{session}-{member}@example.com', password=password)
+            for session in range(sessions) for member in range(players + 1)
+        ])
+        users = {user.email: user for user in user_model.objects.filter(email__startswith=prefix)}
+        tokens = [MultiToken(key=MultiToken().generate_key(), user=user) for user in users.values()]
+        MultiToken.objects.bulk_create(tokens)
+        keys = {token.user.email: token.key for token in tokens}
+
+        PokerBoard.objects.bulk_create([
+            PokerBoard(
+                name=f'{prefix} {session}', manager=users[f'{prefix}-{session}-0@example.com'],
+                estimation_choices=ESTIMATION_CHOICES
+            )
+            for session in range(sessions)
+        ])
+        boards = PokerBoard.objects.filter(name__startswith=prefix).order_by('id')
+        PokerRole.objects.bulk_create([
+            PokerRole(
+                user=users[f'{prefix}-{session}-{member}@example.com'], poker=board,
+                role=constants.roles.player if member else constants.roles.spectator
+            )
+            for session, board in enumerate(boards) for member in range(players + 1)
+        ])
+        Ticket.objects.bulk_create([
+            Ticket(jira_ticket=f'{prefix}-{session}-{ticket}', summary=f'Ticket {ticket}', pokerboard=board)
+            for session, board in enumerate(boards) for ticket in range(tickets + 1)
+        ])
+        BoardSession.objects.bulk_create([BoardSession(board=board) for board in boards])
+        session_ids = BoardSession.objects.filter(board__name__startswith=prefix).order_by('board_id').values_list(
+            'id', flat=True
+        )
+
+        def member(session, index):
+            email = f'{prefix}-{session}-{index}@example.com'
+            return Member(email, keys[email])
+        return [
+            SeededSession(session_id, member(session, 0), [member(session, index) for index in range(1, players + 1)])
+            for session, session_id in enumerate(session_ids)
+        ]
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    async def run(self, seeded):
+        await asyncio.gather(*(self.run_session(session) for session in seeded))
+
+    async def flush(self):
+        await estimation_writer.flush()
+        await vote_journal.flush()
+
+    async def run_session(self, seeded):
+        """Play every ticket of a session and end it."""
+        manager = SimulatedClient(self, seeded.id, seeded.manager)
+        players = [SimulatedClient(self, seeded.id, player) for player in seeded.players]
+        clients = [manager, *players]
+        for client in clients:
+            await client.connect()
+        await manager.send({board_constants.EVENT: board_constants.FETCH_TICKET})
+        await self.broadcast(manager, {board_constants.EVENT: board_constants.GET_CURRENT_TICKET}, clients)
+        remaining = self.tickets
+        for ticket in range(self.tickets):
+            if self.skip_every and ticket % self.skip_every == self.skip_every - 1:
+                await self.broadcast(manager, {board_constants.EVENT: board_constants.SKIP_TICKET}, clients)
+                continue
+            await self.vote(manager, players, ticket)
+            if self.reconnect_every and ticket % self.reconnect_every == self.reconnect_every - 1:
+                await self.reconnect(players[ticket % len(players)])
+            remaining -= 1
+            await self.broadcast(manager, {
+                board_constants.EVENT: board_constants.FINAL_ESTIMATION,
+                board_constants.ESTIAMTION: ESTIMATION_CHOICES[ticket % len(ESTIMATION_CHOICES)],
+            }, clients, frames=2 if remaining else 1)
+        if remaining:
+            await manager.send({board_constants.EVENT: board_constants.END_GAME})
+        for client in clients:
+            await client.wait_until(lambda: client.closed)
+            await client.disconnect()
+
+    async def broadcast(self, sender, content, clients, frames=1):
+        """
+        Send the event and wait until every client got the given number of `round` frames,
+        records the seconds until every client got the first one. Finalizing a ticket sends
+        the finalized round and the round of the next ticket.
+        """
+        counts = [client.count(board_constants.ROUND) for client in clients]
+        started = time.perf_counter()
+        await sender.send(content)
+        for client, count in zip(clients, counts):
+            await client.wait_until(lambda: client.count(board_constants.ROUND) >= count + frames)
+        self.broadcast_latencies.append(
+            max(client.arrivals[board_constants.ROUND][count] for client, count in zip(clients, counts)) - started
+        )
+
+    async def vote(self, manager, players, ticket):
+        """Let every player vote and record the seconds until the manager got each vote."""
+        manager.votes.clear()
+        started = {}
+        for index, player in enumerate(players):
+            started[player.email] = time.perf_counter()
+            await player.send({
+                board_constants.EVENT: board_constants.CARD_SELECTED,
+                board_constants.CARD: ESTIMATION_CHOICES[(index + ticket) % len(ESTIMATION_CHOICES)],
+            })
+        await manager.wait_until(lambda: all(email in manager.votes for email in started))
+        self.vote_latencies.extend(manager.votes[email] - sent for email, sent in started.items())
+
+    async def reconnect(self, client):
+        """Reconnect the client and ask for the frames it missed."""
+        started = time.perf_counter()
+        await client.disconnect()
+        roles = client.count(board_constants.ROLE)
+        await client.connect()
+        await client.wait_until(lambda: client.count(board_constants.ROLE) > roles)
+        await client.send({board_constants.EVENT: board_constants.RESYNC, board_constants.SEQUENCE: client.sequence})
+        self.reconnects += 1
+        self.reconnect_latencies.append(time.perf_counter() - started)
+
+    def report(self, options, elapsed):
+        self.stdout.write(
+            f'{options["sessions"]} sessions of {options["players"]} players, {options["tickets"]} tickets: '
+            f'{self.sent} events sent, {self.received} frames received in {elapsed:.2f} s, '
+            f'{self.received / elapsed:.0f} msgs/s'
+        )
+        for name, latencies in (
+            ('broadcast', self.broadcast_latencies), ('vote to manager', self.vote_latencies),
+            (f'reconnect ({self.reconnects})', self.reconnect_latencies),
+        ):
+            self.stdout.write(
+                f'{name}: p50 {self.milliseconds(latencies, 50)} ms, p95 {self.milliseconds(latencies, 95)} ms, '
+                f'p99 {self.milliseconds(latencies, 99)} ms'
+            )
+        self.stdout.write(
+            f'database: {self.queries} queries, {self.queries / max(self.sent, 1):.3f} per event'
+        )
+        self.stdout.write(f'peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB')
+
+    def milliseconds(self, latencies, percentile):
+        if len(latencies) < 2:
+            return '-'
+        return f'{statistics.quantiles(latencies, n=100)[percentile - 1] * 1000:.3f}'
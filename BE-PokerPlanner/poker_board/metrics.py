@@ -0,0 +1,84 @@
+import bisect
+import time
+from contextlib import contextmanager
+
+from poker_board import constants as board_constants
+
+
+class EventTimings:
+    '''
+    Latency histogram and error count of one websocket event.
+
+    Fields
+    ----------
+    count : int
+        number of handled messages
+    errors : int
+        number of messages whose handler raised
+    total : float
+        seconds spent in the handler
+    buckets : list
+        number of messages per latency bucket, the last one counts the messages slower
+        than every bound
+    '''
+    __slots__ = ('count', 'errors', 'total', 'buckets')
+
+    def __init__(self, size):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * size
+
+
+class EventMetrics:
+    '''
+    Per event latency histograms and error counts of the websocket events of the process.
+
+    `bounds` are the upper bounds in seconds of the latency buckets, a message is
+    counted in the first bucket whose bound is not exceeded.
+    '''
+
+    def __init__(self, bounds=board_constants.LATENCY_BUCKETS_IN_SECONDS):
+        self.bounds = tuple(bounds)
+        self.events = {}
+
+    def observe(self, event, duration, failed=False):
+        """Record a message of the event handled in `duration` seconds."""
+        timings = self.events.get(event)
+        if timings is None:
+            timings = self.events[event] = EventTimings(len(self.bounds) + 1)
+        timings.count += 1
+        timings.errors += failed
+        timings.total += duration
+        timings.buckets[bisect.bisect_left(self.bounds, duration)] += 1
+
+    @contextmanager
+    def timed(self, event):
+        """Time the enclosed block as a message of the event, counting it as an error if it raises."""
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.observe(event, time.perf_counter() - started, failed)
+
+    def snapshot(self):
+        """Return the timings of every event, the slowest in total first."""
+        labels = [str(bound) for bound in self.bounds] + [board_constants.INFINITY]
+        return {
+            event: {
+                board_constants.COUNT: timings.count,
+                board_constants.ERRORS: timings.errors,
+                board_constants.TOTAL_SECONDS: timings.total,
+                board_constants.AVG_SECONDS: timings.total / timings.count,
+                board_constants.LATENCY_BUCKETS: dict(zip(labels, timings.buckets)),
+            }
+            for event, timings in sorted(self.events.items(), key=lambda item: -item[1].total)
+        }
+
+    def clear(self):
+        self.events.clear()
+
+
+event_metrics = EventMetrics()
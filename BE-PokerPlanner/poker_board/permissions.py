@@ -1,4 +1,9 @@
-from rest_framework.permissions import IsAuthenticated
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission, IsAuthenticated
+
+from poker_board import constants as board_constants
 
 
 class BoardPermissions(IsAuthenticated):
@@ -10,3 +15,17 @@ class BoardPermissions(IsAuthenticated):
         if request.method == 'GET':
             return True
         return obj.manager.id == request.user.id
+
+
+class MetricsPermission(BasePermission):
+    """
+    A permission class allowing staff users, and the requests sending the token of the
+    POKER_BOARD_METRICS_TOKEN setting in the `X-Metrics-Token` header. The address of a
+    request is not trusted since behind the reverse proxy every request is local.
+    """
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        token = getattr(settings, 'POKER_BOARD_METRICS_TOKEN', None)
+        sent_token = request.META.get(board_constants.METRICS_TOKEN_HEADER)
+        return bool(token and sent_token) and hmac.compare_digest(token, sent_token)
@@ -0,0 +1,115 @@
+import functools
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from poker_board import constants as board_constants
+from poker_board.timers import timer_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    '''
+    Tracks the members connected to the games through the connections of the process.
+
+    The presence of a game is kept by the state `backend`, so that it is shared between
+    workers: a member is present from their first connection on any worker until their
+    last one drops, and the backend tells which call made them join or leave, so each
+    change is reported once. Every `heartbeat` seconds the process refreshes the
+    presence of its members for `ttl` seconds and drops the members no worker refreshed,
+    e.g. those of a worker which died.
+
+    Joins and leaves are merged per game for `debounce` seconds and sent as one diff, a
+    member leaving and joining again within it (a reconnect) is not sent at all.
+    Debounces and heartbeats are driven by the process wide `timer_scheduler`.
+    '''
+
+    def __init__(self, backend, scheduler=timer_scheduler, heartbeat=None, ttl=None, debounce=None):
+        self.backend = backend
+        self.scheduler = scheduler
+        self.heartbeat_interval = heartbeat or getattr(
+            settings, 'POKER_BOARD_PRESENCE_HEARTBEAT', board_constants.PRESENCE_HEARTBEAT_IN_SECONDS
+        )
+        self.ttl = ttl or getattr(settings, 'POKER_BOARD_PRESENCE_TTL', board_constants.PRESENCE_TTL_IN_SECONDS)
+        self.debounce = debounce if debounce is not None else getattr(
+            settings, 'POKER_BOARD_PRESENCE_DEBOUNCE', board_constants.PRESENCE_DEBOUNCE_IN_SECONDS
+        )
+        self.local = {}
+        self.pending = {}
+        self.on_change = {}
+
+    def key(self, game):
+        """Return the scheduler key of the debounce of the given game."""
+        return f'{board_constants.PRESENCE}:{game}'
+
+    async def joined(self, game, email, on_change):
+        """
+        Count a connection of the member to the game. `on_change` is a coroutine function
+        called with the diff of the presence of the game, {"joined": [...], "left": [...]}.
+        """
+        self.on_change[game] = on_change
+        members = self.local.setdefault(game, Counter())
+        members[email] += 1
+        if self.scheduler.get(board_constants.PRESENCE) is None:
+            self.scheduler.start(board_constants.PRESENCE, self.heartbeat_interval, on_expire=self.heartbeat)
+        if await self.backend.join_presence(game, email, time.time() + self.ttl):
+            self.changed(game, email, True)
+
+    async def left(self, game, email):
+        """Count a dropped connection of the member to the game."""
+        members = self.local.get(game)
+        if members is None or not members[email]:
+            return
+        members[email] -= 1
+        if not members[email]:
+            del members[email]
+        if not members:
+            del self.local[game]
+        if await self.backend.leave_presence(game, email):
+            self.changed(game, email, False)
+
+    def changed(self, game, email, present):
+        """Merge a join or a leave into the pending diff of the game."""
+        changes = self.pending.get(game)
+        if changes is None:
+            changes = self.pending[game] = {}
+            self.scheduler.start(self.key(game), self.debounce, on_expire=functools.partial(self.flush, game))
+        if changes.get(email, present) != present:
+            del changes[email]
+        else:
+            changes[email] = present
+
+    async def flush(self, game):
+        changes = self.pending.pop(game, None)
+        on_change = self.on_change.get(game)
+        if game not in self.local:
+            self.on_change.pop(game, None)
+        if not changes or on_change is None:
+            return
+        await on_change({
+            board_constants.JOINED: [email for email, present in changes.items() if present],
+            board_constants.LEFT: [email for email, present in changes.items() if not present],
+        })
+
+    async def heartbeat(self):
+        """Refresh the presence of the members of the process and drop the expired ones."""
+        now = time.time()
+        for game, members in list(self.local.items()):
+            try:
+                await self.backend.refresh_presence(game, list(members), now + self.ttl)
+                for email in await self.backend.expire_presence(game, now):
+                    self.changed(game, email, False)
+            except Exception:
+                logger.exception('Could not refresh the presence of %s', game)
+        if self.local:
+            self.scheduler.start(board_constants.PRESENCE, self.heartbeat_interval, on_expire=self.heartbeat)
+
+    def discard(self, game):
+        """Forget the connections and pending changes of a game which ended."""
+        self.scheduler.cancel(self.key(game))
+        self.local.pop(game, None)
+        self.pending.pop(game, None)
+        self.on_change.pop(game, None)
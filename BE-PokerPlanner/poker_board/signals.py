@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from poker_board.caches import admission_cache
+from poker_board.models import PokerBoard, PokerRole
+
+
+@receiver(post_delete, sender=PokerRole)
+@receiver(post_save, sender=PokerRole)
+def invalidate_member_admissions(sender, instance, **kwargs):
+    '''
+    Drop the cached admissions of the board of an added, updated or removed member, their
+    role and the members of the games of the board change with it.
+    '''
+    admission_cache.delete_where(lambda admission: admission['board_id'] == instance.poker_id)
+
+
+@receiver(post_save, sender=PokerBoard)
+def invalidate_board_admissions(sender, instance, created=False, **kwargs):
+    '''
+    Drop the cached admissions of an updated board (e.g. its manager or estimation choices).
+    '''
+    if not created:
+        admission_cache.delete_where(lambda admission: admission['board_id'] == instance.id)
@@ -0,0 +1,29 @@
+import asyncio
+
+
+class SingleFlight:
+    '''
+    Deduplicates concurrent calls of the same key into one in-flight call.
+
+    Callers arriving while a call of their key runs wait for its result instead of
+    starting their own. A cancelled caller does not cancel the shared call.
+    '''
+
+    def __init__(self):
+        self.calls = {}
+
+    def __len__(self):
+        return len(self.calls)
+
+    async def do(self, key, coroutine_function):
+        """Return the result of `coroutine_function()`, shared with the callers of the same key."""
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coroutine_function())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.forget(key, task))
+        return await asyncio.shield(task)
+
+    def forget(self, key, task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
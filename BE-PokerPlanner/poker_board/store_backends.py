@@ -0,0 +1,721 @@
+import json
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from redis import asyncio as redis_asyncio
+
+from poker_board import constants as board_constants
+from poker_board.game_session import GameSession
+from poker_board.ticket_statistics import TicketStatistics
+
+
+class BaseStateBackend:
+    '''
+    Interface of the state backend used by WebScoketStore.
+
+    A backend keeps the shareable part of a game (votes, member ids, ticket queue
+    and timer count) so that the game can be played from any ASGI worker.
+    Every method is a coroutine because a backend may live out of process.
+    `process_local` is True when the state lives in the memory of the process.
+    '''
+    process_local = False
+
+    async def create_session(self, game, timer_count, members):
+        """
+        Create the game state if it does not exist yet and register the members.
+        Return True if the game was created by this call.
+        """
+        raise NotImplementedError
+
+    async def delete_session(self, game):
+        """Delete the whole state of the game."""
+        raise NotImplementedError
+
+    async def approximate_size(self, game):
+        """Return the approximate number of bytes used by the game, or None if unknown."""
+        return None
+
+    async def get_votes(self, game):
+        """Return a dict of email -> estimation for the current ticket."""
+        raise NotImplementedError
+
+    async def set_vote(self, game, email, user_id, estimation):
+        """Store the estimation of a user and return all the votes."""
+        raise NotImplementedError
+
+    async def restore_votes(self, game, ticket_id, votes):
+        """
+        Restore the round of a loaded queue replayed from the vote journal: the ticket
+        with the given id is made the current one as it was when it was journaled, and
+        its (user id, estimation) votes are stored. Nothing is restored when the ticket
+        is no longer in the queue.
+        """
+        raise NotImplementedError
+
+    async def get_round_state(self, game):
+        """Return the state of the estimation round of the game, one of ROUND_STATES."""
+        raise NotImplementedError
+
+    async def set_round_state(self, game, state, from_states):
+        """
+        Move the round of the game to `state` if it is in one of `from_states`, in one
+        step. The votes and their aggregates are reset when a round starts voting.
+        Return True if the round moved.
+        """
+        raise NotImplementedError
+
+    async def get_statistics(self, game):
+        """Return the TicketStatistics of the votes on the current ticket."""
+        raise NotImplementedError
+
+    async def tickets_loaded(self, game):
+        """Return True once the ticket queue of the game has been loaded."""
+        raise NotImplementedError
+
+    async def load_tickets(self, game, tickets):
+        """
+        Load the ticket queue of the game with the given serialized tickets unless it
+        is already loaded, return True if the tickets were loaded by this call.
+        """
+        raise NotImplementedError
+
+    async def get_current_ticket(self, game):
+        """Return the serialized ticket at the head of the queue or None."""
+        raise NotImplementedError
+
+    async def get_current_ticket_payload(self, game):
+        """Return the json text of the ticket at the head of the queue or None."""
+        raise NotImplementedError
+
+    async def get_current_ticket_id(self, game):
+        """Return the id of the ticket at the head of the queue or None."""
+        ticket = await self.get_current_ticket(game)
+        return ticket[board_constants.ID] if ticket else None
+
+    async def skip_ticket(self, game):
+        """Move the ticket at the head of the queue to its end."""
+        raise NotImplementedError
+
+    async def reorder_tickets(self, game, ticket_ids):
+        """
+        Put the tickets with the given ids at the head of the queue in that order,
+        the other tickets keep their order after them.
+        """
+        raise NotImplementedError
+
+    async def jump_to_ticket(self, game, ticket_id):
+        """
+        Rotate the queue so that the ticket with the given id is at its head,
+        return False when the ticket is not in the queue.
+        """
+        raise NotImplementedError
+
+    async def change_ticket(self, game, ticket_id, ticket):
+        """
+        Append, replace or (with `ticket` None) remove the ticket with the given id in a
+        loaded queue. Returns the operation applied, one of INSERTED_TICKET,
+        UPDATED_TICKET and REMOVED_TICKET, or None when the queue did not change.
+        """
+        raise NotImplementedError
+
+    async def pop_ticket(self, game):
+        """
+        Remove the ticket at the head of the queue.
+
+        Returns a tuple (ticket, estimations) read in one step so that the
+        estimations, a list of (user id, estimation), belong to the popped ticket.
+        """
+        raise NotImplementedError
+
+    async def set_timer(self, game, time):
+        """Set the value of the timer to the given time."""
+        raise NotImplementedError
+
+    async def get_sequence(self, game):
+        """Return the sequence number of the last frame broadcast to the game, 0 if none."""
+        raise NotImplementedError
+
+    async def next_sequence(self, game):
+        """Return the sequence number of the next frame broadcast to the game."""
+        raise NotImplementedError
+
+    async def record_event(self, game, sequence, group_name, text):
+        """Keep the frame in the ring buffer of the last frames broadcast to the game."""
+        raise NotImplementedError
+
+    async def get_events(self, game, sequence):
+        """
+        Return the (group name, frame) of the frames broadcast to the game after the given
+        sequence number in order, or None when they are no longer all buffered.
+        """
+        raise NotImplementedError
+
+    async def join_presence(self, game, email, expires_at):
+        """
+        Count a connection of the member to the game, present until `expires_at` unless
+        refreshed. Return True if the member was not present, on any worker.
+        """
+        raise NotImplementedError
+
+    async def leave_presence(self, game, email):
+        """Count a dropped connection of the member, return True if it was their last one."""
+        raise NotImplementedError
+
+    async def refresh_presence(self, game, emails, expires_at):
+        """Keep the given present members present until `expires_at`."""
+        raise NotImplementedError
+
+    async def expire_presence(self, game, now):
+        """
+        Remove the members not refreshed until `now`, e.g. connected to a worker which died,
+        and return their emails.
+        """
+        raise NotImplementedError
+
+    async def get_presence(self, game):
+        """Return the emails of the members present."""
+        raise NotImplementedError
+
+    async def count_presence(self, game):
+        """Return the number of members present, in O(1)."""
+        raise NotImplementedError
+
+
+class InMemoryStateBackend(BaseStateBackend):
+    '''
+    Keeps the game state in GameSession objects of the current process.
+
+    Only usable when every participant of a session is connected to the same worker.
+    '''
+    process_local = True
+
+    def __init__(self, event_buffer_size=None):
+        self.sessions = {}
+        self.event_buffer_size = event_buffer_size or getattr(
+            settings, 'POKER_BOARD_EVENT_BUFFER_SIZE', board_constants.EVENT_BUFFER_SIZE
+        )
+
+    def __len__(self):
+        return len(self.sessions)
+
+    async def create_session(self, game, timer_count, members):
+        members = [(user[board_constants.EMAIL], user[board_constants.ID]) for user in members]
+        session = self.sessions.get(game)
+        if session is None:
+            self.sessions[game] = GameSession(timer_count, members)
+            return True
+        for email, user_id in members:
+            session.add_member(email, user_id)
+        return False
+
+    async def delete_session(self, game):
+        self.sessions.pop(game, None)
+
+    async def approximate_size(self, game):
+        session = self.sessions.get(game)
+        return session.approximate_size() if session is not None else None
+
+    async def get_votes(self, game):
+        return self.sessions[game].vote_dict()
+
+    async def set_vote(self, game, email, user_id, estimation):
+        session = self.sessions[game]
+        session.set_vote(user_id, estimation)
+        return session.vote_dict()
+
+    async def restore_votes(self, game, ticket_id, votes):
+        session = self.sessions[game]
+        if ticket_id is None or not session.jump_to_ticket(ticket_id):
+            return
+        for user_id, estimation in votes:
+            session.set_vote(user_id, estimation)
+        if votes:
+            session.round_state = board_constants.VOTING_ROUND
+
+    async def get_round_state(self, game):
+        return self.sessions[game].round_state
+
+    async def set_round_state(self, game, state, from_states):
+        return self.sessions[game].set_round_state(state, from_states)
+
+    async def get_statistics(self, game):
+        return self.sessions[game].ticket_statistics()
+
+    async def tickets_loaded(self, game):
+        return self.sessions[game].tickets_loaded
+
+    async def load_tickets(self, game, tickets):
+        session = self.sessions[game]
+        if session.tickets_loaded:
+            return False
+        session.load_tickets(tickets)
+        return True
+
+    async def get_current_ticket(self, game):
+        payload = await self.get_current_ticket_payload(game)
+        return json.loads(payload) if payload else None
+
+    async def get_current_ticket_payload(self, game):
+        ticket = self.sessions[game].current_ticket()
+        return ticket.payload if ticket else None
+
+    async def get_current_ticket_id(self, game):
+        ticket = self.sessions[game].current_ticket()
+        return ticket.id if ticket else None
+
+    async def skip_ticket(self, game):
+        self.sessions[game].skip_ticket()
+
+    async def reorder_tickets(self, game, ticket_ids):
+        self.sessions[game].reorder_tickets(ticket_ids)
+
+    async def jump_to_ticket(self, game, ticket_id):
+        return self.sessions[game].jump_to_ticket(ticket_id)
+
+    async def change_ticket(self, game, ticket_id, ticket):
+        return self.sessions[game].change_ticket(ticket_id, ticket)
+
+    async def pop_ticket(self, game):
+        session = self.sessions[game]
+        ticket = session.pop_ticket()
+        return json.loads(ticket.payload) if ticket else None, session.estimations()
+
+    async def set_timer(self, game, time):
+        self.sessions[game].timer = time
+
+    async def get_sequence(self, game):
+        return self.sessions[game].sequence
+
+    async def next_sequence(self, game):
+        return self.sessions[game].next_sequence()
+
+    async def record_event(self, game, sequence, group_name, text):
+        self.sessions[game].record_event(sequence, group_name, text, self.event_buffer_size)
+
+    async def get_events(self, game, sequence):
+        return self.sessions[game].events_since(sequence)
+
+    async def join_presence(self, game, email, expires_at):
+        return self.sessions[game].join_presence(email, expires_at)
+
+    async def leave_presence(self, game, email):
+        session = self.sessions.get(game)
+        return session is not None and session.leave_presence(email)
+
+    async def refresh_presence(self, game, emails, expires_at):
+        self.sessions[game].refresh_presence(emails, expires_at)
+
+    async def expire_presence(self, game, now):
+        return self.sessions[game].expire_presence(now)
+
+    async def get_presence(self, game):
+        return self.sessions[game].present_members()
+
+    async def count_presence(self, game):
+        return len(self.sessions[game].presence or ())
+
+
+class RedisStateBackend(BaseStateBackend):
+    '''
+    Keeps the game state in Redis so that every worker sees the same game.
+
+    Each game uses eight keys:
+    - <prefix>:<game>:votes   hash of email -> json encoded estimation
+    - <prefix>:<game>:members hash of email -> user id
+    - <prefix>:<game>:tickets list of json encoded tickets, head is the current ticket
+    - <prefix>:<game>:meta    hash holding the timer count, whether the tickets are loaded,
+                              the sequence number of the last frame and the round state
+    - <prefix>:<game>:events  sorted set of "<group name> <frame>" scored by sequence number
+    - <prefix>:<game>:stats   hash of the running aggregates of the votes (count, sum,
+                              squares and h<estimation> -> number of votes)
+    - <prefix>:<game>:presence    sorted set of the emails of the present members scored
+                                  by the expiry of their presence
+    - <prefix>:<game>:connections hash of email -> connections of the present members
+
+    Operations which read and write more than one key are sent as a single
+    MULTI/EXEC pipeline so that concurrent workers never observe a half applied change.
+    '''
+
+    def __init__(self, client=None, url=None, key_prefix=None, ttl=None, event_buffer_size=None):
+        self.client = client or redis_asyncio.Redis.from_url(
+            url or getattr(settings, 'POKER_BOARD_STATE_REDIS_URL', board_constants.STATE_REDIS_URL),
+            decode_responses=True
+        )
+        self.key_prefix = key_prefix or getattr(
+            settings, 'POKER_BOARD_STATE_KEY_PREFIX', board_constants.STATE_KEY_PREFIX
+        )
+        self.ttl = ttl or getattr(settings, 'POKER_BOARD_STATE_TTL', board_constants.STATE_TTL_IN_SECONDS)
+        self.event_buffer_size = event_buffer_size or getattr(
+            settings, 'POKER_BOARD_EVENT_BUFFER_SIZE', board_constants.EVENT_BUFFER_SIZE
+        )
+
+    def key(self, game, suffix):
+        """Return the redis key holding the given part of the game state."""
+        return f'{self.key_prefix}:{game}:{suffix}'
+
+    def decode_votes(self, votes):
+        return {email: json.loads(estimation) for email, estimation in votes.items()}
+
+    def decode_members(self, members):
+        return {email: int(user_id) for email, user_id in members.items()}
+
+    async def create_session(self, game, timer_count, members):
+        # HSETNX keeps the votes and timer of a game already started on another worker.
+        votes_key = self.key(game, board_constants.VOTES_KEY)
+        members_key = self.key(game, board_constants.MEMBERS_KEY)
+        meta_key = self.key(game, board_constants.META_KEY)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hsetnx(meta_key, board_constants.TIMER, timer_count)
+        for user in members:
+            pipe.hsetnx(
+                votes_key, user[board_constants.EMAIL], json.dumps(board_constants.NOT_ESTIMATED)
+            )
+            pipe.hset(members_key, user[board_constants.EMAIL], user[board_constants.ID])
+        for key in (votes_key, members_key, meta_key):
+            pipe.expire(key, self.ttl)
+        return bool((await pipe.execute())[0])
+
+    async def delete_session(self, game):
+        await self.client.delete(*[
+            self.key(game, suffix) for suffix in (
+                board_constants.VOTES_KEY, board_constants.MEMBERS_KEY,
+                board_constants.TICKETS_KEY, board_constants.META_KEY, board_constants.STATS_KEY,
+                board_constants.EVENTS_KEY, board_constants.PRESENCE_KEY, board_constants.CONNECTIONS_KEY
+            )
+        ])
+
+    async def get_votes(self, game):
+        return self.decode_votes(await self.client.hgetall(self.key(game, board_constants.VOTES_KEY)))
+
+    async def set_vote(self, game, email, user_id, estimation):
+        # WATCH makes the vote start over when the previous vote changes concurrently,
+        # so that the aggregates always match the votes.
+        votes_key = self.key(game, board_constants.VOTES_KEY)
+        stats_key = self.key(game, board_constants.STATS_KEY)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(votes_key)
+                    previous = await pipe.hget(votes_key, email)
+                    pipe.multi()
+                    pipe.hset(votes_key, email, json.dumps(estimation))
+                    if previous is not None:
+                        self.count_vote(pipe, stats_key, json.loads(previous), -1)
+                    self.count_vote(pipe, stats_key, estimation, 1)
+                    pipe.expire(stats_key, self.ttl)
+                    pipe.hgetall(votes_key)
+                    votes = (await pipe.execute())[-1]
+                    return self.decode_votes(votes)
+                except redis_asyncio.WatchError:
+                    continue
+
+    def count_vote(self, pipe, stats_key, estimation, sign):
+        """Add (sign 1) or remove (sign -1) an estimation from the aggregates of the votes."""
+        if estimation == board_constants.NOT_ESTIMATED:
+            return
+        pipe.hincrby(stats_key, board_constants.COUNT, sign)
+        pipe.hincrby(stats_key, board_constants.SUM, sign * estimation)
+        pipe.hincrby(stats_key, board_constants.SQUARES, sign * estimation * estimation)
+        pipe.hincrby(stats_key, f'h{estimation}', sign)
+
+    async def get_statistics(self, game):
+        stats = await self.client.hgetall(self.key(game, board_constants.STATS_KEY))
+        counts = {
+            int(field[1:]): int(votes) for field, votes in stats.items() if field.startswith('h') and int(votes)
+        }
+        return TicketStatistics.from_counts(
+            int(stats.get(board_constants.COUNT, 0)), int(stats.get(board_constants.SUM, 0)),
+            int(stats.get(board_constants.SQUARES, 0)), counts
+        )
+
+    async def restore_votes(self, game, ticket_id, votes):
+        # WATCH makes the restore start over when the queue or the members change
+        # concurrently, the queue, the votes, their aggregates and the round are written
+        # in one MULTI/EXEC.
+        tickets_key = self.key(game, board_constants.TICKETS_KEY)
+        members_key = self.key(game, board_constants.MEMBERS_KEY)
+        votes_key = self.key(game, board_constants.VOTES_KEY)
+        stats_key = self.key(game, board_constants.STATS_KEY)
+        if ticket_id is None:
+            return
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(tickets_key, members_key)
+                    payloads = await pipe.lrange(tickets_key, 0, -1)
+                    index = next((
+                        index for index, payload in enumerate(payloads)
+                        if json.loads(payload)[board_constants.ID] == ticket_id
+                    ), None)
+                    if index is None:
+                        await pipe.unwatch()
+                        return
+                    emails = {
+                        user_id: email for email, user_id in self.decode_members(await pipe.hgetall(members_key)).items()
+                    }
+                    pipe.multi()
+                    if index:
+                        pipe.delete(tickets_key)
+                        pipe.rpush(tickets_key, *(payloads[index:] + payloads[:index]))
+                        pipe.expire(tickets_key, self.ttl)
+                    pipe.delete(stats_key)
+                    for user_id, estimation in votes:
+                        if user_id in emails:
+                            pipe.hset(votes_key, emails[user_id], json.dumps(estimation))
+                            self.count_vote(pipe, stats_key, estimation, 1)
+                    if votes:
+                        pipe.expire(stats_key, self.ttl)
+                        pipe.hset(self.key(game, board_constants.META_KEY), board_constants.ROUND, board_constants.VOTING_ROUND)
+                    await pipe.execute()
+                    return
+                except redis_asyncio.WatchError:
+                    continue
+
+    async def get_round_state(self, game):
+        return await self.client.hget(
+            self.key(game, board_constants.META_KEY), board_constants.ROUND
+        ) or board_constants.IDLE_ROUND
+
+    async def set_round_state(self, game, state, from_states):
+        # WATCH makes the transition start over when the round moves concurrently, so
+        # that a round is started, revealed or finalized by one worker only.
+        meta_key = self.key(game, board_constants.META_KEY)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(meta_key)
+                    current = await pipe.hget(meta_key, board_constants.ROUND) or board_constants.IDLE_ROUND
+                    if current not in from_states:
+                        await pipe.unwatch()
+                        return False
+                    emails = []
+                    if state == board_constants.VOTING_ROUND:
+                        emails = await pipe.hkeys(self.key(game, board_constants.MEMBERS_KEY))
+                    pipe.multi()
+                    pipe.hset(meta_key, board_constants.ROUND, state)
+                    if state == board_constants.VOTING_ROUND:
+                        pipe.delete(self.key(game, board_constants.STATS_KEY))
+                        if emails:
+                            pipe.hset(self.key(game, board_constants.VOTES_KEY), mapping={
+                                email: json.dumps(board_constants.NOT_ESTIMATED) for email in emails
+                            })
+                    await pipe.execute()
+                    return True
+                except redis_asyncio.WatchError:
+                    continue
+
+    async def tickets_loaded(self, game):
+        return bool(await self.client.hexists(
+            self.key(game, board_constants.META_KEY), board_constants.TICKETS_LOADED
+        ))
+
+    async def load_tickets(self, game, tickets):
+        # WATCH makes the load fail when another worker loads the tickets concurrently.
+        tickets_key = self.key(game, board_constants.TICKETS_KEY)
+        meta_key = self.key(game, board_constants.META_KEY)
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(meta_key)
+                if await pipe.hexists(meta_key, board_constants.TICKETS_LOADED):
+                    return False
+                pipe.multi()
+                pipe.delete(tickets_key)
+                if tickets:
+                    pipe.rpush(tickets_key, *[json.dumps(ticket) for ticket in tickets])
+                    pipe.expire(tickets_key, self.ttl)
+                pipe.hset(meta_key, board_constants.TICKETS_LOADED, 1)
+                await pipe.execute()
+            except redis_asyncio.WatchError:
+                return False
+        return True
+
+    async def get_current_ticket(self, game):
+        payload = await self.get_current_ticket_payload(game)
+        return json.loads(payload) if payload else None
+
+    async def get_current_ticket_payload(self, game):
+        return await self.client.lindex(self.key(game, board_constants.TICKETS_KEY), 0)
+
+    async def skip_ticket(self, game):
+        tickets_key = self.key(game, board_constants.TICKETS_KEY)
+        await self.client.lmove(tickets_key, tickets_key, 'LEFT', 'RIGHT')
+
+    async def rewrite_tickets(self, game, rewrite):
+        """
+        Replace the ticket queue with `rewrite(payloads)` unless it returns None, under
+        WATCH so that a concurrent change of the queue makes the rewrite start over.
+        Returns True if the queue was rewritten.
+        """
+        tickets_key = self.key(game, board_constants.TICKETS_KEY)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(tickets_key)
+                    payloads = rewrite(await pipe.lrange(tickets_key, 0, -1))
+                    if payloads is None:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.delete(tickets_key)
+                    if payloads:
+                        pipe.rpush(tickets_key, *payloads)
+                        pipe.expire(tickets_key, self.ttl)
+                    await pipe.execute()
+                    return True
+                except redis_asyncio.WatchError:
+                    continue
+
+    async def reorder_tickets(self, game, ticket_ids):
+        position = {ticket_id: index for index, ticket_id in enumerate(ticket_ids)}
+
+        def rewrite(payloads):
+            return sorted(payloads, key=lambda payload: position.get(
+                json.loads(payload)[board_constants.ID], len(position)
+            ))
+        await self.rewrite_tickets(game, rewrite)
+
+    async def jump_to_ticket(self, game, ticket_id):
+        def rewrite(payloads):
+            for index, payload in enumerate(payloads):
+                if json.loads(payload)[board_constants.ID] == ticket_id:
+                    return payloads[index:] + payloads[:index]
+            return None
+        return await self.rewrite_tickets(game, rewrite)
+
+    async def change_ticket(self, game, ticket_id, ticket):
+        if not await self.tickets_loaded(game):
+            return None
+        operation = None
+
+        def rewrite(payloads):
+            nonlocal operation
+            payload = json.dumps(ticket) if ticket is not None else None
+            for index, queued in enumerate(payloads):
+                if json.loads(queued)[board_constants.ID] != ticket_id:
+                    continue
+                if payload is None:
+                    operation = board_constants.REMOVED_TICKET
+                    return payloads[:index] + payloads[index + 1:]
+                if payload == queued:
+                    return None
+                operation = board_constants.UPDATED_TICKET
+                return payloads[:index] + [payload] + payloads[index + 1:]
+            if payload is None:
+                return None
+            operation = board_constants.INSERTED_TICKET
+            return payloads + [payload]
+        return operation if await self.rewrite_tickets(game, rewrite) else None
+
+    async def pop_ticket(self, game):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lpop(self.key(game, board_constants.TICKETS_KEY))
+        pipe.hgetall(self.key(game, board_constants.VOTES_KEY))
+        pipe.hgetall(self.key(game, board_constants.MEMBERS_KEY))
+        ticket, votes, members = await pipe.execute()
+        member_ids = self.decode_members(members)
+        estimations = [
+            (member_ids[email], estimation) for email, estimation in self.decode_votes(votes).items()
+            if estimation != board_constants.NOT_ESTIMATED and email in member_ids
+        ]
+        return json.loads(ticket) if ticket else None, estimations
+
+    async def set_timer(self, game, time):
+        await self.client.hset(self.key(game, board_constants.META_KEY), board_constants.TIMER, time)
+
+    async def get_sequence(self, game):
+        return int(await self.client.hget(self.key(game, board_constants.META_KEY), board_constants.SEQUENCE) or 0)
+
+    async def next_sequence(self, game):
+        return await self.client.hincrby(self.key(game, board_constants.META_KEY), board_constants.SEQUENCE, 1)
+
+    async def record_event(self, game, sequence, group_name, text):
+        events_key = self.key(game, board_constants.EVENTS_KEY)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zadd(events_key, {f'{group_name} {text}': sequence})
+        pipe.zremrangebyrank(events_key, 0, -self.event_buffer_size - 1)
+        pipe.expire(events_key, self.ttl)
+        await pipe.execute()
+
+    async def get_events(self, game, sequence):
+        events_key = self.key(game, board_constants.EVENTS_KEY)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hget(self.key(game, board_constants.META_KEY), board_constants.SEQUENCE)
+        pipe.zrange(events_key, 0, 0, withscores=True)
+        pipe.zrangebyscore(events_key, f'({sequence}', '+inf')
+        last_sequence, oldest, events = await pipe.execute()
+        if sequence >= int(last_sequence or 0):
+            return []
+        if not oldest or oldest[0][1] > sequence + 1:
+            return None
+        return [tuple(event.split(' ', 1)) for event in events]
+
+    async def join_presence(self, game, email, expires_at):
+        presence_key = self.key(game, board_constants.PRESENCE_KEY)
+        connections_key = self.key(game, board_constants.CONNECTIONS_KEY)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hincrby(connections_key, email, 1)
+        pipe.zadd(presence_key, {email: expires_at}, gt=True)
+        for key in (presence_key, connections_key):
+            pipe.expire(key, self.ttl)
+        return (await pipe.execute())[0] == 1
+
+    async def leave_presence(self, game, email):
+        # WATCH makes the leave start over when another worker counts a connection meanwhile.
+        presence_key = self.key(game, board_constants.PRESENCE_KEY)
+        connections_key = self.key(game, board_constants.CONNECTIONS_KEY)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(connections_key)
+                    connections = int(await pipe.hget(connections_key, email) or 0)
+                    if not connections:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    if connections > 1:
+                        pipe.hincrby(connections_key, email, -1)
+                    else:
+                        pipe.hdel(connections_key, email)
+                        pipe.zrem(presence_key, email)
+                    await pipe.execute()
+                    return connections == 1
+                except redis_asyncio.WatchError:
+                    continue
+
+    async def refresh_presence(self, game, emails, expires_at):
+        if emails:
+            await self.client.zadd(
+                self.key(game, board_constants.PRESENCE_KEY), {email: expires_at for email in emails}, xx=True
+            )
+
+    async def expire_presence(self, game, now):
+        presence_key = self.key(game, board_constants.PRESENCE_KEY)
+        connections_key = self.key(game, board_constants.CONNECTIONS_KEY)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(presence_key)
+                    expired = await pipe.zrangebyscore(presence_key, '-inf', now)
+                    if not expired:
+                        await pipe.unwatch()
+                        return []
+                    pipe.multi()
+                    pipe.zrem(presence_key, *expired)
+                    pipe.hdel(connections_key, *expired)
+                    await pipe.execute()
+                    return expired
+                except redis_asyncio.WatchError:
+                    continue
+
+    async def get_presence(self, game):
+        return await self.client.zrange(self.key(game, board_constants.PRESENCE_KEY), 0, -1)
+
+    async def count_presence(self, game):
+        return await self.client.zcard(self.key(game, board_constants.PRESENCE_KEY))
+
+
+def get_state_backend():
+    """Instantiate the state backend configured by POKER_BOARD_STATE_BACKEND."""
+    return import_string(
+        getattr(settings, 'POKER_BOARD_STATE_BACKEND', board_constants.STATE_BACKEND)
+    )()
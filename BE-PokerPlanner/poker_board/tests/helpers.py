@@ -0,0 +1,63 @@
+import json
+
+from poker_board import constants as board_constants
+from poker_board.consumers import PokerBoardAsyncConsumer
+from poker_user.serializers import PokerUser
+
+
+class ConsumerTestMixin:
+    '''
+    Builds PokerBoardAsyncConsumer instances as `connect` leaves them for a user of the
+    game of the test case, without a websocket.
+
+    The frames a consumer sends are decoded and recorded in its `sent_frames` and the
+    codes it closes the connection with in its `closed`. Keyword arguments of
+    `get_consumer` are set as attributes of the consumer, to replace a database query
+    for instance.
+    '''
+    game = 'pokerboard1session1'
+    members = []
+
+    def get_consumer(self, user_id=1, role=board_constants.PLAYER, game=None, **attributes):
+        consumer = PokerBoardAsyncConsumer()
+        consumer.current_game = game or self.game
+        consumer.channel_name = f'channel{user_id}'
+        consumer.scope = {board_constants.USER: PokerUser(id=user_id, email=f'abc{user_id}@example.com')}
+        consumer.pokerboard_manager_id = 1
+        consumer.role = role
+        consumer.session = None
+        consumer.board_id = 1
+        consumer.estimation_choices = []
+        consumer.game_members = self.members
+        consumer.player_count = len(self.members)
+        consumer.timer_mode = board_constants.TICK_TIMER_MODE
+        consumer.timer_count = 0
+        consumer.player_group = f'player_group{consumer.current_game}'
+        consumer.manager_group = f'manager_group{consumer.current_game}'
+        consumer.sent_frames = []
+        consumer.closed = []
+
+        async def send(text_data=None, bytes_data=None, close=False):
+            consumer.sent_frames.append(json.loads(text_data))
+
+        async def send_json(content, close=False):
+            await send(json.dumps(content))
+
+        async def base_send(message):
+            if message['type'] == 'websocket.close':
+                consumer.closed.append(message.get('code'))
+
+        consumer.send = send
+        consumer.send_json = send_json
+        consumer.base_send = base_send
+        for name, value in attributes.items():
+            setattr(consumer, name, value)
+        return consumer
+
+    def sent_types(self, consumer):
+        """Return the types of the frames the consumer sent."""
+        return [frame['type'] for frame in consumer.sent_frames]
+
+    def sent_data(self, consumer):
+        """Return the data of the frames the consumer sent."""
+        return [frame['data'] for frame in consumer.sent_frames]
@@ -0,0 +1,337 @@
+import asyncio
+import functools
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import SimpleTestCase, override_settings
+
+from poker_board import constants as board_constants
+from poker_board.coalescing import VoteCoalescer, vote_coalescer
+from poker_board.consumers import broadcast_votes_delta, encode_frame, obj
+from poker_board.fanout import LocalFanout
+from poker_board.tests.helpers import ConsumerTestMixin
+from poker_board.timers import TimerScheduler, timer_scheduler
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}, POKER_BOARD_LOCAL_FANOUT=False
+)
+class BroadcastFrameTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the frames encoded once by the sender of a group message.
+
+    Here are the details of the tests:
+        `test_encode_frame`:
+            checks that a frame is valid json, also with data which is already encoded.
+        `test_sender_gets_its_own_frame`:
+            checks that the sender and the other consumers of a group get their own frame.
+        `test_current_ticket_is_sent_as_stored`:
+            checks that the ticket of a new round is sent as the json text kept by the store.
+    '''
+    game = 'pokerboard3session4'
+
+    def setUp(self):
+        async_to_sync(obj.create_game_instance)(self.game, 30, [])
+        self.addCleanup(async_to_sync(obj.delete_game_instance), self.game)
+
+    def test_encode_frame(self):
+        self.assertEqual(
+            {'type': board_constants.TIMER, 'data': {'a': [1, None]}},
+            json.loads(encode_frame(board_constants.TIMER, {'a': [1, None]}))
+        )
+        self.assertEqual(
+            {'type': board_constants.GET_CURRENT_TICKET, 'data': {'id': 5}},
+            json.loads(encode_frame(board_constants.GET_CURRENT_TICKET, encoded_data='{"id": 5}'))
+        )
+
+    def test_sender_gets_its_own_frame(self):
+        sender = self.get_consumer(channel_name='sender')
+        other = self.get_consumer(channel_name='other')
+
+        async def scenario():
+            channel_layer = get_channel_layer()
+            sender.channel_layer = channel_layer
+            await channel_layer.group_add(sender.player_group, 'other')
+            await sender.send_group_frame(
+                sender.player_group, board_constants.CARD_SELECTED_BY_PLAYER, {board_constants.EMAIL: 'a'},
+                sender_type=board_constants.CARD_SELECTED, sender_data={board_constants.CARD: 3}
+            )
+            message = await channel_layer.receive('other')
+            await channel_layer.group_discard(sender.player_group, 'other')
+            await sender.broadcast_frame(message)
+            await other.broadcast_frame(message)
+        async_to_sync(scenario)()
+        self.assertEqual(
+            [{'seq': 1, 'type': board_constants.CARD_SELECTED, 'data': {board_constants.CARD: 3}}],
+            sender.sent_frames
+        )
+        self.assertEqual(
+            [{'seq': 1, 'type': board_constants.CARD_SELECTED_BY_PLAYER, 'data': {board_constants.EMAIL: 'a'}}],
+            other.sent_frames
+        )
+
+    def test_current_ticket_is_sent_as_stored(self):
+        consumer = self.get_consumer()
+        ticket = {board_constants.ID: 1, 'user_estimation': []}
+
+        async def scenario():
+            channel_layer = get_channel_layer()
+            consumer.channel_layer = channel_layer
+            await channel_layer.group_add(consumer.player_group, 'listener')
+            await obj.create_game_instance(self.game, 30, [])
+            await obj.load_database_tickets([ticket], self.game)
+            await consumer.get_current_ticket()
+            message = await channel_layer.receive('listener')
+            await channel_layer.group_discard(consumer.player_group, 'listener')
+            return message
+        message = async_to_sync(scenario)()
+        self.assertIn(async_to_sync(obj.get_current_ticket_payload)(self.game), message[board_constants.TEXT])
+        self.assertEqual({'seq': 1, 'type': board_constants.ROUND, 'data': {
+            board_constants.ROUND_STATE: board_constants.VOTING_ROUND, board_constants.TICKET: ticket
+        }}, json.loads(message[board_constants.TEXT]))
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}, POKER_BOARD_LOCAL_FANOUT=False
+)
+class VoteCoalescerTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the coalescing of card selections into `votes_delta` messages.
+
+    Here are the details of the tests:
+        `test_votes_of_a_window_are_flushed_once`:
+            checks that the votes of a window are flushed once with the last vote of each member.
+        `test_window_is_not_extended_by_votes`:
+            checks that a vote is not delayed by more than the window by the votes after it.
+        `test_buffered_votes_are_sent_before_other_messages`:
+            checks that buffered votes are flushed before the next message of the game.
+    '''
+    game = 'pokerboard5session6'
+
+    def vote(self, email, card):
+        return {board_constants.EVENT: board_constants.CARD_SELECTED, board_constants.EMAIL: email,
+                board_constants.CARD: card}
+
+    def test_votes_of_a_window_are_flushed_once(self):
+        coalescer = VoteCoalescer(TimerScheduler())
+        flushes = []
+
+        async def scenario():
+            async def on_flush(votes):
+                flushes.append(votes)
+            coalescer.add(self.game, 'a', self.vote('a', 1), 0.02, on_flush)
+            coalescer.add(self.game, 'b', self.vote('b', 2), 0.02, on_flush)
+            coalescer.add(self.game, 'a', self.vote('a', 3), 0.02, on_flush)
+            await asyncio.sleep(0.05)
+        async_to_sync(scenario)()
+        self.assertEqual([[self.vote('b', 2), self.vote('a', 3)]], flushes)
+        self.assertEqual(0, len(coalescer))
+
+    def test_window_is_not_extended_by_votes(self):
+        coalescer = VoteCoalescer(TimerScheduler())
+        flushes = []
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            started_at = loop.time()
+
+            async def on_flush(votes):
+                flushes.append((loop.time() - started_at, [vote[board_constants.EMAIL] for vote in votes]))
+            for email in 'abcdef':
+                coalescer.add(self.game, email, self.vote(email, 1), 0.05, on_flush)
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.1)
+        async_to_sync(scenario)()
+        self.assertGreater(len(flushes), 1)
+        self.assertLess(flushes[0][0], 0.09)
+        self.assertEqual(list('abcdef'), [email for _, emails in flushes for email in emails])
+
+    def test_buffered_votes_are_sent_before_other_messages(self):
+        consumer = self.get_consumer()
+        votes_delta = functools.partial(
+            broadcast_votes_delta, consumer.player_group, consumer.manager_group, game=self.game
+        )
+
+        async def scenario():
+            channel_layer = get_channel_layer()
+            consumer.channel_layer = channel_layer
+            await obj.create_game_instance(self.game, 30, [])
+            await channel_layer.group_add(consumer.player_group, 'player')
+            await channel_layer.group_add(consumer.manager_group, 'listener')
+            vote_coalescer.add(self.game, 'a', self.vote('a', 5), 10, votes_delta)
+            await consumer.send_group_frame(consumer.player_group, board_constants.FINAL_ESTIMATION, {})
+            frames = [
+                json.loads((await channel_layer.receive(channel))[board_constants.TEXT])
+                for channel in ('player', 'player', 'listener')
+            ]
+            await channel_layer.group_discard(consumer.player_group, 'player')
+            await channel_layer.group_discard(consumer.manager_group, 'listener')
+            await obj.delete_game_instance(self.game)
+            return frames
+        frames = async_to_sync(scenario)()
+        self.assertEqual([
+            {'seq': 1, 'type': board_constants.VOTES_DELTA, 'data': [{board_constants.EMAIL: 'a'}]},
+            {'seq': 3, 'type': board_constants.FINAL_ESTIMATION, 'data': {}},
+            {'seq': 2, 'type': board_constants.VOTES_DELTA, 'data': [self.vote('a', 5)]},
+        ], frames)
+        self.assertIsNone(timer_scheduler.get(vote_coalescer.key(self.game)))
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class LocalFanoutTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the in-process delivery of group messages.
+
+    Here are the details of the tests:
+        `test_local_consumers_get_messages_in_process`:
+            checks that consumers of the process get group messages without the channel layer.
+        `test_shared_fanout_publishes_once_for_other_workers`:
+            checks that another worker gets the message once and the sender does not get it twice.
+    '''
+    group_name = 'player_grouppokerboard9session9'
+
+    def frame(self, text):
+        return {'type': board_constants.BROADCAST_FRAME, board_constants.TEXT: text,
+                board_constants.SENDER_CHANNEL_NAME: None}
+
+    def test_local_consumers_get_messages_in_process(self):
+        fanout = LocalFanout(shared=False)
+        consumers = [self.get_consumer(1), self.get_consumer(2)]
+
+        async def scenario():
+            for consumer in consumers:
+                await fanout.add(self.group_name, consumer)
+            await fanout.group_send(self.group_name, self.frame('1'))
+            await fanout.discard(self.group_name, consumers[1])
+            await fanout.group_send(self.group_name, self.frame('2'))
+        async_to_sync(scenario)()
+        self.assertEqual([[1, 2], [1]], [consumer.sent_frames for consumer in consumers])
+        self.assertEqual(0, fanout.published)
+        self.assertEqual(3, fanout.local_deliveries)
+
+    def test_shared_fanout_publishes_once_for_other_workers(self):
+        workers = [LocalFanout(), LocalFanout()]
+        consumers = [self.get_consumer(1), self.get_consumer(2)]
+
+        async def scenario():
+            for worker, consumer in zip(workers, consumers):
+                await worker.add(self.group_name, consumer)
+            await workers[0].group_send(self.group_name, self.frame('1'))
+            await asyncio.sleep(0.05)
+            for worker, consumer in zip(workers, consumers):
+                await worker.discard(self.group_name, consumer)
+                worker.reader.cancel()
+        async_to_sync(scenario)()
+        self.assertEqual([[1], [1]], [consumer.sent_frames for consumer in consumers])
+        self.assertEqual([1, 0], [worker.published for worker in workers])
+        self.assertEqual({}, workers[0].groups)
+
+
+@override_settings(POKER_BOARD_LARGE_ROOM_SIZE=3, POKER_BOARD_VOTES_AGGREGATE_INTERVAL=0.01)
+class LargeRoomTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the votes of large rooms.
+
+    Here are the details of the tests:
+        `test_room_gets_throttled_aggregates`:
+            checks that only managers get a frame per vote and the room one aggregate per interval.
+    '''
+    game = 'pokerboard11session12'
+    members = [{'id': user_id, 'email': f'abc{user_id}@example.com'} for user_id in range(1, 5)]
+
+    def setUp(self):
+        async_to_sync(obj.create_game_instance)(self.game, 30, self.members)
+        async_to_sync(obj.set_round_state)(self.game, board_constants.VOTING_ROUND, (board_constants.IDLE_ROUND,))
+        self.addCleanup(async_to_sync(obj.delete_game_instance), self.game)
+
+    def test_room_gets_throttled_aggregates(self):
+        manager = self.get_consumer(1, 2)
+        players = [self.get_consumer(user_id, board_constants.PLAYER) for user_id in (2, 3)]
+        spectator = self.get_consumer(4, 1)
+
+        async def scenario():
+            await manager.add_channels_to_group(manager.manager_group)
+            for consumer in [manager, spectator] + players:
+                await consumer.add_channels_to_group(consumer.player_group)
+            for card in (1, 2):
+                for player in players:
+                    await player.receive_json({board_constants.EVENT: board_constants.CARD_SELECTED,
+                                               board_constants.CARD: card})
+            await asyncio.sleep(0.05)
+            for consumer in [manager, spectator] + players:
+                await consumer.discard_channel_from_group(consumer.player_group)
+            await manager.discard_channel_from_group(manager.manager_group)
+            return await obj.events_since(self.game, 0, [manager.player_group])
+        frames = async_to_sync(scenario)()
+        self.assertEqual(
+            [board_constants.CARD_SELECTED_BY_PLAYER_FOR_MANAGER] * 4 + [board_constants.VOTES_AGGREGATE],
+            self.sent_types(manager)
+        )
+        self.assertEqual([board_constants.VOTES_AGGREGATE], self.sent_types(spectator))
+        self.assertEqual(
+            [board_constants.CARD_SELECTED] * 2 + [board_constants.VOTES_AGGREGATE], self.sent_types(players[0])
+        )
+        self.assertEqual({board_constants.VOTED: 2, board_constants.MEMBERS: 4}, json.loads(frames[0])['data'])
+
+
+class ResyncTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the resync of reconnecting clients.
+
+    Here are the details of the tests:
+        `test_missed_frames_are_sent_to_the_client_only`:
+            checks that a client gets the frames of its groups it missed, and nobody else does.
+        `test_snapshot_when_frames_are_no_longer_buffered`:
+            checks that a client which missed too many frames gets one snapshot.
+    '''
+    game = 'pokerboard7session8'
+    members = [{'id': 1, 'email': 'abc1@example.com'}, {'id': 2, 'email': 'abc2@example.com'}]
+
+    def setUp(self):
+        async_to_sync(obj.create_game_instance)(self.game, 30, self.members)
+        self.addCleanup(async_to_sync(obj.delete_game_instance), self.game)
+
+    def resync(self, consumer, sequence):
+        async_to_sync(consumer.receive_json)({board_constants.EVENT: board_constants.RESYNC, 'seq': sequence})
+        return consumer.sent_frames
+
+    def test_missed_frames_are_sent_to_the_client_only(self):
+        player = self.get_consumer(2)
+
+        async def scenario():
+            player.channel_layer = get_channel_layer()
+            await player.send_group_frame(player.player_group, board_constants.SKIP_TICKET, 1)
+            await player.send_group_frame(player.manager_group, board_constants.CARD_SELECTED, 2)
+            await player.send_group_frame(player.player_group, board_constants.SKIP_TICKET, 3)
+        async_to_sync(scenario)()
+        self.assertEqual([
+            {'seq': 3, 'type': board_constants.SKIP_TICKET, 'data': 3},
+        ], self.resync(player, 1))
+        self.assertEqual([1, 2, 3], [frame['seq'] for frame in self.resync(self.get_consumer(1), 0)])
+
+    def test_snapshot_when_frames_are_no_longer_buffered(self):
+        manager, player = self.get_consumer(1), self.get_consumer(2)
+        size = obj.backend.event_buffer_size
+        obj.backend.event_buffer_size = 1
+        self.addCleanup(setattr, obj.backend, 'event_buffer_size', size)
+
+        async def scenario():
+            player.channel_layer = get_channel_layer()
+            await obj.load_database_tickets([{board_constants.ID: 4}], self.game)
+            await obj.set_round_state(self.game, board_constants.VOTING_ROUND, (board_constants.IDLE_ROUND,))
+            await obj.user_estimation('abc2@example.com', 2, 5, self.game)
+            await player.send_group_frame(player.player_group, board_constants.SKIP_TICKET, 1)
+            await player.send_group_frame(player.player_group, board_constants.SKIP_TICKET, 2)
+        async_to_sync(scenario)()
+        self.assertEqual([{'seq': 2, 'type': board_constants.SNAPSHOT, 'data': {
+            board_constants.ROUND: board_constants.VOTING_ROUND,
+            board_constants.TICKET: {board_constants.ID: 4},
+            board_constants.VOTED: ['abc2@example.com'],
+            board_constants.PRESENT: [],
+            board_constants.REMAINING_TIME: None,
+        }}], self.resync(player, 0))
+        self.assertEqual(
+            {'abc1@example.com': board_constants.NOT_ESTIMATED, 'abc2@example.com': 5},
+            self.resync(manager, 0)[0]['data'][board_constants.VOTES]
+        )
@@ -0,0 +1,229 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from poker_board import constants as board_constants
+from poker_board.consumers import local_fanout
+from poker_board.flow_control import OutboundQueue, RateLimiter, flow_control_stats
+from poker_board.metrics import EventMetrics, event_metrics
+from poker_board.tests.helpers import ConsumerTestMixin
+from poker_board.timers import timer_scheduler
+from poker_board.views import MetricsApiView
+from poker_user.serializers import PokerUser
+
+
+class EventDispatchTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the routing of client events and their metrics.
+
+    Here are the details of the tests:
+        `test_events_are_routed_by_role_guard`:
+            checks that manager events of a player and unknown events are ignored.
+        `test_latency_and_errors_are_recorded`:
+            checks the latency histogram and error count of an event.
+        `test_metrics_endpoint_needs_token_or_staff`:
+            checks that only staff users and requests with the metrics token can read the metrics.
+    '''
+    game = 'pokerboard5session6'
+
+    def setUp(self):
+        event_metrics.clear()
+        self.addCleanup(event_metrics.clear)
+
+    def test_events_are_routed_by_role_guard(self):
+        handled = []
+
+        async def on_skip_ticket(content):
+            handled.append(content[board_constants.EMAIL])
+        manager = self.get_consumer(1, 2, on_skip_ticket=on_skip_ticket)
+        player = self.get_consumer(2, board_constants.PLAYER, on_skip_ticket=on_skip_ticket)
+        skip = {board_constants.EVENT: board_constants.SKIP_TICKET}
+        async_to_sync(manager.receive_json)(dict(skip))
+        async_to_sync(player.receive_json)(dict(skip))
+        async_to_sync(manager.receive_json)({board_constants.EVENT: 'unknown'})
+        self.assertEqual(['abc1@example.com'], handled)
+        self.assertEqual([board_constants.SKIP_TICKET], list(event_metrics.snapshot()))
+
+    def test_latency_and_errors_are_recorded(self):
+        metrics = EventMetrics(bounds=(0.01, 1))
+        metrics.observe(board_constants.CARD_SELECTED, 0.001)
+        metrics.observe(board_constants.CARD_SELECTED, 0.5)
+        with self.assertRaises(KeyError):
+            with metrics.timed(board_constants.CARD_SELECTED):
+                raise KeyError(board_constants.CARD)
+        timings = metrics.snapshot()[board_constants.CARD_SELECTED]
+        self.assertEqual(3, timings[board_constants.COUNT])
+        self.assertEqual(1, timings[board_constants.ERRORS])
+        self.assertEqual({'0.01': 2, '1': 1, board_constants.INFINITY: 0}, timings[board_constants.LATENCY_BUCKETS])
+
+    @override_settings(POKER_BOARD_METRICS_TOKEN='secret')
+    def test_metrics_endpoint_needs_token_or_staff(self):
+        event_metrics.observe(board_constants.FETCH_TICKET, 0.002)
+        factory, view = APIRequestFactory(), MetricsApiView.as_view()
+        response = view(factory.get('/boards/metrics/', HTTP_X_METRICS_TOKEN='secret'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data[board_constants.EVENTS][board_constants.FETCH_TICKET][board_constants.COUNT])
+        self.assertIn(board_constants.RESIDENT_SESSIONS, response.data[board_constants.SESSIONS])
+        for headers in ({}, {'HTTP_X_METRICS_TOKEN': 'guess'}):
+            response = view(factory.get('/boards/metrics/', **headers))
+            self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        for is_staff, status_code in ((False, status.HTTP_403_FORBIDDEN), (True, status.HTTP_200_OK)):
+            request = factory.get('/boards/metrics/')
+            force_authenticate(request, user=PokerUser(id=1, is_staff=is_staff))
+            self.assertEqual(status_code, view(request).status_code)
+
+
+class FlowControlTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the rate limits and outbound queues of connections.
+
+    Here are the details of the tests:
+        `test_token_bucket_refills_up_to_burst`:
+            checks that an event is allowed `burst` times at once and then at its rate.
+        `test_over_limit_messages_are_dropped_or_deferred`:
+            checks that over-limit messages are dropped, or deferred and only the last one handled.
+        `test_slow_consumer_is_closed`:
+            checks that a full outbound queue drops the waiting frames and closes the connection.
+        `test_failed_send_closes_connection`:
+            checks that a frame which cannot be written closes the connection without counting a slow consumer.
+    '''
+    game = 'pokerboard5session7'
+
+    def setUp(self):
+        flow_control_stats.clear()
+        self.addCleanup(flow_control_stats.clear)
+
+    def test_token_bucket_refills_up_to_burst(self):
+        now = [0]
+        limiter = RateLimiter({board_constants.CARD_SELECTED: (2, 3)}, clock=lambda: now[0])
+        self.assertEqual([True, True, True, False], [limiter.allow(board_constants.CARD_SELECTED) for _ in range(4)])
+        self.assertEqual(0.5, limiter.wait_time(board_constants.CARD_SELECTED))
+        now[0] = 0.5
+        self.assertEqual([True, False], [limiter.allow(board_constants.CARD_SELECTED) for _ in range(2)])
+        now[0] = 10
+        self.assertEqual(3, sum(limiter.allow(board_constants.CARD_SELECTED) for _ in range(5)))
+        self.assertTrue(all(limiter.allow(board_constants.SKIP_TICKET) for _ in range(10)))
+
+    @override_settings(POKER_BOARD_EVENT_RATE_LIMITS={
+        board_constants.CARD_SELECTED: (20, 1), board_constants.FETCH_TICKET: (20, 1),
+    })
+    def test_over_limit_messages_are_dropped_or_deferred(self):
+        handled = []
+
+        async def on_card_selected(content):
+            handled.append(content[board_constants.CARD])
+
+        async def on_fetch_tickets(content):
+            handled.append(board_constants.FETCH_TICKET)
+        consumer = self.get_consumer(2, on_card_selected=on_card_selected, on_fetch_tickets=on_fetch_tickets)
+
+        async def scenario():
+            for card in (1, 2, 3):
+                await consumer.receive_json({board_constants.EVENT: board_constants.CARD_SELECTED, board_constants.CARD: card})
+            for _ in range(2):
+                await consumer.receive_json({board_constants.EVENT: board_constants.FETCH_TICKET})
+            await asyncio.sleep(0.1)
+        async_to_sync(scenario)()
+        self.assertEqual([1, board_constants.FETCH_TICKET, 3], handled)
+        self.assertEqual({
+            board_constants.DROPPED_MESSAGES: {board_constants.FETCH_TICKET: 1},
+            board_constants.COALESCED_MESSAGES: {board_constants.CARD_SELECTED: 2},
+            board_constants.SLOW_CONSUMERS: 0,
+            board_constants.PEAK_OUTBOUND_DEPTH: 0,
+            board_constants.FAILED_SENDS: 0,
+            board_constants.REAPED_CONNECTIONS: 0,
+        }, flow_control_stats.snapshot())
+
+    def test_slow_consumer_is_closed(self):
+        sent = []
+
+        async def scenario():
+            unblocked = asyncio.Event()
+
+            async def send(message):
+                await unblocked.wait()
+                sent.append(message)
+            outbound = OutboundQueue(send, 2)
+            for index in range(4):
+                await outbound.put({'type': 'websocket.send', 'text': str(index)})
+                await asyncio.sleep(0)
+            unblocked.set()
+            await asyncio.sleep(0.01)
+            outbound.close()
+        async_to_sync(scenario)()
+        self.assertEqual([
+            {'type': 'websocket.send', 'text': '0'},
+            {'type': 'websocket.close', 'code': board_constants.SLOW_CONSUMER_CLOSE_CODE},
+        ], sent)
+        self.assertEqual(1, flow_control_stats.slow_consumers)
+        self.assertEqual(2, flow_control_stats.peak_outbound_depth)
+
+    def test_failed_send_closes_connection(self):
+        sent = []
+
+        async def scenario():
+            async def send(message):
+                if message.get('text') == '1':
+                    raise ConnectionResetError()
+                sent.append(message)
+            outbound = OutboundQueue(send, 2)
+            for index in range(5):
+                await outbound.put({'type': 'websocket.send', 'text': str(index)})
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+            outbound.close()
+        with self.assertLogs('poker_board.flow_control', 'ERROR'):
+            async_to_sync(scenario)()
+        self.assertEqual([
+            {'type': 'websocket.send', 'text': '0'},
+            {'type': 'websocket.close', 'code': board_constants.SEND_ERROR_CLOSE_CODE},
+        ], sent)
+        self.assertEqual((1, 0), (flow_control_stats.failed_sends, flow_control_stats.slow_consumers))
+
+
+@override_settings(POKER_BOARD_HEARTBEAT_INTERVAL=0.01, POKER_BOARD_MISSED_HEARTBEATS=2)
+class HeartbeatTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the heartbeats of connections.
+
+    Here are the details of the tests:
+        `test_answering_connection_is_kept`:
+            checks that a connection answering the pings is pinged and never reaped.
+        `test_silent_connection_is_reaped`:
+            checks that a connection missing the pings is closed, leaves its groups and is counted.
+    '''
+    game = 'pokerboard19session20'
+
+    def setUp(self):
+        flow_control_stats.clear()
+        self.addCleanup(flow_control_stats.clear)
+
+    def run_connection(self, consumer, answer):
+        async def scenario():
+            await consumer.add_channels_to_group(consumer.player_group)
+            consumer.start_heartbeat()
+            for _ in range(12):
+                await asyncio.sleep(0.005)
+                if answer:
+                    await consumer.receive_json({board_constants.EVENT: board_constants.PONG})
+            await consumer.disconnect(1000)
+        async_to_sync(scenario)()
+
+    def test_answering_connection_is_kept(self):
+        consumer = self.get_consumer()
+        self.run_connection(consumer, answer=True)
+        self.assertGreaterEqual(self.sent_types(consumer).count(board_constants.PING), 3)
+        self.assertEqual([], consumer.closed)
+        self.assertEqual(0, flow_control_stats.reaped_connections)
+        self.assertIsNone(timer_scheduler.get(consumer.heartbeat_key()))
+
+    def test_silent_connection_is_reaped(self):
+        consumer = self.get_consumer()
+        self.run_connection(consumer, answer=False)
+        self.assertEqual([board_constants.PING, board_constants.PING], self.sent_types(consumer))
+        self.assertEqual([board_constants.IDLE_CONNECTION_CLOSE_CODE], consumer.closed)
+        self.assertEqual(1, flow_control_stats.reaped_connections)
+        self.assertNotIn(consumer.player_group, local_fanout.groups)
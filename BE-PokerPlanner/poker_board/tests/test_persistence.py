@@ -0,0 +1,223 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from ddf import G
+from django.test import SimpleTestCase, TestCase
+
+from poker_board import constants as board_constants
+from poker_board.consumers import WebScoketStore
+from poker_board.journal import VoteJournalWriter
+from poker_board.store_backends import InMemoryStateBackend
+from poker_board.timers import TimerScheduler
+from poker_board.write_behind import EstimationWriter
+from board_session.models import BoardSession, VoteJournal
+from poker_ticket.models import PokerUserEstimation, Ticket
+from poker_user.serializers import PokerUser
+
+
+class EstimationWriterTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the write-behind persistence of final estimations.
+
+    Here are the details of the tests:
+        `test_estimations_of_every_game_are_written_in_one_batch`:
+            checks that the estimations queued within the delay are written once.
+        `test_full_batch_and_close_write_right_away`:
+            checks that a full queue is written at once and that closing writes the rest.
+        `test_failed_batch_is_queued_again`:
+            checks that a batch which could not be written is retried before the newer rows.
+    '''
+
+    def get_writer(self, **kwargs):
+        writer = EstimationWriter(TimerScheduler(), **kwargs)
+        writer.batches = []
+        writer.write = writer.batches.append
+        return writer
+
+    def test_estimations_of_every_game_are_written_in_one_batch(self):
+        writer = self.get_writer(delay=0.01, batch_size=10)
+        store = WebScoketStore(InMemoryStateBackend())
+
+        async def scenario():
+            await writer.add(1, 3, store.final_estimation(1, [(1, 3), (2, 5)]))
+            await writer.add(7, 8, store.final_estimation(7, [(3, 8)]))
+            await asyncio.sleep(0.05)
+        async_to_sync(scenario)()
+        self.assertEqual(1, len(writer.batches))
+        self.assertEqual([(1, 3), (7, 8)], [(ticket.id, ticket.final_estimation) for ticket, _ in writer.batches[0]])
+        self.assertEqual([2, 1], [len(user_estimations) for _, user_estimations in writer.batches[0]])
+        self.assertTrue(all(ticket.is_estimated and ticket.updated_at for ticket, _ in writer.batches[0]))
+
+    def test_full_batch_and_close_write_right_away(self):
+        writer = self.get_writer(delay=30, batch_size=2)
+
+        async def scenario():
+            for ticket_id in range(3):
+                await writer.add(ticket_id, 1, [])
+        async_to_sync(scenario)()
+        self.assertEqual([[0, 1]], [[ticket.id for ticket, _ in batch] for batch in writer.batches])
+        writer.close()
+        self.assertEqual([2], [ticket.id for ticket, _ in writer.batches[1]])
+        self.assertEqual(0, len(writer))
+
+    def test_failed_batch_is_queued_again(self):
+        writer = self.get_writer(delay=0.01, batch_size=10)
+        failures = [ConnectionError('database is unreachable')]
+
+        def write(batch):
+            if failures:
+                raise failures.pop()
+            writer.batches.append(batch)
+        writer.write = write
+
+        async def scenario():
+            await writer.add(1, 3, [])
+            await writer.flush()
+            self.assertEqual(1, len(writer))
+            await writer.add(2, 5, [])
+            await asyncio.sleep(0.05)
+        async_to_sync(scenario)()
+        self.assertEqual([[1, 2]], [[ticket.id for ticket, _ in batch] for batch in writer.batches])
+        self.assertEqual(0, len(writer))
+
+
+class EstimationWriterDatabaseTestCases(TestCase):
+    '''
+    This is a test case class for the final estimations written to the database.
+
+    Here are the details of the tests:
+        `test_deleted_ticket_does_not_roll_back_batch`:
+            checks that the estimations of a batch are written when one of its tickets was deleted.
+        `test_failed_ticket_does_not_roll_back_batch`:
+            checks that a ticket whose estimations cannot be inserted is the only one not written.
+    '''
+
+    def setUp(self):
+        self.user = G(PokerUser)
+        self.tickets = [G(Ticket), G(Ticket), G(Ticket)]
+        self.writer = EstimationWriter(TimerScheduler(), delay=30)
+        self.store = WebScoketStore(InMemoryStateBackend())
+
+    def add(self, ticket, estimation):
+        async_to_sync(self.writer.add)(
+            ticket.id, estimation, self.store.final_estimation(ticket.id, [(self.user.id, estimation)])
+        )
+
+    def assert_estimated(self, tickets):
+        self.assertEqual(
+            sorted(ticket.id for ticket in tickets),
+            sorted(Ticket.objects.filter(is_estimated=True).values_list('id', flat=True))
+        )
+        self.assertEqual(
+            sorted(ticket.id for ticket in tickets),
+            sorted(PokerUserEstimation.objects.values_list('ticket_id', flat=True))
+        )
+
+    def test_deleted_ticket_does_not_roll_back_batch(self):
+        ticket_1, ticket_2, ticket_3 = self.tickets
+        self.add(ticket_1, 3)
+        self.add(ticket_2, 5)
+        self.add(ticket_3, 8)
+        ticket_2.delete()
+        async_to_sync(self.writer.flush)()
+        self.assert_estimated([ticket_1, ticket_3])
+        self.assertEqual(0, len(self.writer))
+
+    def test_failed_ticket_does_not_roll_back_batch(self):
+        ticket_1, ticket_2, ticket_3 = self.tickets
+        G(PokerUserEstimation, user=self.user, ticket=ticket_2, estimate=1)
+        self.add(ticket_1, 3)
+        self.add(ticket_2, 5)
+        self.add(ticket_3, 8)
+        async_to_sync(self.writer.flush)()
+        self.assertEqual(
+            [ticket_1.id, ticket_3.id], list(Ticket.objects.filter(is_estimated=True).order_by('id').values_list('id', flat=True))
+        )
+        self.assertEqual(1, PokerUserEstimation.objects.get(ticket=ticket_2).estimate)
+        self.assertEqual(0, len(self.writer))
+
+
+class VoteJournalTestCases(TestCase):
+    '''
+    This is a test case class for the vote journal of the games kept in process memory.
+
+    Here are the details of the tests:
+        `test_game_is_rebuilt_with_votes_of_current_round`:
+            checks that a game created again gets back only the last votes of the current round.
+        `test_skipped_to_ticket_is_current_again_once_rebuilt`:
+            checks that a game rebuilt after a skip votes again on the ticket skipped to.
+        `test_journal_of_ended_session_is_deleted`:
+            checks that the journal of a session is deleted once it ends.
+    '''
+
+    def setUp(self):
+        self.users = [G(PokerUser), G(PokerUser)]
+        self.members = [{'id': user.id, 'email': user.email} for user in self.users]
+        self.session = G(BoardSession)
+        self.journal = VoteJournalWriter(TimerScheduler(), delay=30)
+        self.store = WebScoketStore(InMemoryStateBackend(), self.journal)
+        self.game = f'pokerboard{self.session.board_id}session{self.session.id}'
+
+    async def vote(self, user, estimation):
+        await self.store.user_estimation(user.email, user.id, estimation, self.game, session=self.session.id)
+
+    async def rebuild(self, tickets):
+        await self.store.delete_game_instance(self.game)
+        await self.store.create_game_instance(self.game, 30, self.members)
+        await self.store.load_database_tickets(tickets, self.game, session=self.session.id)
+
+    def test_game_is_rebuilt_with_votes_of_current_round(self):
+        user_1, user_2 = self.users
+
+        async def scenario():
+            await self.store.create_game_instance(self.game, 30, self.members)
+            await self.store.load_database_tickets([{'id': 1}, {'id': 2}], self.game, session=self.session.id)
+            await self.vote(user_1, 3)
+            await self.store.pop_ticket(self.game, session=self.session.id)
+            await self.vote(user_1, 5)
+            await self.vote(user_2, 8)
+            await self.vote(user_1, 13)
+            await self.rebuild([{'id': 2}])
+            return await self.store.websocket_store(self.game)
+        votes = async_to_sync(scenario)()
+        self.assertEqual({user_1.email: 13, user_2.email: 8}, votes)
+        self.assertEqual(
+            [(1, 3), (2, None), (2, 5), (2, 8), (2, 13)],
+            list(VoteJournal.objects.filter(session=self.session).order_by('id').values_list('ticket_id', 'estimation'))
+        )
+
+    def test_skipped_to_ticket_is_current_again_once_rebuilt(self):
+        user_1, _ = self.users
+        tickets = [{'id': 1}, {'id': 2}, {'id': 3}]
+
+        async def scenario():
+            await self.store.create_game_instance(self.game, 30, self.members)
+            await self.store.load_database_tickets(tickets, self.game, session=self.session.id)
+            await self.store.set_round_state(
+                self.game, board_constants.VOTING_ROUND, board_constants.ROUND_STATES, session=self.session.id
+            )
+            await self.store.skip_ticket(self.game)
+            await self.store.set_round_state(
+                self.game, board_constants.VOTING_ROUND, board_constants.ROUND_STATES, session=self.session.id
+            )
+            await self.vote(user_1, 5)
+            await self.rebuild(tickets)
+            round_state = await self.store.get_round_state(self.game)
+            ticket, estimations = await self.store.pop_ticket(self.game, session=self.session.id)
+            return round_state, ticket, estimations, await self.store.get_current_ticket(self.game)
+        round_state, ticket, estimations, next_ticket = async_to_sync(scenario)()
+        self.assertEqual(board_constants.VOTING_ROUND, round_state)
+        self.assertEqual({'id': 2}, ticket)
+        self.assertEqual([(user_1.id, 5)], estimations)
+        self.assertEqual({'id': 3}, next_ticket)
+
+    def test_journal_of_ended_session_is_deleted(self):
+        async def scenario():
+            await self.store.create_game_instance(self.game, 30, self.members)
+            await self.vote(self.users[0], 3)
+            await self.journal.flush()
+            await self.vote(self.users[1], 5)
+            await self.store.discard_journal(self.session.id)
+        async_to_sync(scenario)()
+        self.assertEqual(0, len(self.journal))
+        self.assertFalse(VoteJournal.objects.filter(session=self.session).exists())
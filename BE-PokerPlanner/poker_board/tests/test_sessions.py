@@ -0,0 +1,593 @@
+import asyncio
+import functools
+import json
+import time
+from collections import Counter
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from ddf import G
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from poker_board import constants as board_constants
+from poker_board.caches import TTLCache, admission_cache
+from poker_board.consumers import WebScoketStore, complete_round, obj, ticket_loads
+from poker_board.lifecycle import SessionLifecycle
+from poker_board.models import PokerRole
+from poker_board.presence import PresenceTracker
+from poker_board.single_flight import SingleFlight
+from poker_board.ticket_feed import TicketFeed, ticket_changes, ticket_feed_group
+from poker_board.store_backends import InMemoryStateBackend
+from poker_board.tests.helpers import ConsumerTestMixin
+from poker_board.timers import TimerScheduler
+from poker_board.write_behind import estimation_writer
+from board_session.models import BoardSession
+
+
+class AdmissionCacheTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the admission data cached on websocket connect.
+
+    Here are the details of the tests:
+        `test_ttl_cache_expires_and_evicts_least_recently_used`:
+            checks the time to live and the size limit of TTLCache.
+        `test_reconnect_uses_cached_admission`:
+            checks that a reconnect of the same user to the same session does not query again.
+        `test_non_member_is_not_cached`:
+            checks that a user without a role on the board is refused every time.
+        `test_membership_change_drops_admissions_of_board`:
+            checks that saving or deleting a role of a board drops the cached admissions of the board only.
+    '''
+    admission = {
+        'id': 2, 'board_id': 1, 'board__manager_id': 7, 'board__estimation_choices': [1, 2, None], 'timer': 30, board_constants.ROLE: board_constants.PLAYER,
+        board_constants.PLAYER_COUNT: 1,
+        'member_ids': [7, 9], 'member_emails': ['abc7@example.com', 'abc9@example.com'],
+    }
+
+    def setUp(self):
+        self.ttl, admission_cache.ttl = admission_cache.ttl, 60
+        self.queries = 0
+
+    def tearDown(self):
+        admission_cache.ttl = self.ttl
+        admission_cache.clear()
+
+    def get_connecting_consumer(self, user_id, admission):
+        """Return a consumer connecting to session 2 whose admission query returns the given data and is counted."""
+
+        def admission_query(session_id, user_id):
+            self.queries += 1
+            return admission
+        consumer = self.get_consumer(user_id, admission_query=admission_query)
+        consumer.scope['url_route'] = {'kwargs': {'id': '2'}}
+        return consumer
+
+    def test_ttl_cache_expires_and_evicts_least_recently_used(self):
+        cache = TTLCache(60, 2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((1, None, 3), (cache.get('a'), cache.get('b'), cache.get('c')))
+        cache.ttl = -1
+        cache.set('a', 4)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(1, len(cache))
+        disabled = TTLCache(0, 2)
+        disabled.set('a', 1)
+        self.assertIsNone(disabled.get('a'))
+
+    def test_reconnect_uses_cached_admission(self):
+        first, second = self.get_connecting_consumer(9, self.admission), self.get_connecting_consumer(9, self.admission)
+        self.assertTrue(async_to_sync(first.authentication_database_query)())
+        self.assertTrue(async_to_sync(second.authentication_database_query)())
+        self.assertEqual(1, self.queries)
+        self.assertEqual('pokerboard1session2', second.current_game)
+        self.assertEqual(
+            [{board_constants.ID: 7, board_constants.EMAIL: 'abc7@example.com'},
+             {board_constants.ID: 9, board_constants.EMAIL: 'abc9@example.com'}],
+            second.game_members
+        )
+        self.assertEqual(7, second.pokerboard_manager_id)
+
+    def test_non_member_is_not_cached(self):
+        admission = dict(self.admission, **{board_constants.ROLE: None})
+        for queries in (1, 2):
+            consumer = self.get_connecting_consumer(4, admission)
+            self.assertFalse(async_to_sync(consumer.authentication_database_query)())
+            self.assertEqual(queries, self.queries)
+
+    def test_membership_change_drops_admissions_of_board(self):
+        other_board_admission = dict(self.admission, board_id=3)
+        for signal in (post_save, post_delete):
+            admission_cache.set((2, 9), self.admission)
+            admission_cache.set((2, 7), self.admission)
+            admission_cache.set((4, 9), other_board_admission)
+            signal.send(sender=PokerRole, instance=PokerRole(poker_id=1, user_id=7))
+            self.assertEqual(
+                (None, None, other_board_admission),
+                (admission_cache.get((2, 9)), admission_cache.get((2, 7)), admission_cache.get((4, 9)))
+            )
+
+
+class TicketLoadingTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the single-flight loading of the tickets of a session.
+
+    Here are the details of the tests:
+        `test_concurrent_fetches_query_once`:
+            checks that a room fetching the tickets at once queries the database once.
+        `test_shared_call_survives_cancelled_caller`:
+            checks that cancelling one caller does not cancel the call of the others.
+    '''
+    game = 'pokerboard7session8'
+    tickets = [{'id': 1, 'jira_ticket': 'PP-1'}]
+
+    def serialized_tickets(self):
+        """Stands for the ticket query of the consumers, counted in `queries`."""
+        self.queries += 1
+        time.sleep(0.01)
+        return self.tickets
+
+    def test_concurrent_fetches_query_once(self):
+        self.queries = 0
+
+        async def scenario():
+            await obj.create_game_instance(self.game, 30, [])
+            consumers = [self.get_consumer(serialized_tickets=self.serialized_tickets) for _ in range(41)]
+            await asyncio.gather(*[consumer.ticket_database_query() for consumer in consumers[:40]])
+            await consumers[40].ticket_database_query()
+        async_to_sync(scenario)()
+        self.assertEqual(1, self.queries)
+        self.assertEqual(0, len(ticket_loads))
+        self.assertEqual(self.tickets[0], async_to_sync(obj.get_current_ticket)(self.game))
+
+    def test_shared_call_survives_cancelled_caller(self):
+        flight = SingleFlight()
+
+        async def scenario():
+            async def call():
+                await asyncio.sleep(0.02)
+                return 'tickets'
+            first = asyncio.ensure_future(flight.do('game', call))
+            second = asyncio.ensure_future(flight.do('game', call))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+        self.assertEqual('tickets', async_to_sync(scenario)())
+
+
+class SessionLifecycleTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the eviction of the games kept by WebScoketStore.
+
+    Here are the details of the tests:
+        `test_end_tears_down_game`:
+            checks that an ended session leaves nothing behind.
+        `test_idle_game_is_evicted`:
+            checks that a game is evicted after its last connection drops, unless it reconnects.
+        `test_least_recently_used_idle_game_is_evicted`:
+            checks that only games without connections are evicted over the resident limit.
+        `test_stats`:
+            checks the counters of resident games and their approximate size.
+    '''
+    members = [{'id': 1, 'email': 'abc1@example.com'}]
+
+    def setUp(self):
+        self.store = WebScoketStore(InMemoryStateBackend())
+        self.scheduler = TimerScheduler()
+        self.lifecycle = SessionLifecycle(self.store, self.scheduler, idle_ttl=0.01, max_sessions=2)
+
+    async def connect(self, game):
+        await self.store.create_game_instance(game, 30, self.members)
+        await self.lifecycle.connected(game)
+
+    def test_end_tears_down_game(self):
+        async def scenario():
+            await self.connect('game1')
+            self.scheduler.start('game1', 30, on_expire=asyncio.sleep)
+            await self.lifecycle.end('game1')
+            self.lifecycle.disconnected('game1')
+        async_to_sync(scenario)()
+        self.assertEqual(0, len(self.store.backend))
+        self.assertEqual(0, len(self.lifecycle))
+        self.assertEqual(0, len(self.scheduler))
+        self.assertEqual(1, self.lifecycle.ended)
+
+    def test_idle_game_is_evicted(self):
+        async def scenario():
+            await self.connect('game1')
+            await self.connect('game2')
+            self.lifecycle.disconnected('game1')
+            self.lifecycle.disconnected('game2')
+            await self.connect('game2')
+            await asyncio.sleep(0.05)
+        async_to_sync(scenario)()
+        self.assertEqual(['game2'], list(self.store.backend.sessions))
+        self.assertEqual(1, self.lifecycle.evicted_idle)
+
+    def test_least_recently_used_idle_game_is_evicted(self):
+        self.lifecycle.idle_ttl = 30
+
+        async def scenario():
+            await self.connect('game1')
+            await self.connect('game2')
+            self.lifecycle.disconnected('game2')
+            self.lifecycle.disconnected('game1')
+            self.lifecycle.touch('game1')
+            await self.connect('game3')
+        async_to_sync(scenario)()
+        self.assertEqual(['game1', 'game3'], sorted(self.store.backend.sessions))
+        self.assertEqual(1, self.lifecycle.evicted_lru)
+        self.assertIsNone(self.scheduler.get(self.lifecycle.key('game2')))
+
+    def test_stats(self):
+        async def scenario():
+            await self.connect('game1')
+            await self.connect('game1')
+            await self.store.load_database_tickets([{'id': 1, 'summary': 'x' * 1000}], 'game1')
+            return await self.lifecycle.stats()
+        stats = async_to_sync(scenario)()
+        self.assertEqual(1, stats[board_constants.RESIDENT_SESSIONS])
+        self.assertEqual(2, stats[board_constants.CONNECTIONS])
+        self.assertGreater(stats[board_constants.APPROXIMATE_BYTES_PER_SESSION], 2000)
+
+
+class RoundStateTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the round state machine of the server.
+
+    Here are the details of the tests:
+        `test_round_lifecycle`:
+            checks one `round` frame per state change, that votes and final estimations
+            outside of a round are ignored and that finalizing saves the ticket and resets the votes.
+        `test_current_ticket_of_running_round`:
+            checks that a client asking for the current ticket of a running round gets its own frame.
+        `test_auto_rounds_finalize_on_consensus`:
+            checks that auto rounds are revealed once every player voted and finalized on consensus.
+        `test_auto_rounds_without_consensus`:
+            checks that without consensus an auto round expired by the timer is only revealed.
+        `test_auto_round_is_completed_without_connection`:
+            checks that the timer completes an auto round once the connection which started it is gone.
+    '''
+    game = 'pokerboard13session14'
+    members = [{'id': user_id, 'email': f'abc{user_id}@example.com'} for user_id in (1, 2)]
+
+    def setUp(self):
+        async_to_sync(obj.create_game_instance)(self.game, 30, self.members)
+        async_to_sync(obj.load_database_tickets)([{board_constants.ID: 4}, {board_constants.ID: 5}], self.game)
+        self.addCleanup(async_to_sync(obj.delete_game_instance), self.game)
+        self.written = []
+        estimation_writer.write = lambda batch: self.written.extend(
+            (ticket.id, ticket.final_estimation) for ticket, _ in batch
+        )
+        self.addCleanup(vars(estimation_writer).pop, 'write')
+        self.addCleanup(estimation_writer.close)
+
+    @property
+    def saved(self):
+        """The final estimations queued to `estimation_writer`, written instead of to the database."""
+        estimation_writer.close()
+        return self.written
+
+    def test_round_lifecycle(self):
+        manager, player = self.get_consumer(1), self.get_consumer(2)
+
+        async def scenario():
+            for consumer in (manager, player):
+                await consumer.add_channels_to_group(consumer.player_group)
+            await player.on_card_selected({board_constants.EMAIL: 'abc2@example.com', board_constants.CARD: 3})
+            await manager.finalize_round(5)
+            await manager.get_current_ticket()
+            await obj.user_estimation('abc2@example.com', 2, 3, self.game)
+            await manager.reveal_round()
+            await player.reveal_round()
+            await player.on_card_selected({board_constants.EMAIL: 'abc2@example.com', board_constants.CARD: 8})
+            analysis = json.loads(json.dumps(await obj.ticket_analysis(self.game, [])))
+            await manager.finalize_round(3)
+            for consumer in (manager, player):
+                await consumer.discard_channel_from_group(consumer.player_group)
+            return analysis
+        analysis = async_to_sync(scenario)()
+        self.assertEqual([
+            {board_constants.ROUND_STATE: board_constants.VOTING_ROUND, board_constants.TICKET: {board_constants.ID: 4}},
+            {board_constants.ROUND_STATE: board_constants.REVEALED_ROUND, board_constants.TICKET: {board_constants.ID: 4},
+             board_constants.VOTES: {'abc1@example.com': board_constants.NOT_ESTIMATED, 'abc2@example.com': 3},
+             board_constants.ANALYSIS: analysis},
+            {board_constants.ROUND_STATE: board_constants.FINALIZED_ROUND, board_constants.ID: 4,
+             board_constants.ESTIAMTION: 3},
+            {board_constants.ROUND_STATE: board_constants.VOTING_ROUND, board_constants.TICKET: {board_constants.ID: 5}},
+        ], self.sent_data(manager))
+        self.assertEqual(len(manager.sent_frames) + 1, len(player.sent_frames))
+        self.assertEqual([(4, 3)], self.saved)
+        self.assertEqual(
+            {'abc1@example.com': board_constants.NOT_ESTIMATED, 'abc2@example.com': board_constants.NOT_ESTIMATED},
+            async_to_sync(obj.websocket_store)(self.game)
+        )
+
+    def test_current_ticket_of_running_round(self):
+        manager, player = self.get_consumer(1), self.get_consumer(2)
+
+        async def scenario():
+            await manager.add_channels_to_group(manager.player_group)
+            await manager.get_current_ticket()
+            await player.get_current_ticket()
+            await manager.discard_channel_from_group(manager.player_group)
+        async_to_sync(scenario)()
+        self.assertEqual(1, len(manager.sent_frames))
+        self.assertEqual(self.sent_data(manager), self.sent_data(player))
+
+    @override_settings(POKER_BOARD_AUTO_ROUNDS=True, POKER_BOARD_CONSENSUS_PERCENTAGE=100)
+    def test_auto_rounds_finalize_on_consensus(self):
+        players = [self.get_consumer(user_id) for user_id in (1, 2)]
+
+        async def scenario():
+            await players[0].add_channels_to_group(players[0].player_group)
+            await players[0].get_current_ticket()
+            for player in players:
+                await player.on_card_selected({board_constants.EMAIL: player.scope[board_constants.USER].email,
+                                               board_constants.CARD: 5})
+            await players[0].discard_channel_from_group(players[0].player_group)
+        async_to_sync(scenario)()
+        self.assertEqual([
+            board_constants.VOTING_ROUND, board_constants.REVEALED_ROUND,
+            board_constants.FINALIZED_ROUND, board_constants.VOTING_ROUND
+        ], [
+            data[board_constants.ROUND_STATE] for data in self.sent_data(players[0]) if board_constants.ROUND_STATE in data
+        ])
+        self.assertEqual([(4, 5)], self.saved)
+
+    @override_settings(POKER_BOARD_AUTO_ROUNDS=True, POKER_BOARD_CONSENSUS_PERCENTAGE=100)
+    def test_auto_rounds_without_consensus(self):
+        player = self.get_consumer(2)
+        expired = []
+
+        async def on_expire():
+            expired.append(await obj.get_round_state(self.game))
+
+        async def scenario():
+            await player.add_channels_to_group(player.player_group)
+            await player.get_current_ticket()
+            await player.on_card_selected({board_constants.EMAIL: 'abc2@example.com', board_constants.CARD: 5})
+            await obj.user_estimation('abc1@example.com', 1, 8, self.game)
+            await complete_round(self.game, None, [], on_expire)
+            await player.discard_channel_from_group(player.player_group)
+            return await obj.get_round_state(self.game)
+        self.assertEqual(board_constants.REVEALED_ROUND, async_to_sync(scenario)())
+        self.assertEqual([board_constants.VOTING_ROUND], expired)
+        self.assertEqual(
+            [board_constants.VOTING_ROUND, board_constants.REVEALED_ROUND],
+            [data[board_constants.ROUND_STATE] for data in self.sent_data(player) if board_constants.ROUND_STATE in data]
+        )
+        self.assertEqual([], self.saved)
+
+    @override_settings(POKER_BOARD_AUTO_ROUNDS=True, POKER_BOARD_CONSENSUS_PERCENTAGE=100)
+    def test_auto_round_is_completed_without_connection(self):
+        manager = self.get_consumer(1, timer_count=0.01)
+        player = self.get_consumer(2, timer_mode=board_constants.DEADLINE_TIMER_MODE)
+
+        async def scenario():
+            await player.add_channels_to_group(player.player_group)
+            await manager.get_current_ticket()
+            await obj.user_estimation('abc1@example.com', 1, 5, self.game)
+            await obj.user_estimation('abc2@example.com', 2, 5, self.game)
+            await manager.timer()
+            del manager.current_game, manager.session, manager.player_group
+            await asyncio.sleep(0.05)
+            await player.discard_channel_from_group(player.player_group)
+        async_to_sync(scenario)()
+        self.assertEqual([
+            board_constants.VOTING_ROUND, board_constants.REVEALED_ROUND,
+            board_constants.FINALIZED_ROUND, board_constants.VOTING_ROUND
+        ], [
+            data[board_constants.ROUND_STATE] for data in self.sent_data(player) if board_constants.ROUND_STATE in data
+        ])
+        self.assertEqual([(4, 5)], self.saved)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class TicketFeedTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the changes of the tickets pushed into live sessions.
+
+    Here are the details of the tests:
+        `test_change_is_applied_once_per_game`:
+            checks that a published change reaches one consumer of every game of its board only.
+        `test_change_is_broadcast_as_diff`:
+            checks that only changes of the queue are broadcast and that removing the current ticket starts a round.
+    '''
+    game = 'pokerboard15session16'
+
+    def test_change_is_applied_once_per_game(self):
+        feed = TicketFeed()
+        games = ('pokerboard15session16', 'pokerboard15session16', 'pokerboard15session17', 'pokerboard16session18')
+        changes = {user_id: [] for user_id in range(len(games))}
+
+        async def apply_ticket_change(user_id, ticket_id, ticket):
+            changes[user_id].append((ticket_id, ticket))
+        consumers = [
+            self.get_consumer(user_id, game=game, apply_ticket_change=functools.partial(apply_ticket_change, user_id))
+            for user_id, game in enumerate(games)
+        ]
+
+        async def scenario():
+            for board_id, consumer in zip((15, 15, 15, 16), consumers):
+                await feed.add(board_id, consumer)
+            await get_channel_layer().group_send(ticket_feed_group(15), {
+                'type': board_constants.TICKET_CHANGE,
+                board_constants.BOARD: 15,
+                board_constants.TICKETS: [[7, {'id': 7}], [8, None]],
+            })
+            await asyncio.sleep(0.05)
+            for board_id, consumer in zip((15, 15, 15, 16), consumers):
+                await feed.discard(board_id, consumer)
+            feed.reader.cancel()
+        async_to_sync(scenario)()
+        self.assertEqual(
+            [[(7, {'id': 7}), (8, None)], [], [(7, {'id': 7}), (8, None)], []], list(changes.values())
+        )
+        self.assertEqual({}, feed.boards)
+
+    def test_change_is_broadcast_as_diff(self):
+        consumer = self.get_consumer()
+        async_to_sync(obj.create_game_instance)(self.game, 30, [])
+        self.addCleanup(async_to_sync(obj.delete_game_instance), self.game)
+
+        async def scenario():
+            await obj.load_database_tickets([{board_constants.ID: 4}, {board_constants.ID: 5}], self.game)
+            await consumer.add_channels_to_group(consumer.player_group)
+            await consumer.apply_ticket_change(5, {board_constants.ID: 5, 'summary': 'b'})
+            await consumer.apply_ticket_change(5, {board_constants.ID: 5, 'summary': 'b'})
+            await consumer.apply_ticket_change(6, None)
+            await consumer.apply_ticket_change(4, None)
+            await consumer.discard_channel_from_group(consumer.player_group)
+        async_to_sync(scenario)()
+        self.assertEqual([
+            (board_constants.TICKET_CHANGED, {
+                board_constants.OPERATION: board_constants.UPDATED_TICKET, board_constants.ID: 5,
+                board_constants.TICKET: {board_constants.ID: 5, 'summary': 'b'},
+            }),
+            (board_constants.TICKET_CHANGED, {
+                board_constants.OPERATION: board_constants.REMOVED_TICKET, board_constants.ID: 4,
+            }),
+            (board_constants.ROUND, {
+                board_constants.ROUND_STATE: board_constants.VOTING_ROUND,
+                board_constants.TICKET: {board_constants.ID: 5, 'summary': 'b'},
+            }),
+        ], list(zip(self.sent_types(consumer), self.sent_data(consumer))))
+
+
+class TicketChangesTestCases(TransactionTestCase):
+    '''
+    This is a test case class for the publication of the changes of the tickets.
+
+    Here are the details of the tests:
+        `test_changes_are_published_once_per_active_board`:
+            checks that the changes of a transaction are published in one message per board with
+            an active session, and that the changes of a rolled back transaction are not.
+        `test_changes_outside_of_a_transaction_are_published_right_away`:
+            checks that every change made in autocommit mode is published in its own message.
+    '''
+
+    def setUp(self):
+        self.active_board_id = G(BoardSession).board_id
+        self.inactive_board_id = G(BoardSession, is_active=False).board_id
+
+    def save_tickets(self):
+        try:
+            with transaction.atomic():
+                ticket_changes.add(self.active_board_id, 1, {'id': 1})
+                raise ValueError
+        except ValueError:
+            pass
+        with transaction.atomic():
+            ticket_changes.add(self.active_board_id, 2, {'id': 2})
+            ticket_changes.add(self.inactive_board_id, 3, {'id': 3})
+            ticket_changes.add(self.active_board_id, 4, {'id': 4})
+            ticket_changes.add(self.active_board_id, 2, None)
+
+    def save_tickets_in_autocommit(self):
+        ticket_changes.add(self.active_board_id, 1, {'id': 1})
+        ticket_changes.add(self.active_board_id, 2, None)
+
+    def receive_messages(self, save_tickets):
+        async def scenario():
+            channel_layer = get_channel_layer()
+            channels = {}
+            for board_id in (self.active_board_id, self.inactive_board_id):
+                channels[board_id] = await channel_layer.new_channel()
+                await channel_layer.group_add(ticket_feed_group(board_id), channels[board_id])
+            await sync_to_async(save_tickets)()
+            messages = {}
+            for board_id, channel in channels.items():
+                messages[board_id] = []
+                while True:
+                    try:
+                        messages[board_id].append(await asyncio.wait_for(channel_layer.receive(channel), 0.05))
+                    except asyncio.TimeoutError:
+                        break
+                await channel_layer.group_discard(ticket_feed_group(board_id), channel)
+            return messages
+        return async_to_sync(scenario)()
+
+    def test_changes_are_published_once_per_active_board(self):
+        messages = self.receive_messages(self.save_tickets)
+        self.assertEqual([{
+            'type': board_constants.TICKET_CHANGE,
+            board_constants.BOARD: self.active_board_id,
+            board_constants.TICKETS: [[2, None], [4, {'id': 4}]],
+        }], messages[self.active_board_id])
+        self.assertEqual([], messages[self.inactive_board_id])
+
+    def test_changes_outside_of_a_transaction_are_published_right_away(self):
+        messages = self.receive_messages(self.save_tickets_in_autocommit)
+        self.assertEqual([[[1, {'id': 1}]], [[2, None]]], [
+            message[board_constants.TICKETS] for message in messages[self.active_board_id]
+        ])
+
+
+class PresenceTrackerTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the presence of the members of the games.
+
+    Here are the details of the tests:
+        `test_joins_and_leaves_are_debounced`:
+            checks that the changes of a debounce interval are sent as one diff without reconnects.
+        `test_other_workers_and_expiry`:
+            checks that a member connected to two workers is reported once and expires with a dead worker.
+    '''
+    game = 'pokerboard17session18'
+
+    def setUp(self):
+        self.backend = InMemoryStateBackend()
+        async_to_sync(self.backend.create_session)(self.game, 30, [])
+        self.diffs = []
+
+    async def on_change(self, diff):
+        self.diffs.append(diff)
+
+    def get_tracker(self, **kwargs):
+        return PresenceTracker(self.backend, scheduler=TimerScheduler(), **kwargs)
+
+    def test_joins_and_leaves_are_debounced(self):
+        tracker = self.get_tracker(debounce=0.02)
+
+        async def scenario():
+            await tracker.joined(self.game, 'a', self.on_change)
+            await tracker.joined(self.game, 'b', self.on_change)
+            await tracker.left(self.game, 'b')
+            await tracker.joined(self.game, 'b', self.on_change)
+            await asyncio.sleep(0.05)
+            await tracker.left(self.game, 'a')
+            await tracker.left(self.game, 'a')
+            await tracker.left(self.game, 'b')
+            await tracker.joined(self.game, 'b', self.on_change)
+            await asyncio.sleep(0.05)
+            tracker.scheduler.cancel(board_constants.PRESENCE)
+        async_to_sync(scenario)()
+        self.assertEqual([
+            {board_constants.JOINED: ['a', 'b'], board_constants.LEFT: []},
+            {board_constants.JOINED: [], board_constants.LEFT: ['a']},
+        ], self.diffs)
+        self.assertEqual({self.game: Counter({'b': 1})}, tracker.local)
+
+    def test_other_workers_and_expiry(self):
+        alive = self.get_tracker(debounce=0.02, heartbeat=0.03, ttl=0.1)
+        dead = self.get_tracker(debounce=0.02, heartbeat=60, ttl=0.1)
+
+        async def scenario():
+            await alive.joined(self.game, 'a', self.on_change)
+            await dead.joined(self.game, 'a', self.on_change)
+            await dead.joined(self.game, 'b', self.on_change)
+            dead.scheduler.cancel(board_constants.PRESENCE)
+            await asyncio.sleep(0.2)
+            alive.scheduler.cancel(board_constants.PRESENCE)
+            return await self.backend.get_presence(self.game)
+        self.assertEqual(['a'], async_to_sync(scenario)())
+        self.assertEqual([
+            {board_constants.JOINED: ['a'], board_constants.LEFT: []},
+            {board_constants.JOINED: ['b'], board_constants.LEFT: []},
+            {board_constants.JOINED: [], board_constants.LEFT: ['b']},
+        ], self.diffs)
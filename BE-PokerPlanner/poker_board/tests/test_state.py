@@ -0,0 +1,389 @@
+import json
+import statistics
+from collections import deque
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from fakeredis import aioredis as fake_aioredis
+
+from poker_board import constants as board_constants
+from poker_board.consumers import WebScoketStore
+from poker_board.game_session import GameSession
+from poker_board.ticket_statistics import TicketStatistics
+from poker_board.store_backends import InMemoryStateBackend, RedisStateBackend
+
+
+class InMemoryStateBackendTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the state backends of WebScoketStore.
+    Every test runs against the backend returned by `get_backend`, subclasses
+    override it to run the same tests on another backend.
+
+    Here are the details of the tests:
+        `test_create_game_instance_is_idempotent`:
+            checks if creating an existing game keeps its votes.
+        `test_user_estimation_returns_all_votes`:
+            checks if a vote is stored and all the votes of the game are returned.
+        `test_skip_ticket_moves_current_ticket_to_end`:
+            checks if skipping rotates the ticket queue.
+        `test_pop_ticket_returns_votes_of_ticket`:
+            checks if the popped ticket comes with the user ids and estimations of its votes.
+        `test_ticket_analysis`:
+            checks the analysis of the estimations, also after a member changed their vote.
+        `test_tickets_are_loaded_once`:
+            checks that loading the tickets again keeps the queue and its skip order.
+        `test_reorder_and_jump_to_ticket`:
+            checks that the queue can be reordered and rotated to a given ticket.
+        `test_events_since_sequence`:
+            checks the frames recorded after a sequence number, and that a gap is reported.
+        `test_round_state_transitions`:
+            checks that the round only moves from the given states and that voting resets the votes.
+        `test_change_ticket`:
+            checks that a ticket is appended, replaced in place or removed, and unchanged queues are reported.
+        `test_presence`:
+            checks that a member joins with their first connection, leaves with their last one and expires.
+        `test_restore_votes`:
+            checks that the round replayed from the vote journal makes its ticket current with its votes.
+    '''
+    game = 'pokerboard1session1'
+    members = [{'id': 1, 'email': 'abc1@example.com'}, {'id': 2, 'email': 'abc2@example.com'}]
+    tickets = [{'id': 1, 'jira_ticket': 'PP-1'}, {'id': 2, 'jira_ticket': 'PP-2'}]
+
+    def get_backend(self):
+        return InMemoryStateBackend()
+
+    def run_in_store(self, scenario):
+        """Run the given coroutine function with a fresh store."""
+        async_to_sync(scenario)(WebScoketStore(self.get_backend()))
+
+    def test_create_game_instance_is_idempotent(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            await store.user_estimation('abc1@example.com', 1, 5, self.game)
+            await store.create_game_instance(self.game, 10, self.members)
+            self.assertEqual(5, (await store.websocket_store(self.game))['abc1@example.com'])
+        self.run_in_store(scenario)
+
+    def test_user_estimation_returns_all_votes(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            votes = await store.user_estimation('abc2@example.com', 2, 8, self.game)
+            self.assertEqual(
+                {'abc1@example.com': board_constants.NOT_ESTIMATED, 'abc2@example.com': 8}, votes
+            )
+        self.run_in_store(scenario)
+
+    def test_tickets_are_loaded_once(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            self.assertFalse(await store.tickets_loaded(self.game))
+            self.assertTrue(await store.load_database_tickets(self.tickets, self.game))
+            await store.skip_ticket(self.game)
+            self.assertFalse(await store.load_database_tickets(self.tickets, self.game))
+            self.assertTrue(await store.tickets_loaded(self.game))
+            self.assertEqual(self.tickets[1], await store.get_current_ticket(self.game))
+        self.run_in_store(scenario)
+
+    def test_reorder_and_jump_to_ticket(self):
+        tickets = self.tickets + [{'id': 3, 'jira_ticket': 'PP-3'}]
+
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            await store.load_database_tickets(tickets, self.game)
+            await store.reorder_tickets([3, 9, 2], self.game)
+            self.assertEqual(tickets[2], await store.get_current_ticket(self.game))
+            self.assertTrue(await store.jump_to_ticket(1, self.game))
+            self.assertEqual(tickets[0], await store.get_current_ticket(self.game))
+            self.assertFalse(await store.jump_to_ticket(9, self.game))
+            await store.skip_ticket(self.game)
+            popped = [(await store.pop_ticket(self.game))[0] for _ in range(3)]
+            self.assertEqual([tickets[2], tickets[1], tickets[0]], popped)
+        self.run_in_store(scenario)
+
+    def test_restore_votes(self):
+        tickets = self.tickets + [{'id': 3, 'jira_ticket': 'PP-3'}]
+
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            await store.load_database_tickets(tickets, self.game)
+            await store.backend.restore_votes(self.game, 9, [(1, 5)])
+            self.assertEqual(tickets[0], await store.get_current_ticket(self.game))
+            self.assertEqual(board_constants.IDLE_ROUND, await store.get_round_state(self.game))
+            await store.backend.restore_votes(self.game, 2, [(1, 5), (2, 8), (7, 1)])
+            self.assertEqual(board_constants.VOTING_ROUND, await store.get_round_state(self.game))
+            self.assertEqual(2, (await store.backend.get_statistics(self.game)).count)
+            ticket, estimations = await store.pop_ticket(self.game)
+            self.assertEqual(tickets[1], ticket)
+            self.assertEqual([(1, 5), (2, 8)], sorted(estimations))
+            self.assertEqual(tickets[2], await store.get_current_ticket(self.game))
+        self.run_in_store(scenario)
+
+    def test_skip_ticket_moves_current_ticket_to_end(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            await store.load_database_tickets(self.tickets, self.game)
+            self.assertEqual(self.tickets[0], await store.get_current_ticket(self.game))
+            await store.skip_ticket(self.game)
+            self.assertEqual(self.tickets[1], await store.get_current_ticket(self.game))
+            await store.skip_ticket(self.game)
+            self.assertEqual(self.tickets[0], await store.get_current_ticket(self.game))
+        self.run_in_store(scenario)
+
+    def test_pop_ticket_returns_votes_of_ticket(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            await store.load_database_tickets(self.tickets, self.game)
+            await store.user_estimation('abc1@example.com', 1, 3, self.game)
+            ticket, estimations = await store.pop_ticket(self.game)
+            self.assertEqual(self.tickets[0], ticket)
+            self.assertEqual([(1, 3)], estimations)
+            user_estimations = store.final_estimation(ticket['id'], estimations)
+            self.assertEqual(1, len(user_estimations))
+            self.assertEqual((1, 1, 3), (
+                user_estimations[0].user_id, user_estimations[0].ticket_id, user_estimations[0].estimate
+            ))
+            self.assertEqual(self.tickets[1], await store.get_current_ticket(self.game))
+            await store.pop_ticket(self.game)
+            ticket, _ = await store.pop_ticket(self.game)
+            self.assertIsNone(ticket)
+        self.run_in_store(scenario)
+
+    def test_ticket_analysis(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            self.assertEqual(
+                board_constants.NOBODY_TICKET_ESTIMATION, await store.ticket_analysis(self.game)
+            )
+            await store.user_estimation('abc1@example.com', 1, 5, self.game)
+            await store.user_estimation('abc2@example.com', 2, 8, self.game)
+            await store.user_estimation('abc1@example.com', 1, 3, self.game)
+            self.assertEqual({
+                board_constants.MIN_TICKET_ESTIMATION: 3,
+                board_constants.MAX_TICKET_ESTIMATION: 8,
+                board_constants.AVG_TICKET_ESTIMATION: 5.5,
+                board_constants.MEDIAN_TICKET_ESTIMATION: 5.5,
+                board_constants.STANDARD_DEVIATION: 2.5,
+                board_constants.CONSENSUS_PERCENTAGE: 50.0,
+                board_constants.VOTES_COUNT: 2,
+                board_constants.HISTOGRAM: {1: 0, 3: 1, 5: 0, 8: 1},
+            }, await store.ticket_analysis(self.game, [1, 3, 5, 8, None]))
+        self.run_in_store(scenario)
+
+    def test_change_ticket(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            self.assertIsNone(await store.change_ticket(3, {'id': 3}, self.game))
+            await store.load_database_tickets(self.tickets, self.game)
+            self.assertEqual(board_constants.INSERTED_TICKET, await store.change_ticket(3, {'id': 3}, self.game))
+            self.assertIsNone(await store.change_ticket(3, {'id': 3}, self.game))
+            self.assertEqual(
+                board_constants.UPDATED_TICKET,
+                await store.change_ticket(2, {'id': 2, 'jira_ticket': 'PP-7'}, self.game)
+            )
+            self.assertEqual(board_constants.REMOVED_TICKET, await store.change_ticket(1, None, self.game))
+            self.assertIsNone(await store.change_ticket(1, None, self.game))
+            tickets = []
+            for _ in range(2):
+                tickets.append(await store.get_current_ticket(self.game))
+                await store.skip_ticket(self.game)
+            self.assertEqual([{'id': 2, 'jira_ticket': 'PP-7'}, {'id': 3}], tickets)
+        self.run_in_store(scenario)
+
+    def test_presence(self):
+        async def scenario(store):
+            backend = store.backend
+            await store.create_game_instance(self.game, 30, self.members)
+            self.assertTrue(await backend.join_presence(self.game, 'abc1@example.com', 10))
+            self.assertFalse(await backend.join_presence(self.game, 'abc1@example.com', 10))
+            self.assertTrue(await backend.join_presence(self.game, 'abc2@example.com', 10))
+            self.assertEqual(2, await store.count_presence(self.game))
+            self.assertFalse(await backend.leave_presence(self.game, 'abc1@example.com'))
+            await backend.refresh_presence(self.game, ['abc1@example.com'], 20)
+            self.assertEqual(['abc2@example.com'], await backend.expire_presence(self.game, 15))
+            self.assertEqual([], await backend.expire_presence(self.game, 15))
+            self.assertFalse(await backend.leave_presence(self.game, 'abc2@example.com'))
+            self.assertEqual(['abc1@example.com'], await store.get_presence(self.game))
+            self.assertTrue(await backend.leave_presence(self.game, 'abc1@example.com'))
+            self.assertEqual(0, await store.count_presence(self.game))
+        self.run_in_store(scenario)
+
+    def test_events_since_sequence(self):
+        async def scenario(store):
+            store.backend.event_buffer_size = 3
+            await store.create_game_instance(self.game, 30, self.members)
+            self.assertEqual([], await store.events_since(self.game, 0, ['players']))
+            frames = [
+                (await store.record_frame(self.game, group_name, board_constants.TIMER, index))[1]
+                for index, group_name in enumerate(['players', 'managers', 'players', 'managers', 'players'])
+            ]
+            self.assertEqual(5, await store.get_sequence(self.game))
+            self.assertEqual({'seq': 5, 'type': board_constants.TIMER, 'data': 4}, json.loads(frames[4]))
+            self.assertEqual(frames[3:], await store.events_since(self.game, 3, ['players', 'managers']))
+            self.assertEqual([frames[2], frames[4]], await store.events_since(self.game, 2, ['players']))
+            self.assertEqual([], await store.events_since(self.game, 5, ['players']))
+            self.assertIsNone(await store.events_since(self.game, 1, ['players']))
+        self.run_in_store(scenario)
+
+    def test_round_state_transitions(self):
+        async def scenario(store):
+            await store.create_game_instance(self.game, 30, self.members)
+            self.assertEqual(board_constants.IDLE_ROUND, await store.get_round_state(self.game))
+            self.assertFalse(await store.set_round_state(
+                self.game, board_constants.REVEALED_ROUND, (board_constants.VOTING_ROUND,)
+            ))
+            self.assertTrue(await store.set_round_state(
+                self.game, board_constants.VOTING_ROUND, (board_constants.IDLE_ROUND,)
+            ))
+            await store.user_estimation('abc2@example.com', 2, 8, self.game)
+            self.assertTrue(await store.set_round_state(
+                self.game, board_constants.REVEALED_ROUND, (board_constants.VOTING_ROUND,)
+            ))
+            self.assertEqual(board_constants.REVEALED_ROUND, await store.get_round_state(self.game))
+            self.assertEqual(8, (await store.websocket_store(self.game))['abc2@example.com'])
+            self.assertTrue(await store.set_round_state(
+                self.game, board_constants.VOTING_ROUND, board_constants.ROUND_STATES
+            ))
+            self.assertEqual(
+                {'abc1@example.com': board_constants.NOT_ESTIMATED, 'abc2@example.com': board_constants.NOT_ESTIMATED},
+                await store.websocket_store(self.game)
+            )
+            self.assertEqual(0, (await store.backend.get_statistics(self.game)).count)
+        self.run_in_store(scenario)
+
+
+class RedisStateBackendTestCases(InMemoryStateBackendTestCases):
+    '''
+    Runs the state backend test cases on the redis backend using fakeredis.
+    '''
+
+    def get_backend(self):
+        return RedisStateBackend(client=fake_aioredis.FakeRedis(decode_responses=True))
+
+
+class GameSessionTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the compact GameSession of the in-memory backend.
+
+    Here are the details of the tests:
+        `test_members_get_dense_slots_sorted_by_user_id`:
+            checks that slots follow the user ids, also for members added later.
+        `test_votes`:
+            checks that votes are stored per slot with their aggregates and can be reset in place.
+        `test_ticket_queue`:
+            checks that the tickets are kept as records in a deque.
+        `test_presence_map_is_kept_while_members_are_present`:
+            checks that the presence map is created on the first join and dropped with the last member.
+    '''
+
+    def test_members_get_dense_slots_sorted_by_user_id(self):
+        session = GameSession(30, [('abc7@example.com', 7), ('abc3@example.com', 3)])
+        self.assertEqual(0, session.slot(3))
+        self.assertEqual(1, session.slot(7))
+        self.assertEqual(1, session.add_member('abc5@example.com', 5))
+        self.assertEqual(1, session.add_member('abc5@example.com', 5))
+        self.assertEqual(2, session.slot(7))
+        self.assertIsNone(session.slot(4))
+        self.assertEqual(
+            ('abc3@example.com', 'abc5@example.com', 'abc7@example.com'), session.member_emails
+        )
+
+    def test_votes(self):
+        session = GameSession(30, [('abc1@example.com', 1), ('abc2@example.com', 2)])
+        votes = session.votes
+        session.set_vote(2, 8)
+        session.set_vote(9, 5)
+        self.assertEqual([(2, 8)], session.estimations())
+        self.assertEqual(
+            {'abc1@example.com': board_constants.NOT_ESTIMATED, 'abc2@example.com': 8}, session.vote_dict()
+        )
+        session.set_vote(1, 3)
+        session.set_vote(1, 5)
+        statistics = session.ticket_statistics()
+        self.assertEqual((2, 13, 89, {5: 1, 8: 1}), (
+            statistics.count, statistics.total, statistics.squares, statistics.counts()
+        ))
+        session.reset_votes()
+        self.assertIs(votes, session.votes)
+        self.assertEqual([], session.estimations())
+        self.assertEqual(0, session.ticket_statistics().count)
+
+    def test_presence_map_is_kept_while_members_are_present(self):
+        session = GameSession(30)
+        self.assertIsNone(session.presence)
+        self.assertEqual([], session.expire_presence(10))
+        self.assertTrue(session.join_presence('abc1@example.com', 10))
+        self.assertTrue(session.join_presence('abc2@example.com', 20))
+        self.assertTrue(session.leave_presence('abc1@example.com'))
+        self.assertEqual(['abc2@example.com'], session.present_members())
+        self.assertEqual(['abc2@example.com'], session.expire_presence(20))
+        self.assertIsNone(session.presence)
+        self.assertEqual([], session.present_members())
+
+    def test_ticket_queue(self):
+        session = GameSession(30)
+        self.assertIsNone(session.pop_ticket())
+        session.skip_ticket()
+        session.load_tickets([{'id': 1, 'jira_ticket': 'PP-1', 'summary': 'One'}, {'id': 2, 'jira_ticket': 'PP-2'}])
+        self.assertIsInstance(session.tickets, deque)
+        ticket = session.current_ticket()
+        self.assertEqual((1, 'PP-1', 'One'), (ticket.id, ticket.key, ticket.summary))
+        self.assertEqual({'id': 1, 'jira_ticket': 'PP-1', 'summary': 'One'}, json.loads(ticket.payload))
+        session.skip_ticket()
+        self.assertEqual(2, session.pop_ticket().id)
+        self.assertEqual([1], [ticket.id for ticket in session.tickets])
+
+
+class TicketStatisticsTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the running aggregates of the votes.
+
+    Here are the details of the tests:
+        `test_analysis_matches_statistics_module`:
+            checks the aggregates against the statistics module after votes and changes of vote.
+        `test_analysis_keys`:
+            checks the keys of the analysis sent to the clients.
+        `test_reset`:
+            checks that a reset forgets every vote.
+        `test_consensus`:
+            checks the estimation reaching the consensus percentage, and that there is none without votes.
+    '''
+
+    def test_analysis_matches_statistics_module(self):
+        aggregates = TicketStatistics()
+        votes = {}
+        for member, estimation in [(1, 5), (2, 8), (3, 1), (4, 13), (2, 5), (5, 5), (3, board_constants.NOT_VOTED)]:
+            aggregates.replace(votes.get(member, board_constants.NOT_VOTED), estimation)
+            votes[member] = estimation
+        values = [estimation for estimation in votes.values() if estimation != board_constants.NOT_VOTED]
+        analysis = aggregates.analysis()
+        self.assertEqual(statistics.median(values), analysis[board_constants.MEDIAN_TICKET_ESTIMATION])
+        self.assertAlmostEqual(statistics.pstdev(values), analysis[board_constants.STANDARD_DEVIATION])
+        self.assertEqual(statistics.mean(values), analysis[board_constants.AVG_TICKET_ESTIMATION])
+        self.assertEqual(75.0, analysis[board_constants.CONSENSUS_PERCENTAGE])
+        self.assertEqual({5: 3, 13: 1}, analysis[board_constants.HISTOGRAM])
+
+    def test_analysis_keys(self):
+        aggregates = TicketStatistics()
+        aggregates.add(3)
+        self.assertEqual([
+            'min_ticket_estimation', 'max_ticket_estimation', 'avg_ticket_estimation', 'median_ticket_estimation',
+            'standard_deviation', 'consensus_percentage', 'votes_count', 'histogram'
+        ], list(aggregates.analysis()))
+
+    def test_reset(self):
+        aggregates = TicketStatistics()
+        aggregates.add(3)
+        aggregates.reset()
+        self.assertEqual(board_constants.NOBODY_TICKET_ESTIMATION, aggregates.analysis())
+
+    def test_consensus(self):
+        aggregates = TicketStatistics()
+        self.assertIsNone(aggregates.consensus(100))
+        for estimation in (5, 5, 8):
+            aggregates.add(estimation)
+        self.assertIsNone(aggregates.consensus(100))
+        self.assertEqual(5, aggregates.consensus(60))
+        aggregates.add(8)
+        self.assertEqual(8, aggregates.consensus(50))
+        aggregates.replace(8, 5)
+        self.assertEqual(5, aggregates.consensus(75))
@@ -0,0 +1,165 @@
+import asyncio
+import functools
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import SimpleTestCase, override_settings
+
+from poker_board import constants as board_constants
+from poker_board.consumers import encode_frame, obj
+from poker_board.tests.helpers import ConsumerTestMixin
+from poker_board.timers import TimerScheduler, timer_scheduler
+
+
+class TimerSchedulerTestCases(SimpleTestCase):
+    '''
+    This is a test case class for the heap based TimerScheduler.
+
+    Here are the details of the tests:
+        `test_timers_expire_in_deadline_order`:
+            checks that timers of many games expire in the order of their deadlines.
+        `test_cancel_timer`:
+            checks that a cancelled timer never expires and can be queried as not running.
+        `test_restart_replaces_timer`:
+            checks that starting a running timer again only keeps the new one.
+        `test_ticks`:
+            checks the remaining seconds sent on every tick before the expiry.
+    '''
+
+    def test_timers_expire_in_deadline_order(self):
+        scheduler = TimerScheduler()
+        expired = []
+
+        async def scenario():
+            done = asyncio.Event()
+
+            async def on_expire(key):
+                expired.append(key)
+                if len(expired) == 3:
+                    done.set()
+            for key, duration in (('game3', 0.03), ('game1', 0.01), ('game2', 0.02)):
+                scheduler.start(key, duration, on_expire=functools.partial(on_expire, key))
+            self.assertEqual(3, len(scheduler))
+            await asyncio.wait_for(done.wait(), 1)
+        async_to_sync(scenario)()
+        self.assertEqual(['game1', 'game2', 'game3'], expired)
+        self.assertEqual(0, len(scheduler))
+
+    def test_cancel_timer(self):
+        scheduler = TimerScheduler()
+        expired = []
+
+        async def scenario():
+            async def on_expire():
+                expired.append(True)
+            scheduler.start('game1', 0.01, on_expire=on_expire)
+            self.assertLessEqual(scheduler.remaining('game1'), 0.01)
+            self.assertTrue(scheduler.cancel('game1'))
+            self.assertIsNone(scheduler.remaining('game1'))
+            self.assertFalse(scheduler.cancel('game1'))
+            await asyncio.sleep(0.03)
+        async_to_sync(scenario)()
+        self.assertEqual([], expired)
+
+    def test_restart_replaces_timer(self):
+        scheduler = TimerScheduler()
+        expired = []
+
+        async def scenario():
+            async def on_expire(run):
+                expired.append(run)
+            scheduler.start('game1', 0.01, on_expire=functools.partial(on_expire, 'first'))
+            scheduler.start('game1', 0.02, on_expire=functools.partial(on_expire, 'second'))
+            await asyncio.sleep(0.05)
+        async_to_sync(scenario)()
+        self.assertEqual(['second'], expired)
+
+    def test_ticks(self):
+        scheduler = TimerScheduler()
+        events = []
+
+        async def scenario():
+            done = asyncio.Event()
+
+            async def on_tick(remaining):
+                events.append(remaining)
+
+            async def on_expire():
+                events.append('expired')
+                done.set()
+            scheduler.start('game1', 0.025, on_expire=on_expire, on_tick=on_tick, tick_interval=0.01)
+            await asyncio.wait_for(done.wait(), 1)
+        async_to_sync(scenario)()
+        self.assertEqual([0, 0, 'expired'], events)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}, POKER_BOARD_LOCAL_FANOUT=False
+)
+class PokerBoardTimerTestCases(ConsumerTestMixin, SimpleTestCase):
+    '''
+    This is a test case class for the timer of PokerBoardAsyncConsumer.
+
+    Here are the details of the tests:
+        `test_deadline_timer_broadcasts_start_and_expiry_only`:
+            checks that a deadline timer sends two group messages whatever the duration.
+        `test_deadline_client_receives_deadline_once`:
+            checks that a deadline client gets one frame for the start of the timer.
+        `test_tick_client_counts_down_locally`:
+            checks that a tick client gets `timer` messages ending with 0.
+    '''
+    game = 'pokerboard1session2'
+
+    def test_deadline_timer_broadcasts_start_and_expiry_only(self):
+        consumer = self.get_consumer(timer_mode=board_constants.DEADLINE_TIMER_MODE, timer_tick_interval=0.01)
+
+        async def scenario():
+            channel_layer = get_channel_layer()
+            consumer.channel_layer = channel_layer
+            await channel_layer.group_add(consumer.player_group, 'listener')
+            await obj.create_game_instance(self.game, 0, [])
+            await consumer.timer()
+            messages = [await channel_layer.receive('listener'), await channel_layer.receive('listener')]
+            await channel_layer.group_discard(consumer.player_group, 'listener')
+            await obj.delete_game_instance(self.game)
+            return messages
+        messages = async_to_sync(scenario)()
+        self.assertEqual(
+            [board_constants.TIMER_STARTED, board_constants.TIMER_EXPIRED],
+            [message['type'] for message in messages]
+        )
+        self.assertEqual(0, messages[0][board_constants.DATA][board_constants.DURATION])
+
+    def test_deadline_client_receives_deadline_once(self):
+        consumer = self.get_consumer(timer_mode=board_constants.DEADLINE_TIMER_MODE, timer_tick_interval=0.01)
+        data = {board_constants.DEADLINE: int(time.time() * 1000) + 30000}
+
+        async def scenario():
+            await consumer.timer_started({
+                board_constants.DATA: data,
+                board_constants.TEXT: encode_frame(board_constants.TIMER_STARTED, data)
+            })
+            await consumer.timer_expired({board_constants.TEXT: encode_frame(board_constants.TIMER_EXPIRED, {})})
+        async_to_sync(scenario)()
+        self.assertEqual([
+            {'type': board_constants.TIMER_STARTED, 'data': data},
+            {'type': board_constants.TIMER_EXPIRED, 'data': {}},
+        ], consumer.sent_frames)
+        self.assertIsNone(timer_scheduler.get(consumer.channel_name))
+
+    def test_tick_client_counts_down_locally(self):
+        consumer = self.get_consumer(timer_mode=board_constants.TICK_TIMER_MODE, timer_tick_interval=0.01)
+        data = {board_constants.DEADLINE: int(time.time() * 1000) + 50}
+
+        async def scenario():
+            await consumer.timer_started({
+                board_constants.DATA: data,
+                board_constants.TEXT: encode_frame(board_constants.TIMER_STARTED, data)
+            })
+            self.assertIsNotNone(timer_scheduler.get(consumer.channel_name))
+            await asyncio.sleep(0.1)
+        async_to_sync(scenario)()
+        self.assertTrue(consumer.sent_frames)
+        self.assertEqual({'type': board_constants.TIMER, 'data': 0}, consumer.sent_frames[-1])
+        self.assertIsNone(timer_scheduler.get(consumer.channel_name))
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+import weakref
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from board_session.models import BoardSession
+from poker_board import constants as board_constants
+
+logger = logging.getLogger(__name__)
+
+
+def ticket_feed_group(board_id):
+    """Return the channel layer group the changes of the tickets of the board are published to."""
+    return f'{board_constants.TICKET_FEED_GROUP}{board_id}'
+
+
+def publish_ticket_changes(changes):
+    """
+    Publish the changes of the tickets of boards to the workers with a game of the board,
+    from synchronous code, one message per board with an active session. `changes` maps
+    a board id to a dict of ticket id -> serialized ticket, None when the ticket left
+    the queue of the games (deleted or estimated). A change which cannot be published
+    is logged, the games get it when they load their tickets again.
+    """
+    if not getattr(settings, 'POKER_BOARD_TICKET_FEED', board_constants.TICKET_FEED):
+        return
+    try:
+        active_boards = set(BoardSession.objects.filter(
+            board_id__in=list(changes), is_active=True
+        ).values_list('board_id', flat=True))
+        for board_id in active_boards:
+            async_to_sync(get_channel_layer().group_send)(ticket_feed_group(board_id), {
+                'type': board_constants.TICKET_CHANGE,
+                board_constants.BOARD: board_id,
+                board_constants.TICKETS: [[ticket_id, ticket] for ticket_id, ticket in changes[board_id].items()],
+            })
+    except Exception:
+        logger.exception('Could not publish the changes of the tickets of boards %s', list(changes))
+
+
+class PendingTicketChanges:
+    '''
+    The changes of the tickets made in one transaction, registered with
+    `transaction.on_commit` to publish them once it commits.
+    '''
+
+    def __init__(self):
+        self.changes = {}
+
+    def __call__(self):
+        changes, self.changes = self.changes, {}
+        publish_ticket_changes(changes)
+
+
+class TicketChanges:
+    '''
+    Collects the changes of the tickets made in the transaction of the current thread,
+    so that they are published by `publish_ticket_changes` once it commits, with one
+    message per board even for a bulk import, and not at all if it rolls back.
+    A change made outside of a transaction is published right away.
+
+    Only a weak reference to the pending changes of the transaction is kept: the
+    connection holds the only strong one through its on-commit callbacks, so they are
+    released with the callbacks of a rolled back transaction, and the next transaction
+    starts with new ones.
+    '''
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def add(self, board_id, ticket_id, ticket=None):
+        """Record the serialized ticket, or None when the ticket left the queue of the games."""
+        pending = getattr(self.local, 'pending', None)
+        pending = pending() if pending is not None else None
+        if pending is not None and pending.changes:
+            pending.changes.setdefault(board_id, {})[ticket_id] = ticket
+            return
+        pending = PendingTicketChanges()
+        pending.changes[board_id] = {ticket_id: ticket}
+        self.local.pending = weakref.ref(pending)
+        transaction.on_commit(pending)
+
+
+ticket_changes = TicketChanges()
+
+
+class TicketFeed:
+    '''
+    Hands the ticket changes published by `publish_ticket_changes` to the games of the
+    process.
+
+    The consumers of the process are registered per board and game. The process joins
+    the group of every board it has consumers of with a single worker channel, so a
+    change crosses the channel layer once per worker, and each change is applied by one
+    consumer per game of the board through `apply_ticket_change`.
+    '''
+
+    def __init__(self):
+        self.boards = {}
+        self.worker_channel = None
+        self.reader = None
+
+    async def add(self, board_id, consumer):
+        """Register the consumer of a game of the board."""
+        games = self.boards.setdefault(board_id, {})
+        games.setdefault(consumer.current_game, {})[consumer.channel_name] = consumer
+        if len(games) == 1 and len(games[consumer.current_game]) == 1:
+            await get_channel_layer().group_add(ticket_feed_group(board_id), await self.get_worker_channel())
+
+    async def discard(self, board_id, consumer):
+        """Unregister the consumer, the board group is left with its last consumer."""
+        games = self.boards.get(board_id)
+        consumers = games.get(consumer.current_game) if games is not None else None
+        if consumers is None or consumers.pop(consumer.channel_name, None) is None or consumers:
+            return
+        del games[consumer.current_game]
+        if games:
+            return
+        del self.boards[board_id]
+        await get_channel_layer().group_discard(ticket_feed_group(board_id), self.worker_channel)
+
+    async def apply(self, message):
+        """Apply the published changes to every game of their board in the process."""
+        for game, consumers in list(self.boards.get(message[board_constants.BOARD], {}).items()):
+            consumer = next(iter(consumers.values()))
+            for ticket_id, ticket in message[board_constants.TICKETS]:
+                try:
+                    await consumer.apply_ticket_change(ticket_id, ticket)
+                except Exception:
+                    logger.exception('Could not apply the change of ticket %s to %s', ticket_id, game)
+
+    async def get_worker_channel(self):
+        """Return the channel of the process, reading the published changes."""
+        loop = asyncio.get_running_loop()
+        if self.reader is None or self.reader.done() or self.reader.get_loop() is not loop:
+            self.worker_channel = await get_channel_layer().new_channel()
+            self.reader = loop.create_task(self.read())
+        return self.worker_channel
+
+    async def read(self):
+        channel_layer, worker_channel = get_channel_layer(), self.worker_channel
+        while True:
+            await self.apply(await channel_layer.receive(worker_channel))
@@ -0,0 +1,132 @@
+import math
+from array import array
+
+from poker_board import constants as board_constants
+
+
+class TicketStatistics:
+    '''
+    Running aggregates of the estimations given on the current ticket.
+
+    Every vote, change of vote or reset updates the aggregates in O(1), so the
+    analysis of a ticket never rescans the votes. The histogram holds at most one entry
+    per card of the board, it is kept as a flat array of (estimation, votes) pairs which
+    is smaller than a dict for the few cards of a board.
+
+    Fields
+    ----------
+    count : int
+        number of members who voted
+    total : int
+        sum of the estimations
+    squares : int
+        sum of the squares of the estimations
+    histogram : array
+        estimation, number of votes, estimation, number of votes, ... None until the first vote
+    '''
+    __slots__ = ('count', 'total', 'squares', 'histogram')
+
+    def __init__(self, count=0, total=0, squares=0, histogram=None):
+        self.count = count
+        self.total = total
+        self.squares = squares
+        self.histogram = histogram
+
+    @classmethod
+    def from_counts(cls, count, total, squares, counts):
+        """Build the aggregates from a dict of estimation -> number of votes."""
+        histogram = array('q')
+        for estimation, votes in counts.items():
+            histogram.extend((estimation, votes))
+        return cls(count, total, squares, histogram or None)
+
+    def counts(self):
+        """Return the histogram as a dict of estimation -> number of votes."""
+        histogram = self.histogram or ()
+        return dict(zip(histogram[::2], histogram[1::2]))
+
+    def add(self, estimation):
+        self.count += 1
+        self.total += estimation
+        self.squares += estimation * estimation
+        if self.histogram is None:
+            self.histogram = array('q', (estimation, 1))
+            return
+        for index in range(0, len(self.histogram), 2):
+            if self.histogram[index] == estimation:
+                self.histogram[index + 1] += 1
+                return
+        self.histogram.extend((estimation, 1))
+
+    def remove(self, estimation):
+        self.count -= 1
+        self.total -= estimation
+        self.squares -= estimation * estimation
+        for index in range(0, len(self.histogram), 2):
+            if self.histogram[index] == estimation:
+                self.histogram[index + 1] -= 1
+                if not self.histogram[index + 1]:
+                    del self.histogram[index:index + 2]
+                return
+
+    def replace(self, previous, estimation):
+        """Account for a member changing their estimation, either may be NOT_VOTED."""
+        if previous == estimation:
+            return
+        if previous != board_constants.NOT_VOTED:
+            self.remove(previous)
+        if estimation != board_constants.NOT_VOTED:
+            self.add(estimation)
+
+    def reset(self):
+        self.count = self.total = self.squares = 0
+        self.histogram = None
+
+    def median(self):
+        counts = self.counts()
+        middle, seen, lower = (self.count - 1) // 2, 0, None
+        for estimation in sorted(counts):
+            seen += counts[estimation]
+            if lower is None and seen > middle:
+                lower = estimation
+            if seen > self.count // 2:
+                return (lower + estimation) / 2
+        return lower
+
+    def consensus(self, percentage):
+        """
+        Return the estimation given by at least `percentage` percent of the votes, or None.
+        When several estimations qualify the most voted one wins, then the highest.
+        """
+        if not self.count:
+            return None
+        counts = self.counts()
+        estimation = max(counts, key=lambda estimation: (counts[estimation], estimation))
+        if counts[estimation] * 100 < percentage * self.count:
+            return None
+        return estimation
+
+    def analysis(self, estimation_choices=()):
+        """
+        Return the analysis of the ticket, or NOBODY_TICKET_ESTIMATION when nobody voted.
+
+        Besides the min, max and average estimation it holds the median, the population
+        standard deviation, the percentage of the votes given to the most chosen card and
+        the number of votes of every estimation choice of the board.
+        """
+        if not self.count:
+            return board_constants.NOBODY_TICKET_ESTIMATION
+        mean = self.total / self.count
+        counts = self.counts()
+        histogram = {choice: 0 for choice in estimation_choices if choice is not None}
+        histogram.update(counts)
+        return {
+            board_constants.MIN_TICKET_ESTIMATION: min(counts),
+            board_constants.MAX_TICKET_ESTIMATION: max(counts),
+            board_constants.AVG_TICKET_ESTIMATION: mean,
+            board_constants.MEDIAN_TICKET_ESTIMATION: self.median(),
+            board_constants.STANDARD_DEVIATION: math.sqrt(max(0, self.squares / self.count - mean * mean)),
+            board_constants.CONSENSUS_PERCENTAGE: round(max(counts.values()) * 100 / self.count, 2),
+            board_constants.VOTES_COUNT: self.count,
+            board_constants.HISTOGRAM: dict(sorted(histogram.items())),
+        }
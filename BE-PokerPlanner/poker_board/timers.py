@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import itertools
+import logging
+
+from poker_board import constants as board_constants
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTimer:
+    '''
+    A timer registered in the TimerScheduler.
+
+    Fields
+    ----------
+    key : str
+        the game key (or any other key) the timer is registered with
+    started_at : float
+        loop time at which the timer was started
+    expires_at : float
+        loop time at which on_expire is called
+    on_expire : coroutine function
+        called without arguments once the timer expires
+    on_tick : coroutine function
+        optional, called with the remaining seconds every tick_interval
+    tick_interval : float
+        seconds between two ticks
+    ticks : int
+        number of ticks already fired
+    '''
+    __slots__ = (
+        'key', 'started_at', 'expires_at', 'on_expire', 'on_tick', 'tick_interval', 'ticks'
+    )
+
+    def __init__(self, key, started_at, duration, on_expire, on_tick, tick_interval):
+        self.key = key
+        self.started_at = started_at
+        self.expires_at = started_at + duration
+        self.on_expire = on_expire
+        self.on_tick = on_tick
+        self.tick_interval = tick_interval
+        self.ticks = 0
+
+    def next_event_at(self):
+        """Return the loop time of the next tick, or of the expiry once no tick is left."""
+        if self.on_tick:
+            next_tick_at = self.started_at + (self.ticks + 1) * self.tick_interval
+            if next_tick_at < self.expires_at:
+                return next_tick_at
+        return self.expires_at
+
+
+class TimerScheduler:
+    '''
+    Drives the timers of every game of the process from a single task.
+
+    Timers are kept in a min-heap ordered by the loop time of their next event, the
+    scheduler task sleeps until the earliest one and fires it. Tick times are computed
+    from the start of the timer, not from the previous tick, so a timer does not drift.
+    Cancelled or restarted timers are left in the heap and skipped when popped.
+    '''
+
+    def __init__(self):
+        self.heap = []
+        self.timers = {}
+        self.sequence = itertools.count()
+        self.task = None
+        self.wakeup = None
+        self.callbacks = set()
+
+    def __len__(self):
+        return len(self.timers)
+
+    def start(self, key, duration, on_expire, on_tick=None,
+              tick_interval=board_constants.TIMER_TICK_IN_SECONDS):
+        """
+        Start a timer of `duration` seconds for the given key, replacing its running timer.
+
+        Must be called from the event loop. Returns the SessionTimer.
+        """
+        loop = asyncio.get_running_loop()
+        timer = SessionTimer(key, loop.time(), max(0, duration), on_expire, on_tick, tick_interval)
+        self.timers[key] = timer
+        self.push(timer)
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+        else:
+            self.wake()
+        return timer
+
+    def cancel(self, key):
+        """Cancel the running timer of the given key, return True if there was one."""
+        return self.timers.pop(key, None) is not None
+
+    def get(self, key):
+        """Return the running SessionTimer of the given key or None."""
+        return self.timers.get(key)
+
+    def remaining(self, key):
+        """Return the seconds left before the timer of the given key expires or None."""
+        timer = self.timers.get(key)
+        if timer is None:
+            return None
+        return max(0, timer.expires_at - asyncio.get_running_loop().time())
+
+    def push(self, timer):
+        heapq.heappush(self.heap, (timer.next_event_at(), next(self.sequence), timer))
+
+    def wake(self):
+        if self.wakeup is not None and not self.wakeup.done():
+            self.wakeup.set_result(None)
+
+    async def run(self):
+        """Fire the due timers until the heap is empty."""
+        loop = asyncio.get_running_loop()
+        while self.heap:
+            when, _, timer = self.heap[0]
+            if when > loop.time():
+                self.wakeup = loop.create_future()
+                handle = loop.call_at(when, self.wake)
+                try:
+                    await self.wakeup
+                finally:
+                    handle.cancel()
+                    self.wakeup = None
+                continue
+            heapq.heappop(self.heap)
+            if self.timers.get(timer.key) is not timer:
+                continue
+            self.fire(timer, when)
+
+    def fire(self, timer, when):
+        if when < timer.expires_at:
+            timer.ticks += 1
+            self.spawn(timer.on_tick(round(timer.expires_at - when)))
+            self.push(timer)
+        else:
+            del self.timers[timer.key]
+            self.spawn(timer.on_expire())
+
+    def spawn(self, coroutine):
+        """Run a timer callback as its own task so that a slow callback does not delay other timers."""
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.callbacks.add(task)
+        task.add_done_callback(self.callback_done)
+
+    def callback_done(self, task):
+        self.callbacks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error('Timer callback failed', exc_info=task.exception())
+
+
+timer_scheduler = TimerScheduler()
@@ -4,15 +4,16 @@ from channels.auth import AuthMiddleware
 from channels.db import database_sync_to_async
 from channels.sessions import CookieMiddleware, SessionMiddleware
 from django.contrib.auth.models import AnonymousUser
-from rest_framework_multitoken.models import MultiToken
+
+from poker_user.authentication import get_token_user
 
 
 @database_sync_to_async
 def get_user(scope):
     """
-    This function retrieves the user from the database based on a token in the query string 
-    of the WebSocket scope. If no token is present or the token is invalid or the corresponding 
-    user is inactive, the function returns an instance of the AnonymousUser class, which is a 
+    This function retrieves the user based on a token in the query string of the WebSocket 
+    scope, through the token cache of `get_token_user`. If no token is present or the token 
+    is invalid or inactive or the corresponding user is inactive, the function returns an instance of the AnonymousUser class, which is a 
     built-in user model in Django Channels.
 
     Arguments:
@@ -29,14 +30,7 @@ def get_user(scope):
     token = query_string.get('token')
     if not token:
         return AnonymousUser()
-    try:
-        user = MultiToken.objects.get(key=token[0]).user
-
-    except Exception as exception:
-        return AnonymousUser()
-    if not user.is_active:
-        return AnonymousUser()
-    return user
+    return get_token_user(token[0]) or AnonymousUser()
 
 
 class TokenAuthMiddleware(AuthMiddleware):
@@ -3,7 +3,7 @@ from rest_framework.routers import SimpleRouter
 
 from poker_board.views import (
     BoardAPIViewSet, LoggedInUserBoardsApiView, PokerChangeUserRoleAPIView, PokerUserRoleAPIView,
-    AcceptInviteViewSet, InviteViewSet
+    AcceptInviteViewSet, InviteViewSet, MetricsApiView
 )
 
 router = SimpleRouter()
@@ -13,6 +13,7 @@ urlpatterns = [
     re_path(r'(?P<bk>\d+)/user/(?P<pk>\d+)/$', PokerChangeUserRoleAPIView.as_view()),
     re_path(r'(?P<bk>\d+)/user/$', PokerUserRoleAPIView.as_view()),
     re_path(r'^list/$', LoggedInUserBoardsApiView.as_view()),
+    re_path(r'^metrics/$', MetricsApiView.as_view()),
     path('<int:pk>/invite/', InviteViewSet.as_view()),
     path('<int:pk>/acceptinvite/', AcceptInviteViewSet.as_view()),
     path('', include(router.urls)),
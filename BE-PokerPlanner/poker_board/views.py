@@ -1,12 +1,18 @@
+from asgiref.sync import async_to_sync
 from rest_framework import generics
 from rest_framework.filters import OrderingFilter
 from rest_framework.generics import UpdateAPIView
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from poker_board import pagination
+from poker_board import constants as board_constants, pagination
+from poker_board.consumers import local_fanout, session_lifecycle
+from poker_board.flow_control import flow_control_stats
+from poker_board.metrics import event_metrics
 from poker_board.models import PokerRole
-from poker_board.permissions import BoardPermissions
+from poker_board.permissions import BoardPermissions, MetricsPermission
 from poker_board.serializers import (
     AcceptInviteSerailizer, InviteSerailizer, PokerBoard, PokerBoardSerializer,
     PokerRoleSerializer, PokerRoleChangeSerializer, UserBoardFetchSerializer
@@ -202,3 +208,39 @@ class AcceptInviteViewSet(UpdateAPIView):
 
     def get_queryset(self):
         return super().get_queryset().filter(id=self.kwargs['pk'])
+
+
+class MetricsApiView(APIView):
+    """
+    A view returning the websocket metrics of the worker serving the request.
+
+    attributes
+    --------------
+    permission_classes : only staff users and requests with the metrics token can read the metrics.
+
+    url: GET boards/metrics/
+
+    response:
+    status code: 200 OK
+    {
+        "events": {
+            "card_selected": {
+                "count": 120, "errors": 0, "total_seconds": 0.42, "avg_seconds": 0.0035,
+                "latency_buckets": {"0.001": 10, "0.005": 100, ..., "inf": 0}
+            },
+            ...
+        },
+        "sessions": {"resident_sessions": 3, "connections": 25, ...},
+        "fanout": {"local_groups": 6, "local_connections": 25, "local_deliveries": 1200, ...},
+        "flow_control": {"dropped_messages": {"fetch_tickets": 4}, ..., "reaped_connections": 2}
+    }
+    """
+    permission_classes = [MetricsPermission]
+
+    def get(self, request):
+        return Response({
+            board_constants.EVENTS: event_metrics.snapshot(),
+            board_constants.SESSIONS: async_to_sync(session_lifecycle.stats)(),
+            board_constants.FANOUT: local_fanout.stats(),
+            board_constants.FLOW_CONTROL: flow_control_stats.snapshot(),
+        })
@@ -0,0 +1,119 @@
+import atexit
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from poker_board import constants as board_constants
+from poker_board.timers import timer_scheduler
+from poker_ticket import models as poker_ticket_models
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    '''
+    Queue of database rows written in the background in batches.
+
+    The queue is written `delay` seconds after the first row queued since the last
+    write, or right away once it holds `batch_size` rows, by a single call of `write`.
+    The delay is driven by the process wide `timer_scheduler`. `close` writes what is
+    left synchronously, it is registered with atexit for the queues of the process.
+
+    A batch is written in one transaction with one savepoint per row, so a row which
+    cannot be written is logged and dropped without rolling back the others. A batch
+    which fails as a whole, e.g. while the database is unreachable or on commit, is
+    queued again in front of the newer rows and retried after `delay` seconds.
+    '''
+    key = None
+
+    def __init__(self, scheduler=timer_scheduler, delay=None, batch_size=None):
+        self.scheduler = scheduler
+        self.delay = delay if delay is not None else getattr(
+            settings, 'POKER_BOARD_WRITE_BEHIND_DELAY', board_constants.WRITE_BEHIND_DELAY_IN_SECONDS
+        )
+        self.batch_size = batch_size or getattr(
+            settings, 'POKER_BOARD_WRITE_BEHIND_BATCH_SIZE', board_constants.WRITE_BEHIND_BATCH_SIZE
+        )
+        self.pending = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    async def enqueue(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+        elif len(self.pending) == 1:
+            self.scheduler.start(self.key, self.delay, on_expire=self.flush)
+
+    async def flush(self):
+        """Write every queued row now."""
+        self.scheduler.cancel(self.key)
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        try:
+            await database_sync_to_async(self.write)(batch)
+        except Exception:
+            logger.exception('Could not write %s rows of %s, retrying in %s seconds', len(batch), self.key, self.delay)
+            self.pending[:0] = batch
+            self.scheduler.start(self.key, self.delay, on_expire=self.flush)
+
+    def write(self, batch):
+        with transaction.atomic():
+            for row in batch:
+                try:
+                    with transaction.atomic():
+                        self.write_row(row)
+                except DatabaseError:
+                    logger.exception('Could not write %r of %s', row, self.key)
+
+    def write_row(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        """Write every queued row synchronously, used once the event loop is gone."""
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        try:
+            self.write(batch)
+        except Exception:
+            logger.exception('Could not write %s rows of %s', len(batch), self.key)
+
+
+class EstimationWriter(WriteBehindQueue):
+    '''
+    Write-behind persistence of the final estimations of every game of the process.
+
+    The final estimation of a ticket is queued with the votes of its members and written
+    in the savepoint of the ticket, so finalizing a ticket never waits for the database
+    and a ticket deleted meanwhile is skipped without losing the other estimations. The
+    queue is also written when a session ends and before the tickets of a game are
+    loaded again.
+    '''
+    key = board_constants.WRITE_BEHIND
+
+    async def add(self, ticket_id, estimation, user_estimations):
+        """Queue the final estimation of a ticket and the estimations of its voters."""
+        ticket = poker_ticket_models.Ticket(
+            id=ticket_id, is_estimated=True, final_estimation=estimation, updated_at=timezone.now()
+        )
+        await self.enqueue((ticket, user_estimations))
+
+    def write_row(self, row):
+        ticket, user_estimations = row
+        updated = poker_ticket_models.Ticket.objects.filter(id=ticket.id).update(
+            is_estimated=True, final_estimation=ticket.final_estimation, updated_at=ticket.updated_at
+        )
+        if not updated:
+            logger.warning('Ticket %s was deleted before its final estimation was written', ticket.id)
+            return
+        poker_ticket_models.PokerUserEstimation.objects.bulk_create(user_estimations)
+
+
+estimation_writer = EstimationWriter()
+atexit.register(estimation_writer.close)
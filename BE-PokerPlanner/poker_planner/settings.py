@@ -106,7 +106,7 @@ DATABASES = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_multitoken.authentication.MultiTokenAuthentication',
+        'poker_user.authentication.CachedMultiTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -172,3 +172,93 @@ CHANNEL_LAYERS = {
         },
     }
 }
+
+# Backend keeping the state of live pokerboard games. Switch to
+# 'poker_board.store_backends.RedisStateBackend' to share games between ASGI workers.
+POKER_BOARD_STATE_BACKEND = 'poker_board.store_backends.InMemoryStateBackend'
+POKER_BOARD_STATE_REDIS_URL = 'redis://localhost:6379/1'
+POKER_BOARD_STATE_TTL = 24 * 60 * 60
+
+# 'deadline' broadcasts the timer deadline once, 'tick' broadcasts the remaining time every second.
+POKER_BOARD_TIMER_MODE = 'deadline'
+
+# Seconds during which card selections are merged into one 'votes_delta' message per group,
+# 0 sends every card selection right away.
+POKER_BOARD_VOTE_COALESCING_WINDOW = 0
+
+# Seconds during which the admission data of a (session, user) is reused on reconnect
+# without querying the database, 0 disables the cache.
+POKER_BOARD_ADMISSION_CACHE_TTL = 10
+POKER_BOARD_ADMISSION_CACHE_SIZE = 10000
+
+# Seconds during which a token is resolved to its user from the token cache, 0 disables it.
+# Set POKER_USER_TOKEN_CACHE_REDIS_URL to share the cache (and logouts) between workers.
+POKER_USER_TOKEN_CACHE_TTL = 60
+POKER_USER_TOKEN_CACHE_SIZE = 10000
+POKER_USER_TOKEN_CACHE_REDIS_URL = None
+
+# Games of a worker are evicted this many seconds after their last connection drops,
+# and the least recently used idle games once more than POKER_BOARD_MAX_RESIDENT_SESSIONS are kept.
+POKER_BOARD_SESSION_IDLE_TTL = 10 * 60
+POKER_BOARD_MAX_RESIDENT_SESSIONS = 1000
+
+# The websocket metrics of a worker at /boards/metrics/ are readable by staff users and by
+# requests sending this token in the X-Metrics-Token header, none when it is not set.
+POKER_BOARD_METRICS_TOKEN = os.getenv('POKER_BOARD_METRICS_TOKEN')
+
+# Final estimations are written to the database in one transaction per batch, this many seconds
+# after the first one is queued or once POKER_BOARD_WRITE_BEHIND_BATCH_SIZE tickets are queued.
+POKER_BOARD_WRITE_BEHIND_DELAY = 0.05
+POKER_BOARD_WRITE_BEHIND_BATCH_SIZE = 500
+
+# Number of the last frames of a game kept to resend the missed ones to a client which
+# reconnects with its last sequence number, a client which missed more gets a snapshot.
+POKER_BOARD_EVENT_BUFFER_SIZE = 256
+
+# Deliver group messages to the connections of the same worker in-process, the channel
+# layer only carries one message per worker (and none with the in-memory state backend).
+POKER_BOARD_LOCAL_FANOUT = True
+
+# Boards with at least POKER_BOARD_LARGE_ROOM_SIZE members only send a frame per vote to
+# managers, the room gets the number of members who voted at most once per interval.
+POKER_BOARD_LARGE_ROOM_SIZE = 100
+POKER_BOARD_VOTES_AGGREGATE_INTERVAL = 1
+
+# Token bucket limits of the messages of a connection, event: (messages per second, burst).
+# Over-limit messages of POKER_BOARD_COALESCED_EVENTS are deferred and only the last one is
+# handled once the event is allowed again, the other ones are dropped.
+POKER_BOARD_EVENT_RATE_LIMITS = {
+    'card_selected': (5, 10),
+    'get_current_ticket': (5, 10),
+    'fetch_tickets': (1, 3),
+    'users_estimation': (2, 5),
+    'ticket_analysis': (2, 5),
+    'start_timer': (1, 3),
+    'resync': (1, 3),
+}
+POKER_BOARD_COALESCED_EVENTS = ['card_selected', 'get_current_ticket', 'users_estimation', 'ticket_analysis']
+
+# Connections with more frames waiting to be written are closed as too slow.
+POKER_BOARD_OUTBOUND_QUEUE_SIZE = 512
+
+# Reveal a round once every player voted or the timer expired, and finalize it with the
+# estimation chosen by at least POKER_BOARD_CONSENSUS_PERCENTAGE percent of the votes.
+POKER_BOARD_AUTO_ROUNDS = False
+POKER_BOARD_CONSENSUS_PERCENTAGE = 100
+
+# Publish the tickets saved or deleted during a session to its connections, which apply
+# the change to their queue instead of reloading it.
+POKER_BOARD_TICKET_FEED = True
+
+# Members connected to a session, refreshed by every worker each heartbeat and dropped
+# when no worker refreshed them for the ttl. Joins and leaves are broadcast in one frame
+# per debounce interval, a member leaving and coming back within it is not broadcast.
+POKER_BOARD_PRESENCE_HEARTBEAT = 10
+POKER_BOARD_PRESENCE_TTL = 30
+POKER_BOARD_PRESENCE_DEBOUNCE = 1
+
+# Send a `ping` frame to every connection each interval, a connection which answered none of
+# the last POKER_BOARD_MISSED_HEARTBEATS pings with a message is closed and leaves its groups.
+# An interval of 0 disables the heartbeats.
+POKER_BOARD_HEARTBEAT_INTERVAL = 20
+POKER_BOARD_MISSED_HEARTBEATS = 3
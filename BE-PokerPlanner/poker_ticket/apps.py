@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PokerTicketConfig(AppConfig):
     name = 'poker_ticket'
+
+    def ready(self):
+        from poker_ticket import signals  # noqa: F401
@@ -1,4 +1,5 @@
 from django.core import validators
+from django.db import transaction
 from rest_framework import serializers
 
 import constants
@@ -113,9 +114,14 @@ class FetchJiraTicketSerializer(serializers.Serializer):
         return data
     
     def create(self, validated_data):
+        '''
+        Save the imported tickets in one transaction, so that live sessions of the board
+        get them in one ticket change message.
+        '''
         serializer = TicketValidationSerializer(data = validated_data['jira_query_params'], many = True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
         return validated_data
 
 
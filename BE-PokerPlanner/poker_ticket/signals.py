@@ -0,0 +1,28 @@
+import json
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from poker_board.ticket_feed import ticket_changes
+from poker_ticket.models import Ticket
+from poker_ticket.serializers import UserTicketEstimationSerializer
+
+
+@receiver(post_save, sender=Ticket)
+def publish_saved_ticket(sender, instance, **kwargs):
+    '''
+    Push a created or edited ticket (also imported from Jira) to the live sessions of its
+    board once the transaction commits, an estimated ticket leaves their queue.
+    '''
+    ticket = None
+    if not instance.is_estimated:
+        ticket = json.loads(json.dumps(UserTicketEstimationSerializer(instance).data))
+    ticket_changes.add(instance.pokerboard_id, instance.id, ticket)
+
+
+@receiver(post_delete, sender=Ticket)
+def publish_deleted_ticket(sender, instance, **kwargs):
+    '''
+    Remove a deleted ticket from the queue of the live sessions of its board.
+    '''
+    ticket_changes.add(instance.pokerboard_id, instance.id)
@@ -0,0 +1 @@
+default_app_config = 'poker_user.apps.PokerUserConfig'
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PokerUserConfig(AppConfig):
     name = 'poker_user'
+
+    def ready(self):
+        from poker_user import signals  # noqa: F401
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from redis import Redis
+from rest_framework import exceptions
+from rest_framework_multitoken.authentication import MultiTokenAuthentication
+from rest_framework_multitoken.models import MultiToken
+
+from poker_board.caches import TTLCache
+from poker_user import constants as poker_user_constants
+
+
+class TokenUserCache:
+    '''
+    Maps a token key to the (user id, is_active) of its user.
+
+    `is_active` is False when either the token or its user is inactive. Entries live
+    `ttl` seconds in a process local LRU cache, or in Redis when a redis url is given
+    so that deleting a token on one worker invalidates it for every worker.
+    '''
+
+    def __init__(self, ttl=None, max_size=None, redis_url=None, client=None):
+        self.ttl = ttl if ttl is not None else getattr(
+            settings, 'POKER_USER_TOKEN_CACHE_TTL', poker_user_constants.TOKEN_CACHE_TTL_IN_SECONDS
+        )
+        redis_url = redis_url or getattr(settings, 'POKER_USER_TOKEN_CACHE_REDIS_URL', None)
+        self.client = client or (Redis.from_url(redis_url, decode_responses=True) if redis_url else None)
+        self.local = TTLCache(self.ttl, max_size or getattr(
+            settings, 'POKER_USER_TOKEN_CACHE_SIZE', poker_user_constants.TOKEN_CACHE_SIZE
+        ))
+
+    def key(self, token_key):
+        """Return the redis key of a token."""
+        return f'{poker_user_constants.TOKEN_CACHE_KEY_PREFIX}:{token_key}'
+
+    def get(self, token_key):
+        """Return the cached (user id, is_active) of a token or None."""
+        if self.client is None:
+            return self.local.get(token_key)
+        value = self.client.get(self.key(token_key))
+        if value is None:
+            return None
+        user_id, is_active = value.split(':')
+        return int(user_id), is_active == '1'
+
+    def set(self, token_key, user_id, is_active):
+        if not self.ttl:
+            return
+        if self.client is None:
+            self.local.set(token_key, (user_id, is_active))
+        else:
+            self.client.set(self.key(token_key), f'{user_id}:{int(is_active)}', ex=self.ttl)
+
+    def delete(self, *token_keys):
+        """Invalidate the given tokens."""
+        if self.client is None:
+            for token_key in token_keys:
+                self.local.delete(token_key)
+        elif token_keys:
+            self.client.delete(*[self.key(token_key) for token_key in token_keys])
+
+
+token_user_cache = TokenUserCache()
+
+
+def get_token_user(token_key):
+    """
+    Return the active user of an active token, or None.
+
+    On a cache miss the token and its user are loaded in one query with
+    select_related('user'), on a hit the user is loaded by primary key and an
+    inactive token is refused without any query.
+    """
+    cached = token_user_cache.get(token_key)
+    if cached is None:
+        token = MultiToken.objects.select_related('user').filter(key=token_key).first()
+        if token is None:
+            return None
+        is_active = token.is_active and token.user.is_active
+        token_user_cache.set(token_key, token.user_id, is_active)
+        return token.user if is_active else None
+    user_id, is_active = cached
+    if not is_active:
+        return None
+    return get_user_model().objects.filter(id=user_id).first()
+
+
+class CachedMultiTokenAuthentication(MultiTokenAuthentication):
+    '''
+    MultiTokenAuthentication resolving tokens through `token_user_cache`.
+    '''
+
+    def authenticate_credentials(self, key):
+        user = get_token_user(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (user, MultiToken(key=key, user=user))
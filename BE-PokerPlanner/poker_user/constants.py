@@ -5,3 +5,7 @@ LINK_IS_ALREADY_SEND = {'data': 'VERFICATION LINK IS ALREAY SEND ON EMAIL ID'}
 LINK_SEND = {'data': 'VERFICATION LINK IS SEND ON YOUR EMAIL ID'}
 LINK_EXPIRE = {'data': 'VERFICATION LINK IS EXPIRE'}
 LINK_VERIFIED = {'data': 'ACCOUNT IS VERIFIED'}
+TOKEN_CACHE_TTL_IN_SECONDS = 0
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_KEY_PREFIX = 'poker_planner:token'
+TOKEN_CACHE_USER_FIELDS = frozenset(('password', 'is_active'))
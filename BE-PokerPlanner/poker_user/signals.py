@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework_multitoken.models import MultiToken
+
+from poker_user import constants
+from poker_user.authentication import token_user_cache
+from poker_user.models import PokerUser
+
+
+@receiver(post_delete, sender=MultiToken)
+@receiver(post_save, sender=MultiToken)
+def invalidate_token(sender, instance, **kwargs):
+    '''
+    Drop a deleted (e.g. on logout) or updated token from the token cache.
+    '''
+    token_user_cache.delete(instance.key)
+
+
+@receiver(pre_delete, sender=PokerUser)
+@receiver(post_save, sender=PokerUser)
+def invalidate_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    '''
+    Drop the tokens of an updated (e.g. deactivated) or deleted user from the token cache,
+    the tokens of a deleted user are read before they are deleted with it. A partial save
+    which does not touch the fields the cache depends on (e.g. `last_login` on login)
+    keeps them.
+    '''
+    if created or (update_fields is not None and not constants.TOKEN_CACHE_USER_FIELDS.intersection(update_fields)):
+        return
+    token_user_cache.delete(*MultiToken.objects.filter(user=instance).values_list('key', flat=True))
+
@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from fakeredis import FakeRedis
 from rest_framework.test import APITestCase
 from rest_framework_multitoken.models import MultiToken
 
+from poker_user.authentication import (
+    CachedMultiTokenAuthentication, TokenUserCache, get_token_user, token_user_cache
+)
+
 
 class UserRegistrationAPIViewTestCase(APITestCase):
     """
@@ -144,3 +149,82 @@ class UserLoginAPIViewTestCase(APITestCase):
         self.user.is_verified = True
         response = self.client.post(self.url, {'email': self.email, 'password': self.password})
         self.assertEqual(200, response.status_code)
+
+
+class TokenUserCacheTestCase(APITestCase):
+    """
+        Test cases for the token to user cache.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('john@snow.com', 'you_know_nothing')
+        self.token = MultiToken.objects.create(user=self.user)
+        self.ttl, token_user_cache.ttl, token_user_cache.local.ttl = token_user_cache.ttl, 60, 60
+
+    def tearDown(self):
+        token_user_cache.ttl = token_user_cache.local.ttl = self.ttl
+        token_user_cache.local.clear()
+
+    def test_cached_token_skips_token_query(self):
+        '''
+        Test that a token is loaded with its user once, then the user is loaded by id.
+        '''
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user, get_token_user(self.token.key))
+        self.assertEqual((self.user.id, True), token_user_cache.get(self.token.key))
+        with self.assertNumQueries(1):
+            user, _ = CachedMultiTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual(self.user, user)
+
+    def test_logout_invalidates_token(self):
+        '''
+        Test that a deleted token is dropped from the cache.
+        '''
+        get_token_user(self.token.key)
+        self.token.delete()
+        self.assertIsNone(token_user_cache.get(self.token.key))
+        self.assertIsNone(get_token_user(self.token.key))
+
+    def test_inactive_token_is_refused_without_query(self):
+        '''
+        Test that deactivating a token invalidates it and that the refusal is cached.
+        '''
+        get_token_user(self.token.key)
+        self.token.is_active = False
+        self.token.save()
+        self.assertIsNone(get_token_user(self.token.key))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_token_user(self.token.key))
+
+    def test_updated_or_deleted_user_drops_cached_tokens(self):
+        '''
+        Test that saving (e.g. deactivating) or deleting a user drops their cached tokens,
+        unless only fields the cache does not depend on (e.g. last_login) are saved.
+        '''
+        other_token = MultiToken.objects.create(user=self.user)
+        for token in (self.token, other_token):
+            get_token_user(token.key)
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(
+            [(self.user.id, True)] * 2, [token_user_cache.get(token.key) for token in (self.token, other_token)]
+        )
+        self.user.set_password('winter_is_coming')
+        self.user.save(update_fields=['password'])
+        self.assertEqual([None, None], [token_user_cache.get(token.key) for token in (self.token, other_token)])
+        get_token_user(self.token.key)
+        self.user.save()
+        self.assertIsNone(token_user_cache.get(self.token.key))
+        self.assertEqual(self.user, get_token_user(self.token.key))
+        self.user.delete()
+        self.assertIsNone(token_user_cache.get(self.token.key))
+        self.assertIsNone(get_token_user(self.token.key))
+
+    def test_redis_backed_cache(self):
+        '''
+        Test that the redis backed cache stores and invalidates tokens.
+        '''
+        cache = TokenUserCache(ttl=60, client=FakeRedis(decode_responses=True))
+        cache.set(self.token.key, self.user.id, False)
+        self.assertEqual((self.user.id, False), cache.get(self.token.key))
+        cache.delete(self.token.key)
+        self.assertIsNone(cache.get(self.token.key))
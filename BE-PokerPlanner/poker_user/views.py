@@ -1,12 +1,12 @@
 from rest_framework import generics as rest_generics
 from rest_framework import status as status
 from rest_framework.generics import CreateAPIView, DestroyAPIView,UpdateAPIView
-from rest_framework_multitoken.authentication import MultiTokenAuthentication
 from rest_framework_multitoken.models import MultiToken
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from poker_user import (
+    authentication as poker_user_authentication,
     models as poker_user_models,
     serializers as poker_user_serializers,
 )
@@ -96,7 +96,7 @@ class LogoutView(DestroyAPIView):
             status: 204
         }
     """
-    authentication_classes = [MultiTokenAuthentication]
+    authentication_classes = [poker_user_authentication.CachedMultiTokenAuthentication]
     serializer_class = poker_user_serializers.LogoutSerializer
     queryset = MultiToken.objects.all()
 
@@ -38,6 +38,7 @@ import {
   nonManagerPanelTitle,
   roles,
   ticketCommentError,
+  votesAggregateMessage,
 } from '@Constants/constants';
 import { PokerBoardStartGameComponentProps } from '@Constants/interfaces';
 
@@ -52,6 +53,7 @@ export default (props: PokerBoardStartGameComponentProps): JSX.Element => {
     ticket,
     userSelection,
     usersWhoSelected,
+    votesAggregate,
     boardSession,
     timeLeft,
     locallyStoredUserID,
@@ -418,6 +420,18 @@ export default (props: PokerBoardStartGameComponentProps): JSX.Element => {
                   </Toolbar>
                 </AppBar>
                 <Box sx={{ mt: 1, ml: 5 }}>
+                  {votesAggregate && (
+                    <Typography
+                      sx={{ mt: 1, ml: 5, fontFamily: 'BlinkMacSystemFont' }}
+                      variant='body1'
+                      component='div'
+                    >
+                      {votesAggregateMessage(
+                        votesAggregate.voted,
+                        votesAggregate.members
+                      )}
+                    </Typography>
+                  )}
                   {usersWhoSelected.length ? (
                     <FixedSizeList
                       style={{ marginLeft: '4ch' }}
@@ -430,13 +444,15 @@ export default (props: PokerBoardStartGameComponentProps): JSX.Element => {
                       {renderUsersList}
                     </FixedSizeList>
                   ) : (
-                    <Typography
-                      sx={{ mt: 1, ml: 5, fontFamily: 'BlinkMacSystemFont' }}
-                      variant='body1'
-                      component='div'
-                    >
-                      {noEstimationsYetMessage}
-                    </Typography>
+                    !votesAggregate && (
+                      <Typography
+                        sx={{ mt: 1, ml: 5, fontFamily: 'BlinkMacSystemFont' }}
+                        variant='body1'
+                        component='div'
+                      >
+                        {noEstimationsYetMessage}
+                      </Typography>
+                    )
                   )}
                 </Box>
               </Paper>
@@ -185,7 +185,11 @@ export const createNewBoardMessage = 'Create a new board to start estimating';
 export const createNewGroupMessage = 'Create a new group';
 export const nonManagerPanelTitle = 'Users who have estimated till now';
 export const noEstimationsYetMessage = 'No one has estimated yet';
+export const votesAggregateMessage = (voted: number, members: number): string =>
+  `${voted} of ${members} members have estimated`;
 export const webSocketBaseUrl = `${process.env.REACT_APP_SOCKET_SERVER}/session/`;
+export const webSocketTimerMode = 'deadline';
+export const timerCountdownInterval = 1000;
 export const integerRegex = /^\d+$/;
 export const finalEstimationHelperText = 'Only number is allowed';
 export const finalEstimationMaxValueError = 'Value should be less than 2147483647';
@@ -206,13 +210,28 @@ export const eventChoices = {
   startTimer: 'start_timer',
   resetTimer: 'reset_timer',
   timer: 'timer',
+  timerStarted: 'timer_started',
+  timerExpired: 'timer_expired',
   selectedCard: 'card_selected',
   selectedCardByAnotherPlayer: 'card_selected_by_player',
   selectedCardDetailsForManager: 'card_selected_by_player_for_manager',
+  votesDelta: 'votes_delta',
+  votesAggregate: 'votes_aggregate',
   allUserEstimations: 'users_estimation',
   skipTicket: 'skip_ticket',
   finalEstimation: 'final_estimation',
   endGame: 'end_game',
+  round: 'round',
+  ticketChanged: 'ticket_changed',
+  ping: 'ping',
+  pong: 'pong',
+};
+export const roundStateChoices = {
+  voting: 'voting',
+  revealed: 'revealed',
+};
+export const ticketOperationChoices = {
+  update: 'update',
 };
 export const maxAllowedCommentLen = 255;
 export const ticketCommentError = 'Comment length cannot exceed 255';
@@ -342,6 +342,7 @@ export interface UpdateUserDetailPropType {
 }
 
 export interface PokerTicketInterface {
+  id?: number;
   jira_ticket?: string;
   summary?: string;
   description?: string;
@@ -360,6 +361,17 @@ export interface BoardGameMessageInterface {
   card: string;
 }
 
+export interface VotesAggregateInterface {
+  voted: number;
+  members: number;
+}
+
+export interface TimerStartedInterface {
+  deadline: number;
+  duration: number;
+  server_time: number;
+}
+
 export interface UserEstimationsInterface {
   [key: string]: string | number;
 }
@@ -369,6 +381,7 @@ export interface PokerBoardStartGameComponentProps {
   handleCardClick: MouseEventHandler;
   userSelection: string;
   usersWhoSelected: string[];
+  votesAggregate: VotesAggregateInterface | null;
   boardSession: PokerBoardSessionInterface;
   timeLeft: number;
   locallyStoredUserID: number;
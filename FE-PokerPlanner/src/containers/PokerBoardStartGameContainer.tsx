@@ -9,12 +9,18 @@ import {
   gameStateChoices,
   integerRegex,
   loginRoute,
+  roundStateChoices,
+  ticketOperationChoices,
+  timerCountdownInterval,
   webSocketBaseUrl,
+  webSocketTimerMode,
 } from '@Constants/constants';
 import {
   BoardGameMessageInterface,
   PokerTicketInterface,
+  TimerStartedInterface,
   UserEstimationsInterface,
+  VotesAggregateInterface,
 } from '@Constants/interfaces';
 import { addComment } from '@Redux/actions/AddCommentAction';
 import { setBoardSession } from '@Redux/actions/BoardSessionAction';
@@ -30,10 +36,13 @@ export default (): JSX.Element => {
   const navigate = useNavigate();
   const dispatch = useDispatch<AppDispatch>();
   const socketRef = useRef<WebSocket>();
+  const timerIntervalRef = useRef<ReturnType<typeof setInterval>>();
   const [ticket, setTicket] = useState<PokerTicketInterface>({});
   const { boardSessionID, boardID } = useParams();
   const [userSelection, setUserSelection] = useState<string>('');
   const [usersWhoSelected, setUsersWhoSelected] = useState<string[]>([]);
+  const [votesAggregate, setVotesAggregate] =
+    useState<VotesAggregateInterface | null>(null);
   const [managerPanelList, setManagerPanelList] = useState<
     BoardGameMessageInterface[]
   >([]);
@@ -57,18 +66,24 @@ export default (): JSX.Element => {
     return socketRef.current?.readyState === WebSocket.OPEN;
   };
 
-  const initializingGamePage = (): void => {
+  const emitResetTimer = (): void => {
     if (isSocketRefValid()) {
       socketRef?.current?.send(
         JSON.stringify({
-          event: eventChoices.currentTicket,
+          event: eventChoices.resetTimer,
         })
       );
+    }
+  };
+
+  const initializingGamePage = (): void => {
+    if (isSocketRefValid()) {
       socketRef?.current?.send(
         JSON.stringify({
-          event: eventChoices.resetTimer,
+          event: eventChoices.currentTicket,
         })
       );
+      emitResetTimer();
     }
   };
 
@@ -83,11 +98,39 @@ export default (): JSX.Element => {
     }
   };
 
+  const clearTimerCountdown = (): void => {
+    if (timerIntervalRef.current) {
+      clearInterval(timerIntervalRef.current);
+      timerIntervalRef.current = undefined;
+    }
+  };
+
+  const startTimerCountdown = ({
+    deadline,
+    server_time,
+  }: TimerStartedInterface): void => {
+    clearTimerCountdown();
+    const clockSkew = Date.now() - server_time;
+    const updateTimeLeft = (): void => {
+      setTimeLeft(
+        Math.max(0, Math.ceil((deadline + clockSkew - Date.now()) / 1000))
+      );
+    };
+    updateTimeLeft();
+    setCurrentGameState(gameStateChoices.timerOngoingState);
+    timerIntervalRef.current = setInterval(
+      updateTimeLeft,
+      timerCountdownInterval
+    );
+  };
+
   const handleTicketCleanup = (): void => {
+    clearTimerCountdown();
     setTimeLeft(0);
     setCurrentGameState(gameStateChoices.beforeTimerStartsState);
     setFinalEstimation('');
     setUsersWhoSelected([]);
+    setVotesAggregate(null);
     setManagerPanelList([]);
     setUserSelection('');
     setUserEstimations({});
@@ -118,6 +161,27 @@ export default (): JSX.Element => {
     }
   };
 
+  const applyVotesDelta = (votes: BoardGameMessageInterface[]): void => {
+    const newEmails = votes
+      .map((vote) => vote.email)
+      .filter(
+        (email, idx, emails) =>
+          !usersWhoSelected.includes(email) && emails.indexOf(email) === idx
+      );
+    if (newEmails.length) {
+      setUsersWhoSelected([...usersWhoSelected, ...newEmails]);
+    }
+    const cardVotes = votes.filter((vote) => vote.card !== undefined);
+    if (cardVotes.length) {
+      setManagerPanelList([
+        ...managerPanelList.filter(
+          (user) => !cardVotes.some((vote) => vote.email === user.email)
+        ),
+        ...cardVotes,
+      ]);
+    }
+  };
+
   if (socketRef.current) {
     socketRef.current.onmessage = (e: MessageEvent) => {
       const receivedData = JSON.parse(e.data);
@@ -136,6 +200,14 @@ export default (): JSX.Element => {
             setCurrentGameState(gameStateChoices.afterTimerEndsState);
           }
           break;
+        case eventChoices.timerStarted:
+          startTimerCountdown(receivedData.data);
+          break;
+        case eventChoices.timerExpired:
+          clearTimerCountdown();
+          setTimeLeft(0);
+          setCurrentGameState(gameStateChoices.afterTimerEndsState);
+          break;
         case eventChoices.selectedCard:
           setUserSelection(receivedData.data.card);
           addToUserList(receivedData.data.email);
@@ -146,8 +218,34 @@ export default (): JSX.Element => {
         case eventChoices.selectedCardDetailsForManager:
           addToManagerPanelList(receivedData.data);
           break;
-        case eventChoices.allUserEstimations:
-          setUserEstimations(receivedData.data);
+        case eventChoices.votesDelta:
+          applyVotesDelta(receivedData.data);
+          break;
+        case eventChoices.votesAggregate:
+          setVotesAggregate(receivedData.data);
+          break;
+        case eventChoices.round:
+          if (receivedData.data.state === roundStateChoices.voting) {
+            handleTicketCleanup();
+            setTicket(receivedData.data.ticket);
+          } else if (receivedData.data.state === roundStateChoices.revealed) {
+            setUserEstimations(receivedData.data.votes);
+          }
+          break;
+        case eventChoices.ticketChanged:
+          if (
+            receivedData.data.operation === ticketOperationChoices.update &&
+            receivedData.data.id === ticket.id
+          ) {
+            setTicket(receivedData.data.ticket);
+          }
+          break;
+        case eventChoices.ping:
+          socketRef?.current?.send(
+            JSON.stringify({
+              event: eventChoices.pong,
+            })
+          );
           break;
       }
     };
@@ -193,7 +291,7 @@ export default (): JSX.Element => {
       navigate(loginRoute);
     }
     socketRef.current = new WebSocket(
-      `${webSocketBaseUrl}${boardSessionID}/?token=${locallyStoredToken}`
+      `${webSocketBaseUrl}${boardSessionID}/?token=${locallyStoredToken}&timer_mode=${webSocketTimerMode}`
     );
     socketRef.current.onopen = () => {
       if (isSocketRefValid()) {
@@ -228,7 +326,7 @@ export default (): JSX.Element => {
           event: eventChoices.skipTicket,
         })
       );
-      initializingGamePage();
+      emitResetTimer();
     }
   };
 
@@ -244,7 +342,7 @@ export default (): JSX.Element => {
           estimation: +finalEstimation,
         })
       );
-      initializingGamePage();
+      emitResetTimer();
     }
   };
 
@@ -272,6 +370,7 @@ export default (): JSX.Element => {
       ticket={ticket}
       userSelection={userSelection}
       usersWhoSelected={usersWhoSelected}
+      votesAggregate={votesAggregate}
       boardSession={boardSession}
       timeLeft={timeLeft}
       locallyStoredUserID={+locallyStoredUserID}